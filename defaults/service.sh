@@ -10,6 +10,7 @@ real_script_directory="$(cd "$(dirname "${script_path}")" && pwd)"
 _term() {
     cleanup_virtual_surround_module
     cleanup_virtual_surround_default_sink
+    cleanup_filter_instances
 }
 
 service_shutdown_requested="false"
@@ -23,6 +24,32 @@ _handle_signal() {
 }
 
 mix_gain_db="-6dB"
+# Maximum time to wait for a loaded filter-chain module to register its ports
+module_ready_timeout_seconds="10"
+
+# HRIR used by the convolver filter. Suffixed filter instances may point this at their own preset.
+hrir_wav_path="${VIRTUAL_SURROUND_HRIR_PATH:-${HOME:?}/.config/pipewire/hrir.wav}"
+
+# The plugin writes each HRIR channel as its own mono WAV under hrir-split/<first 16 hex digits of the SHA-256>/.
+# When a complete split exists for the HRIR, every convolver loads just its own channel instead of each one opening
+# and decoding the full multichannel file.
+hrir_split_root="${HOME:?}/.config/pipewire/hrir-split"
+hrir_split_directory=""
+if [[ -d "${hrir_split_root:?}" && -f "${hrir_wav_path:?}" ]]; then
+    hrir_split_candidate="${hrir_split_root:?}/$(sha256sum <"${hrir_wav_path:?}" | cut -c1-16)"
+    if [[ -f "${hrir_split_candidate:?}/13.wav" ]]; then
+        hrir_split_directory="${hrir_split_candidate:?}"
+    fi
+fi
+
+hrir_convolver_config() {
+    local channel="${1:?}"
+    if [[ -n "${hrir_split_directory}" ]]; then
+        printf '"filename": "%s/%02d.wav", "channel": 0' "${hrir_split_directory:?}" "${channel}"
+    else
+        printf '"filename": "%s", "channel": %d' "${hrir_wav_path:?}" "${channel}"
+    fi
+}
 
 # Configure pipewire modules names/descriptions
 virtual_surround_filter_sink_node_name="vss-filter"
@@ -30,7 +57,7 @@ virtual_surround_filter_sink_description="Virtual Surround Sound Filter"
 virtual_surround_filter_sink_capture_node_name="input.vss-filter"
 virtual_surround_filter_sink_playback_node_name="output.vss-filter"
 if [[ -n "${VIRTUAL_SURROUND_SINK_SUFFIX:-}" ]]; then
-    virtual_surround_filter_sink_node_name="vss-filter"
+    virtual_surround_filter_sink_node_name="vss-filter-${VIRTUAL_SURROUND_SINK_SUFFIX:-}"
     virtual_surround_filter_sink_description="Virtual Surround Sound (${VIRTUAL_SURROUND_SINK_SUFFIX:-})"
     virtual_surround_filter_sink_capture_node_name="input.vss-filter-${VIRTUAL_SURROUND_SINK_SUFFIX:-}"
     virtual_surround_filter_sink_playback_node_name="output.vss-filter-${VIRTUAL_SURROUND_SINK_SUFFIX:-}"
@@ -96,50 +123,50 @@ filter_module_convolver_args_8=$(
     "node.description": "${virtual_surround_filter_sink_description:?}",
     filter.graph = {
         "nodes": [
-            { "type": "builtin", "label": "copy", "name": "copyFL" },
-            { "type": "builtin", "label": "copy", "name": "copyFR" },
-            { "type": "builtin", "label": "copy", "name": "copyFC" },
-            { "type": "builtin", "label": "copy", "name": "copyRL" },
-            { "type": "builtin", "label": "copy", "name": "copyRR" },
-            { "type": "builtin", "label": "copy", "name": "copySL" },
-            { "type": "builtin", "label": "copy", "name": "copySR" },
-            { "type": "builtin", "label": "copy", "name": "copyLFE" },
-            { "type": "builtin", "label": "convolver", "name": "convFL_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 0 } },
-            { "type": "builtin", "label": "convolver", "name": "convFL_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 1 } },
-            { "type": "builtin", "label": "convolver", "name": "convSL_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 2 } },
-            { "type": "builtin", "label": "convolver", "name": "convSL_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 3 } },
-            { "type": "builtin", "label": "convolver", "name": "convRL_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 4 } },
-            { "type": "builtin", "label": "convolver", "name": "convRL_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 5 } },
-            { "type": "builtin", "label": "convolver", "name": "convFC_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 6 } },
-            { "type": "builtin", "label": "convolver", "name": "convFR_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 7 } },
-            { "type": "builtin", "label": "convolver", "name": "convFR_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 8 } },
-            { "type": "builtin", "label": "convolver", "name": "convSR_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 9 } },
-            { "type": "builtin", "label": "convolver", "name": "convSR_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 10 } },
-            { "type": "builtin", "label": "convolver", "name": "convRR_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 11 } },
-            { "type": "builtin", "label": "convolver", "name": "convRR_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 12 } },
-            { "type": "builtin", "label": "convolver", "name": "convFC_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 13 } },
-            { "type": "builtin", "label": "convolver", "name": "convLFE_L", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 6 } },
-            { "type": "builtin", "label": "convolver", "name": "convLFE_R", "config": { "filename": "${HOME:?}/.config/pipewire/hrir.wav", "channel": 13 } },
+            { "type": "builtin", "label": "linear", "name": "gainFL", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainFR", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainFC", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainRL", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainRR", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainSL", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainSR", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainLFE", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "convolver", "name": "convFL_L", "config": { $(hrir_convolver_config 0) } },
+            { "type": "builtin", "label": "convolver", "name": "convFL_R", "config": { $(hrir_convolver_config 1) } },
+            { "type": "builtin", "label": "convolver", "name": "convSL_L", "config": { $(hrir_convolver_config 2) } },
+            { "type": "builtin", "label": "convolver", "name": "convSL_R", "config": { $(hrir_convolver_config 3) } },
+            { "type": "builtin", "label": "convolver", "name": "convRL_L", "config": { $(hrir_convolver_config 4) } },
+            { "type": "builtin", "label": "convolver", "name": "convRL_R", "config": { $(hrir_convolver_config 5) } },
+            { "type": "builtin", "label": "convolver", "name": "convFC_L", "config": { $(hrir_convolver_config 6) } },
+            { "type": "builtin", "label": "convolver", "name": "convFR_R", "config": { $(hrir_convolver_config 7) } },
+            { "type": "builtin", "label": "convolver", "name": "convFR_L", "config": { $(hrir_convolver_config 8) } },
+            { "type": "builtin", "label": "convolver", "name": "convSR_R", "config": { $(hrir_convolver_config 9) } },
+            { "type": "builtin", "label": "convolver", "name": "convSR_L", "config": { $(hrir_convolver_config 10) } },
+            { "type": "builtin", "label": "convolver", "name": "convRR_R", "config": { $(hrir_convolver_config 11) } },
+            { "type": "builtin", "label": "convolver", "name": "convRR_L", "config": { $(hrir_convolver_config 12) } },
+            { "type": "builtin", "label": "convolver", "name": "convFC_R", "config": { $(hrir_convolver_config 13) } },
+            { "type": "builtin", "label": "convolver", "name": "convLFE_L", "config": { $(hrir_convolver_config 6) } },
+            { "type": "builtin", "label": "convolver", "name": "convLFE_R", "config": { $(hrir_convolver_config 13) } },
             { "type": "builtin", "label": "mixer", "name": "mixL" },
             { "type": "builtin", "label": "mixer", "name": "mixR" }
         ],
         "links": [
-            { "output": "copyFL:Out", "input": "convFL_L:In" },
-            { "output": "copyFL:Out", "input": "convFL_R:In" },
-            { "output": "copySL:Out", "input": "convSL_L:In" },
-            { "output": "copySL:Out", "input": "convSL_R:In" },
-            { "output": "copyRL:Out", "input": "convRL_L:In" },
-            { "output": "copyRL:Out", "input": "convRL_R:In" },
-            { "output": "copyFC:Out", "input": "convFC_L:In" },
-            { "output": "copyFR:Out", "input": "convFR_R:In" },
-            { "output": "copyFR:Out", "input": "convFR_L:In" },
-            { "output": "copySR:Out", "input": "convSR_R:In" },
-            { "output": "copySR:Out", "input": "convSR_L:In" },
-            { "output": "copyRR:Out", "input": "convRR_R:In" },
-            { "output": "copyRR:Out", "input": "convRR_L:In" },
-            { "output": "copyFC:Out", "input": "convFC_R:In" },
-            { "output": "copyLFE:Out", "input": "convLFE_L:In" },
-            { "output": "copyLFE:Out", "input": "convLFE_R:In" },
+            { "output": "gainFL:Out", "input": "convFL_L:In" },
+            { "output": "gainFL:Out", "input": "convFL_R:In" },
+            { "output": "gainSL:Out", "input": "convSL_L:In" },
+            { "output": "gainSL:Out", "input": "convSL_R:In" },
+            { "output": "gainRL:Out", "input": "convRL_L:In" },
+            { "output": "gainRL:Out", "input": "convRL_R:In" },
+            { "output": "gainFC:Out", "input": "convFC_L:In" },
+            { "output": "gainFR:Out", "input": "convFR_R:In" },
+            { "output": "gainFR:Out", "input": "convFR_L:In" },
+            { "output": "gainSR:Out", "input": "convSR_R:In" },
+            { "output": "gainSR:Out", "input": "convSR_L:In" },
+            { "output": "gainRR:Out", "input": "convRR_R:In" },
+            { "output": "gainRR:Out", "input": "convRR_L:In" },
+            { "output": "gainFC:Out", "input": "convFC_R:In" },
+            { "output": "gainLFE:Out", "input": "convLFE_L:In" },
+            { "output": "gainLFE:Out", "input": "convLFE_R:In" },
             { "output": "convFL_L:Out", "input": "mixL:In 1", "gain": "${mix_gain_db:?}" },
             { "output": "convFL_R:Out", "input": "mixR:In 1", "gain": "${mix_gain_db:?}" },
             { "output": "convSL_L:Out", "input": "mixL:In 2", "gain": "${mix_gain_db:?}" },
@@ -157,7 +184,7 @@ filter_module_convolver_args_8=$(
             { "output": "convLFE_R:Out", "input": "mixR:In 8", "gain": "${mix_gain_db:?}" },
             { "output": "convLFE_L:Out", "input": "mixL:In 8", "gain": "${mix_gain_db:?}" }
         ],
-        "inputs":  [ "copyFL:In", "copyFR:In", "copyFC:In", "copyLFE:In", "copyRL:In", "copyRR:In", "copySL:In", "copySR:In" ],
+        "inputs":  [ "gainFL:In", "gainFR:In", "gainFC:In", "gainLFE:In", "gainRL:In", "gainRR:In", "gainSL:In", "gainSR:In" ],
         "outputs": [ "mixL:Out", "mixR:Out" ]
     },
     capture.props = {
@@ -297,10 +324,26 @@ filter_module_sofa_args_8=$(
                     "Radius": 3.0
                 }
             },
+            { "type": "builtin", "label": "linear", "name": "gainFL", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainFR", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainFC", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainLFE", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainRL", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainRR", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainSL", "control": { "Mult": 1.0 } },
+            { "type": "builtin", "label": "linear", "name": "gainSR", "control": { "Mult": 1.0 } },
             { "type": "builtin", "label": "mixer", "name": "mixL" },
             { "type": "builtin", "label": "mixer", "name": "mixR" }
         ],
         "links": [
+            { "output": "gainFL:Out", "input": "spFL:In" },
+            { "output": "gainFR:Out", "input": "spFR:In" },
+            { "output": "gainFC:Out", "input": "spFC:In" },
+            { "output": "gainLFE:Out", "input": "spLFE:In" },
+            { "output": "gainRL:Out", "input": "spRL:In" },
+            { "output": "gainRR:Out", "input": "spRR:In" },
+            { "output": "gainSL:Out", "input": "spSL:In" },
+            { "output": "gainSR:Out", "input": "spSR:In" },
             { "output": "spFL:Out L", "input": "mixL:In 1" },
             { "output": "spFL:Out R", "input": "mixR:In 1" },
             { "output": "spFR:Out L", "input": "mixL:In 2" },
@@ -318,7 +361,7 @@ filter_module_sofa_args_8=$(
             { "output": "spLFE:Out L", "input": "mixL:In 8" },
             { "output": "spLFE:Out R", "input": "mixR:In 8" }
         ],
-        "inputs":  [ "spFL:In", "spFR:In", "spFC:In", "spLFE:In", "spRL:In", "spRR:In", "spSL:In", "spSR:In" ],
+        "inputs":  [ "gainFL:In", "gainFR:In", "gainFC:In", "gainLFE:In", "gainRL:In", "gainRR:In", "gainSL:In", "gainSR:In" ],
         "outputs": [ "mixL:Out", "mixR:Out" ]
     },
     capture.props = {
@@ -421,6 +464,68 @@ reset_default_sink() {
     fi
 }
 
+current_time_ms() {
+    date +%s%3N
+}
+
+process_rss_kb() {
+    # Resident memory of a process as reported by the kernel, or "?" if it has gone
+    awk '/^VmRSS:/ {print $2; found=1} END {if (!found) print "?"}' "/proc/${1:?}/status" 2>/dev/null || echo "?"
+}
+
+wait_for_ports_registration() {
+    # Usage: wait_for_ports_registration <timeout_seconds> <port> [<port>...]
+    # Watches PipeWire port registrations with 'pw-link -m' and returns as soon as every listed port exists.
+    local timeout_seconds="$1"
+    shift
+    local -A pending_ports=()
+    local port
+    for port in "$@"; do
+        pending_ports["${port}"]=1
+    done
+    local monitor_fd
+    local monitor_pid
+    exec {monitor_fd}< <(exec timeout "${timeout_seconds}" pw-link -m 2>/dev/null)
+    monitor_pid=$!
+    local line
+    while [[ ${#pending_ports[@]} -gt 0 ]] && IFS= read -r -u "${monitor_fd}" line; do
+        line="${line%"${line##*[![:space:]]}"}"
+        case "${line}" in
+        "- "*)
+            continue
+            ;;
+        "+ "* | "= "*)
+            line="${line:2}"
+            ;;
+        esac
+        line="${line#"${line%%[![:space:]]*}"}"
+        if [[ -n "${pending_ports["${line}"]:-}" ]]; then
+            unset 'pending_ports["${line}"]'
+        fi
+    done
+    kill -TERM "${monitor_pid}" >/dev/null 2>&1 || true
+    exec {monitor_fd}<&-
+    [[ ${#pending_ports[@]} -eq 0 ]]
+}
+
+filter_module_expected_ports() {
+    local ch
+    for ch in FL FR FC LFE RL RR SL SR; do
+        echo "${virtual_surround_filter_sink_capture_node_name:?}:playback_${ch}"
+    done
+    for ch in FL FR; do
+        echo "${virtual_surround_filter_sink_playback_node_name:?}:output_${ch}"
+    done
+}
+
+device_module_expected_ports() {
+    local ch
+    for ch in FL FR FC LFE RL RR SL SR; do
+        echo "${virtual_surround_device_sink_capture_node_name:?}:playback_${ch}"
+        echo "${virtual_surround_device_sink_playback_node_name:?}:output_${ch}"
+    done
+}
+
 cleanup_virtual_surround_module() {
     local running_pid=""
     local terminated=""
@@ -445,6 +550,7 @@ cleanup_virtual_surround_module() {
 
 create_virtual_surround_module() {
     local filter_type="${1:-convolver}"
+    local detach="${2:-false}"
     local channel_count="8"
     local module_args="${filter_module_convolver_args_8}"
     if [[ "${filter_type}" == "sofa" ]]; then
@@ -454,21 +560,105 @@ create_virtual_surround_module() {
     cleanup_virtual_surround_module
 
     echo "Creating and loading module libpipewire-module-filter-chain (${filter_type:?}) with ${channel_count:?} channels - ${virtual_surround_filter_sink_capture_node_name:?}"
-    pw-cli -m load-module libpipewire-module-filter-chain "${module_args:?}" &
+    local start_ms
+    start_ms=$(current_time_ms)
+    local -a expected_ports
+    mapfile -t expected_ports < <(filter_module_expected_ports)
+    if [[ "${detach}" == "true" ]]; then
+        # Detached instances outlive this script. They are cleaned up with 'unload-instance' or when the service stops.
+        setsid pw-cli -m load-module libpipewire-module-filter-chain "${module_args:?}" >/dev/null 2>&1 </dev/null &
+    else
+        pw-cli -m load-module libpipewire-module-filter-chain "${module_args:?}" &
+    fi
     virtual_surround_filter_sink_pw_cli_pid=$!
     echo "${virtual_surround_filter_sink_pw_cli_pid:?}" >"${filter_module_pid_file:?}"
-    sleep 1 # <- sleep for a second to ensure everything is loaded before linking
 
+    if ! wait_for_ports_registration "${module_ready_timeout_seconds:?}" "${expected_ports[@]}"; then
+        echo "WARNING! Ports for '${virtual_surround_filter_sink_capture_node_name:?}' were not registered within ${module_ready_timeout_seconds:?}s."
+    fi
     if ! wait_for_sink_registration "${virtual_surround_filter_sink_capture_node_name:?}" 40 0.25; then
         echo "ERROR! Unable to detect sink '${virtual_surround_filter_sink_capture_node_name:?}' after loading module."
         cleanup_virtual_surround_module
         return 1
     fi
 
-    echo "Created filter-chain sink '${virtual_surround_filter_sink_capture_node_name:?}' (pid ${virtual_surround_filter_sink_pw_cli_pid:?})"
+    local ready_ms=$(($(current_time_ms) - start_ms))
+    echo "Created filter-chain sink '${virtual_surround_filter_sink_capture_node_name:?}' (pid ${virtual_surround_filter_sink_pw_cli_pid:?}) - ready in ${ready_ms}ms"
+    if [[ "${filter_type}" == "convolver" ]]; then
+        local ir_source="multichannel file '${hrir_wav_path:?}'"
+        if [[ -n "${hrir_split_directory}" ]]; then
+            ir_source="per-channel files in '${hrir_split_directory:?}'"
+        fi
+        echo "Filter-chain load stats: ready ${ready_ms}ms, VmRSS $(process_rss_kb "${virtual_surround_filter_sink_pw_cli_pid:?}") kB, IR from ${ir_source}"
+    fi
+    return 0
+}
+
+cleanup_filter_instances() {
+    local instance_pid_file
+    for instance_pid_file in "${XDG_RUNTIME_DIR:?}"/vss-filter-*.pid; do
+        [[ -f "${instance_pid_file}" ]] || continue
+        local instance_pid
+        instance_pid=$(cat "${instance_pid_file}" 2>/dev/null || true)
+        if [[ -n "${instance_pid}" ]]; then
+            kill -TERM "${instance_pid}" >/dev/null 2>&1 || true
+        fi
+        rm -f "${instance_pid_file}" >/dev/null 2>&1 || true
+    done
+}
+
+load_filter_instance() {
+    if [[ -z "${VIRTUAL_SURROUND_SINK_SUFFIX:-}" ]]; then
+        echo "ERROR! VIRTUAL_SURROUND_SINK_SUFFIX must be set to load a filter instance."
+        exit 1
+    fi
+    if [[ ! -f "${hrir_wav_path:?}" ]]; then
+        echo "ERROR! HRIR file '${hrir_wav_path:?}' does not exist."
+        exit 1
+    fi
+    if ! create_virtual_surround_module "convolver" "true"; then
+        exit 1
+    fi
+    if [[ -n "${VIRTUAL_SURROUND_TARGET_SINK:-}" ]]; then
+        link_filter_instance_output || true
+    fi
+    print_vss_info
+}
+
+link_filter_instance_output() {
+    # Links a suffixed instance's output to the sink named by VIRTUAL_SURROUND_TARGET_SINK, dropping any other links
+    if [[ -z "${VIRTUAL_SURROUND_SINK_SUFFIX:-}" || -z "${VIRTUAL_SURROUND_TARGET_SINK:-}" ]]; then
+        echo "ERROR! VIRTUAL_SURROUND_SINK_SUFFIX and VIRTUAL_SURROUND_TARGET_SINK must be set to link a filter instance."
+        return 1
+    fi
+    if ! snapshot_port_links; then
+        echo "Unable to list PipeWire ports and links"
+        return 1
+    fi
+    local ch
+    for ch in FL FR; do
+        local instance_output_port="${virtual_surround_filter_sink_playback_node_name:?}:output_${ch}"
+        local target_input_port="${VIRTUAL_SURROUND_TARGET_SINK:?}:playback_${ch}"
+        if ! port_exists_in_snapshot "${instance_output_port}" || ! port_exists_in_snapshot "${target_input_port}"; then
+            echo "Skipping ${instance_output_port} -> ${target_input_port}: port missing"
+            continue
+        fi
+        if ! apply_port_link "${instance_output_port}" "${target_input_port}"; then
+            return 1
+        fi
+    done
     return 0
 }
 
+unload_filter_instance() {
+    if [[ -z "${VIRTUAL_SURROUND_SINK_SUFFIX:-}" ]]; then
+        echo "ERROR! VIRTUAL_SURROUND_SINK_SUFFIX must be set to unload a filter instance."
+        exit 1
+    fi
+    echo "Unloading filter instance '${virtual_surround_filter_sink_capture_node_name:?}'"
+    cleanup_virtual_surround_module
+}
+
 cleanup_virtual_surround_default_sink() {
     local running_pid=""
     local terminated=""
@@ -498,52 +688,88 @@ create_virtual_surround_default_sink() {
     cleanup_virtual_surround_default_sink
 
     echo "Creating and loading module libpipewire-module-filter-chain with ${channel_count:?} channels - ${virtual_surround_device_sink_capture_node_name:?}"
+    local start_ms
+    start_ms=$(current_time_ms)
+    local -a expected_ports
+    mapfile -t expected_ports < <(device_module_expected_ports)
     pw-cli -m load-module libpipewire-module-filter-chain "${module_args:?}" &
     virtual_surround_device_sink_pw_cli_pid=$!
     echo "${virtual_surround_device_sink_pw_cli_pid:?}" >"${device_module_pid_file:?}"
-    sleep 1 # <- sleep for a second to ensure everything is loaded before linking
 
+    if ! wait_for_ports_registration "${module_ready_timeout_seconds:?}" "${expected_ports[@]}"; then
+        echo "WARNING! Ports for '${virtual_surround_device_sink_capture_node_name:?}' were not registered within ${module_ready_timeout_seconds:?}s."
+    fi
     if ! wait_for_sink_registration "${virtual_surround_device_sink_capture_node_name:?}" 40 0.25; then
         echo "ERROR! Unable to detect sink '${virtual_surround_device_sink_capture_node_name:?}' after loading module."
         cleanup_virtual_surround_default_sink
         return 1
     fi
 
-    echo "Created filter-chain sink '${virtual_surround_device_sink_capture_node_name:?}' (pid ${virtual_surround_device_sink_pw_cli_pid:?})"
+    echo "Created filter-chain sink '${virtual_surround_device_sink_capture_node_name:?}' (pid ${virtual_surround_device_sink_pw_cli_pid:?}) - ready in $(($(current_time_ms) - start_ms))ms"
     return 0
 }
 
-link_ports() {
+# Populated by snapshot_port_links(). Ports come from `pw-link -o` and `pw-link -i`, since `pw-link -l` only lists
+# ports that already have links; only the links are taken from the `pw-link -l` listing.
+declare -A port_link_snapshot_ports=()
+declare -A port_link_snapshot_links=()
+
+snapshot_port_links() {
+    port_link_snapshot_ports=()
+    port_link_snapshot_links=()
+    local ports
+    local listing
+    if ! ports=$(pw-link -o 2>/dev/null && pw-link -i 2>/dev/null) || ! listing=$(pw-link -l 2>/dev/null); then
+        return 1
+    fi
+    local line
+    while IFS= read -r line; do
+        line="${line#"${line%%[![:space:]]*}"}"
+        line="${line%"${line##*[![:space:]]}"}"
+        if [[ -n "${line}" ]]; then
+            port_link_snapshot_ports["${line}"]=1
+        fi
+    done <<<"${ports}"
+    local current_port=""
+    local link_pattern='^[[:space:]]*\|->[[:space:]]*(.*)$'
+    while IFS= read -r line; do
+        line="${line%"${line##*[![:space:]]}"}"
+        if [[ "${line}" =~ ${link_pattern} ]]; then
+            if [[ -n "${current_port}" ]]; then
+                port_link_snapshot_links["${current_port}"]+="${BASH_REMATCH[1]}"$'\n'
+            fi
+            continue
+        fi
+        if [[ "${line}" =~ ^[[:space:]]*\| ]]; then
+            continue
+        fi
+        current_port="${line#"${line%%[![:space:]]*}"}"
+    done <<<"${listing}"
+    return 0
+}
+
+port_exists_in_snapshot() {
+    [[ -n "${port_link_snapshot_ports["$1"]:-}" ]]
+}
+
+apply_port_link() {
     local output_port="$1"
     local input_port="$2"
     local result
-    local existing_inputs
-    existing_inputs=$(pw-link -l 2>/dev/null | awk -v target="${output_port}" '
-        BEGIN {record = 0}
-        {
-            line = $0
-            gsub(/^[[:space:]]+|[[:space:]]+$/, "", line)
-            if (line == target) {
-                record = 1
-                next
-            }
-            if (record) {
-                if (line ~ /^\|[-<]>/) {
-                    sub(/^\|[-<]>[[:space:]]*/, "", line)
-                    print line
-                    next
-                }
-                if (line !~ /^\|/) {
-                    record = 0
-                }
-            }
-        }
-    ')
-    for existing in ${existing_inputs}; do
-        if [[ -n "${existing}" && "${existing}" != "${input_port}" ]]; then
-            pw-link -d "${output_port}" "${existing}" >/dev/null 2>&1 || true
+    local existing
+    local already_linked="false"
+    while IFS= read -r existing; do
+        [[ -z "${existing}" ]] && continue
+        if [[ "${existing}" == "${input_port}" ]]; then
+            already_linked="true"
+            continue
         fi
-    done
+        echo "Unlinking stray ${output_port} -> ${existing}"
+        pw-link -d "${output_port}" "${existing}" >/dev/null 2>&1 || true
+    done <<<"${port_link_snapshot_links["${output_port}"]:-}"
+    if [[ "${already_linked}" == "true" ]]; then
+        return 0
+    fi
     if result=$(pw-link -w "${output_port}" "${input_port}" 2>&1); then
         echo "Linking ${output_port} -> ${input_port}"
         return 0
@@ -603,25 +829,26 @@ link_virtual_surround_chain() {
         return 1
     fi
 
-    local output_ports
-    local input_ports
-    output_ports=$(pw-link -o 2>/dev/null | sed 's/[[:space:]]*$//')
-    input_ports=$(pw-link -i 2>/dev/null | sed 's/[[:space:]]*$//')
+    # Take one snapshot of every port and link, then only apply the difference against the desired layout
+    if ! snapshot_port_links; then
+        echo "Unable to list PipeWire ports and links"
+        return 1
+    fi
 
     for ch in "${channels[@]}"; do
         local device_output_port="${default_output_prefix}${ch}"
         local surround_input_port="${surround_input_prefix}${ch}"
 
-        if ! grep -Fxq -- "${device_output_port}" <<<"${output_ports}"; then
+        if ! port_exists_in_snapshot "${device_output_port}"; then
             echo "Skipping ${device_output_port} -> ${surround_input_port}: device output port missing"
             continue
         fi
-        if ! grep -Fxq -- "${surround_input_port}" <<<"${input_ports}"; then
+        if ! port_exists_in_snapshot "${surround_input_port}"; then
             echo "Skipping ${device_output_port} -> ${surround_input_port}: filter input port missing"
             continue
         fi
 
-        if ! link_ports "${device_output_port}" "${surround_input_port}"; then
+        if ! apply_port_link "${device_output_port}" "${surround_input_port}"; then
             return 1
         fi
     done
@@ -632,19 +859,37 @@ link_virtual_surround_chain() {
         local surround_output_port="${surround_output_prefix}${ch}"
         local target_input_port="${target_input_prefix}${ch}"
 
-        if ! grep -Fxq -- "${surround_output_port}" <<<"${output_ports}"; then
+        if ! port_exists_in_snapshot "${surround_output_port}"; then
             echo "Skipping ${surround_output_port} -> ${target_input_port}: filter output port missing"
             continue
         fi
-        if ! grep -Fxq -- "${target_input_port}" <<<"${input_ports}"; then
+        if ! port_exists_in_snapshot "${target_input_port}"; then
             echo "Skipping ${surround_output_port} -> ${target_input_port}: target sink input port missing"
             continue
         fi
-        if ! link_ports "${surround_output_port}" "${target_input_port}"; then
+        if ! apply_port_link "${surround_output_port}" "${target_input_port}"; then
             echo "Failed"
             return 1
         fi
     done
+
+    # Link any suffixed filter instances (per-app HRIR presets) to the same target sink.
+    # Per-device instances (vss-filter-dev-*) stay linked to their own device.
+    local instance_pid_file
+    for instance_pid_file in "${XDG_RUNTIME_DIR:?}"/vss-filter-*.pid; do
+        [[ -f "${instance_pid_file}" ]] || continue
+        [[ "$(basename "${instance_pid_file}")" == vss-filter-dev-* ]] && continue
+        local instance_output_prefix
+        instance_output_prefix="output.$(basename "${instance_pid_file}" .pid):output_"
+        for ch in "${target_channels[@]}"; do
+            local instance_output_port="${instance_output_prefix}${ch}"
+            local target_input_port="${target_input_prefix}${ch}"
+            if ! port_exists_in_snapshot "${instance_output_port}" || ! port_exists_in_snapshot "${target_input_port}"; then
+                continue
+            fi
+            apply_port_link "${instance_output_port}" "${target_input_port}" || true
+        done
+    done
     return 0
 }
 
@@ -682,6 +927,7 @@ virtual_surround_sinks_exist() {
 kill_all_running_instances() {
     cleanup_virtual_surround_module
     cleanup_virtual_surround_default_sink
+    cleanup_filter_instances
     running_pids=$(ps aux | grep -i "pw-cli -m load-module" | grep -v grep | grep "${virtual_surround_filter_sink_node_name:?}" | awk '{print $2}')
     if [ -n "${running_pids}" ]; then
         kill -TERM ${running_pids}
@@ -696,6 +942,8 @@ is_pid_running() {
 run() {
     trap '_handle_signal' INT QUIT HUP TERM ERR
     echo "Running service"
+    local service_start_ms
+    service_start_ms=$(current_time_ms)
     local filter_type="convolver"
     while [[ $# -gt 0 ]]; do
         case "$1" in
@@ -734,8 +982,8 @@ run() {
     fi
 
     local linking_failed=0
+    local linked_once="false"
     while true; do
-        sleep 1
         if ! is_pid_running "${virtual_surround_filter_sink_pw_cli_pid}" || ! is_pid_running "${virtual_surround_device_sink_pw_cli_pid}"; then
             break
         fi
@@ -748,6 +996,11 @@ run() {
             linking_failed=1
             break
         fi
+        if [[ "${linked_once}" == "false" ]]; then
+            linked_once="true"
+            echo "Virtual surround chain linked - ready in $(($(current_time_ms) - service_start_ms))ms after service start"
+        fi
+        sleep 1
     done
 
     cleanup_virtual_surround_default_sink
@@ -764,6 +1017,7 @@ run() {
 speaker_test() {
     echo "Running sound test"
     local pulse_sink_name="${virtual_surround_filter_sink_capture_node_name:?}"
+    local test_file=""
     while [[ $# -gt 0 ]]; do
         case "$1" in
         --sink=*)
@@ -773,6 +1027,13 @@ speaker_test() {
             shift
             pulse_sink_name="$1"
             ;;
+        --file=*)
+            test_file="${1#*=}"
+            ;;
+        --file)
+            shift
+            test_file="$1"
+            ;;
         *)
             echo "Invalid arg: $1"
             print_usage_and_exit 1
@@ -781,12 +1042,39 @@ speaker_test() {
         shift
     done
 
+    if [[ -n "${test_file}" ]]; then
+        # Play a pre-rendered 7.1 identification signal in one shot
+        if [[ ! -f "${test_file}" ]]; then
+            echo "ERROR! Sound test file '${test_file}' does not exist."
+            return 1
+        fi
+        if command -v pw-play &>/dev/null; then
+            pw-play --target "${pulse_sink_name:?}" --channel-map "FL,FR,FC,LFE,RL,RR,SL,SR" "${test_file}"
+        else
+            paplay --device="${pulse_sink_name:?}" \
+                --channel-map="front-left,front-right,front-center,lfe,rear-left,rear-right,side-left,side-right" \
+                "${test_file}"
+        fi
+        return $?
+    fi
+
     for i in {0..6}; do
         speaker-test -D "pulse:${pulse_sink_name:?}" -c 8 -t wave -s $((i + 1))
     done
     speaker-test -D "pulse:${pulse_sink_name:?}" -c 8 -t sine -f 50 -s 8
 }
 
+content_hash() {
+    # Hash content exactly as it is written to disk with echo (including the trailing newline)
+    printf '%s\n' "$1" | sha256sum | cut -d' ' -f1
+}
+
+file_hash() {
+    if [[ -f "$1" ]]; then
+        sha256sum <"$1" | cut -d' ' -f1
+    fi
+}
+
 install_service() {
     echo "Installing service: ${service_name:?}"
     local install_filter_type="convolver"
@@ -821,18 +1109,34 @@ install_service() {
     echo "  - Ensure directory and all contents is RW by the user"
     chmod 755 "${HOME:?}/.config/pipewire"
     chmod u+rw -R "${HOME:?}/.config/pipewire"
-    echo "  - Installing run wrapper script: ${run_script:?}"
-    echo "${run_script_contents:?}" >"${run_script:?}"
+    if [[ "$(content_hash "${run_script_contents:?}")" != "$(file_hash "${run_script:?}")" ]]; then
+        echo "  - Installing run wrapper script: ${run_script:?}"
+        echo "${run_script_contents:?}" >"${run_script:?}"
+    else
+        echo "  - Run wrapper script is up to date: ${run_script:?}"
+    fi
     chmod +x "${run_script:?}"
-    echo "  - Installing systemd unit: ${service_file:?}"
-    echo "${service_config:?}" >"${service_file:?}"
-    echo "  - Exec daemon-reload"
-    systemctl --user daemon-reload
-    echo "  - Enabling systemd unit"
-    systemctl --user enable --now "${service_name:?}"
+    if [[ "$(content_hash "${service_config:?}")" != "$(file_hash "${service_file:?}")" ]]; then
+        echo "  - Installing systemd unit: ${service_file:?}"
+        mkdir -p "$(dirname "${service_file:?}")"
+        echo "${service_config:?}" >"${service_file:?}"
+        echo "  - Exec daemon-reload"
+        systemctl --user daemon-reload
+    else
+        echo "  - Systemd unit is up to date: ${service_file:?}"
+    fi
+    if ! systemctl --user is-enabled --quiet "${service_name:?}" >/dev/null 2>&1; then
+        echo "  - Enabling systemd unit"
+        systemctl --user enable --now "${service_name:?}"
+    else
+        echo "  - Systemd unit is already enabled"
+    fi
     local start_cmd="start"
     if [[ "${restart_after_install:-}" == "true" ]]; then
         start_cmd="restart"
+    elif systemctl --user is-active --quiet "${service_name:?}" >/dev/null 2>&1; then
+        echo "Systemd service installed and already running."
+        return 0
     fi
     echo "  - Now ${start_cmd:?}ing systemd service"
     systemctl --user ${start_cmd:?} "${service_name:?}"
@@ -883,13 +1187,14 @@ stop_service() {
 }
 
 print_usage_and_exit() {
-    echo "Usage: $0 {run|install|uninstall|restart|stop|kill-all|print-vss-info} [--filter=<convolver|sofa>] [additional args...]"
+    echo "Usage: $0 {run|install|uninstall|restart|stop|kill-all|print-vss-info|load-instance|unload-instance|link-instance} [--filter=<convolver|sofa>] [additional args...]"
     exit "$1"
 }
 
 print_vss_info() {
     printf 'VSS Filter Node Name: %s\n' "${virtual_surround_filter_sink_node_name:?}"
     printf 'VSS Filter Capture Name: %s\n' "${virtual_surround_filter_sink_capture_node_name:?}"
+    printf 'VSS Filter Playback Name: %s\n' "${virtual_surround_filter_sink_playback_node_name:?}"
     printf 'VSS Device Node Name: %s\n' "${virtual_surround_device_sink_node_name:?}"
     printf 'VSS Device Capture Name: %s\n' "${virtual_surround_device_sink_capture_node_name:?}"
 }
@@ -934,6 +1239,15 @@ case "$cmd" in
 "print-vss-info")
     print_vss_info
     ;;
+"load-instance")
+    load_filter_instance
+    ;;
+"unload-instance")
+    unload_filter_instance
+    ;;
+"link-instance")
+    link_filter_instance_output
+    ;;
 *)
     echo "Invalid command: $cmd"
     print_usage_and_exit 1
@@ -1,16 +1,35 @@
 import argparse
+import array
 import asyncio
 import asyncio.subprocess
+import base64
+import bisect
+import codecs
+import concurrent.futures
+import collections
 import contextlib
+import contextvars
 import datetime
+import difflib
+import fnmatch
+import functools
+import gzip
 from collections.abc import Awaitable, Callable
+import hashlib
+import inspect
+import itertools
 import json
 import logging
+import math
 import os
 import random
 import re
 import shutil
+import signal
+import struct
+import tempfile
 import threading
+import zipfile
 import time
 import sys
 
@@ -103,129 +122,3400 @@ except ModuleNotFoundError:
         def migrate_runtime(self, *_args, **_kwargs):
             self.logger.debug("Skipping decky.migrate_runtime in CLI mode")
 
+        async def emit(self, *_args, **_kwargs):
+            self.logger.debug("Skipping decky.emit in CLI mode")
+
     decky = _DummyDecky()
 
-try:
-    from settings import SettingsManager  # type: ignore
-except ModuleNotFoundError:
+try:
+    from settings import SettingsManager  # type: ignore
+except ModuleNotFoundError:
+
+    class SettingsManager:
+        """Simple JSON-backed settings manager for CLI mode."""
+
+        def __init__(self, name: str, settings_directory: str | None = None):
+            self.name = name
+            self.settings_directory = settings_directory
+            self.path = os.path.join(self.settings_directory, ".plugin-config.json")
+            self.settings: dict[str, object] = {}
+
+        def read(self):
+            try:
+                with open(self.path, "r", encoding="utf-8") as infile:
+                    self.settings = json.load(infile)
+            except FileNotFoundError:
+                self.settings = {}
+            except json.JSONDecodeError:
+                self.settings = {}
+
+        def commit(self):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as outfile:
+                json.dump(self.settings, outfile, indent=2)
+
+        def getSetting(self, key, default=None):
+            return self.settings.get(key, default)
+
+        def setSetting(self, key, value):
+            self.settings[key] = value
+            self.commit()
+
+
+class SettingsStore:
+    """
+    Wraps a SettingsManager so that reads only re-parse the settings file when its mtime or size has changed,
+    and writes are coalesced and flushed atomically (temp file + rename) off the event loop.
+
+    Settings stay dirty until the write of the latest change has replaced the file, so a read() while a flush is in
+    progress never reloads the old file over newer in-memory changes.
+    """
+
+    # Mode of a newly created settings file. Existing files keep their mode.
+    FILE_MODE = 0o644
+
+    def __init__(self, manager: SettingsManager, flush_delay: float = 0.5):
+        self._manager = manager
+        self._flush_delay = flush_delay
+        self._file_signature: tuple[int, int] | None = None
+        self._dirty = False
+        # Incremented on every change, so a flush only marks the settings clean if nothing changed while it wrote
+        self._generation = 0
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._manager.path
+
+    def _stat_signature(self) -> tuple[int, int] | None:
+        try:
+            stat_result = os.stat(self.path)
+        except OSError:
+            return None
+        return stat_result.st_mtime_ns, stat_result.st_size
+
+    def read(self):
+        if self._dirty:
+            # Pending local changes are newer than anything on disk.
+            return
+        signature = self._stat_signature()
+        if signature is not None and signature == self._file_signature:
+            return
+        self._manager.read()
+        self._file_signature = signature
+
+    def getSetting(self, key, default=None):
+        return self._manager.getSetting(key, default)
+
+    def snapshot(self) -> dict:
+        """Returns a deep copy of the current settings."""
+        return json.loads(self._serialize())
+
+    def load_snapshot(self, values: dict):
+        """Replaces all settings with a snapshot and writes it out immediately."""
+        self._manager.settings = json.loads(json.dumps(values))
+        self._generation += 1
+        self._write_atomic(self._serialize())
+        self._dirty = False
+
+    def setSetting(self, key, value):
+        self._manager.settings[key] = value
+        self._dirty = True
+        self._generation += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to defer the write to (plain CLI usage). Write immediately.
+            self._write_atomic(self._serialize())
+            self._dirty = False
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        # The loop only keeps weak references to tasks, so hold on to the flush until it is done
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self):
+        """Write any pending changes to disk."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # Flushes are serialized so an older write can never replace the file after a newer one
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            generation = self._generation
+            contents = self._serialize()
+            try:
+                await asyncio.to_thread(self._write_atomic, contents)
+            except OSError as e:
+                decky.logger.error("Failed to write settings file %s: %s", self.path, e)
+                return
+            if generation == self._generation:
+                self._dirty = False
+
+    def _serialize(self) -> str:
+        return json.dumps(self._manager.settings, indent=4, ensure_ascii=False)
+
+    def _write_atomic(self, contents: str):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            mode = os.stat(self.path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = self.FILE_MODE
+        fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+        try:
+            # mkstemp creates the file as 0600; keep the mode of the file being replaced
+            os.fchmod(fd, mode)
+            with os.fdopen(fd, "w", encoding="utf-8") as outfile:
+                outfile.write(contents)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        self._file_signature = self._stat_signature()
+
+
+# Read settings
+settings = SettingsStore(SettingsManager(name="settings", settings_directory=settings_dir))
+settings.read()
+
+# Configure other plugin files and directories
+hrir_directory = os.path.join(script_directory, "hrir-audio")
+default_hrir_file = "HRTF from Aureal Vortex 2 - WIP v2.wav"
+pipewire_config_path = os.path.join(os.path.expanduser("~"), ".config", "pipewire")
+hrir_dest_path = os.path.join(pipewire_config_path, "hrir.wav")
+sofa_directory = os.path.join(script_directory, "hrtf-sofa")
+sofa_dest_path = os.path.join(pipewire_config_path, "hrir.sofa")
+hrir_split_directory = os.path.join(pipewire_config_path, "hrir-split")
+wireplumber_rules_path = os.path.join(
+    os.path.expanduser("~"), ".config", "wireplumber", "wireplumber.conf.d", "90-virtual-surround-sound.conf"
+)
+library_directory = os.path.join(settings_dir, "library")
+
+
+def subprocess_exec_env():
+    uid = os.getuid()
+    if uid not in (1000, 1001):
+        decky.logger.warning("Attempting to run subprocess as uid %s. Looks like something is going wrong here.", uid)
+    allowed_keys = [
+        "DBUS_SESSION_BUS_ADDRESS", "HOME", "LANG", "PATH", "SHELL", "USER",
+        "XDG_DATA_DIRS", "XDG_RUNTIME_DIR", "XDG_SESSION_CLASS", "XDG_SESSION_ID", "XDG_SESSION_TYPE",
+    ]
+    env = {key: os.environ[key] for key in allowed_keys if key in os.environ}
+    env['XDG_RUNTIME_DIR'] = f"/run/user/{uid}"
+    env['DBUS_SESSION_BUS_ADDRESS'] = f"unix:path=/run/user/{uid}/bus"
+    return env
+
+
+class CommandTimeoutError(Exception):
+    """Raised when a command run through the CommandExecutor exceeds its timeout."""
+
+
+class CommandResult:
+    __slots__ = ("args", "returncode", "stdout", "stderr", "duration_ms")
+
+    def __init__(self, args: tuple[str, ...], returncode: int, stdout: bytes, stderr: bytes, duration_ms: float):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration_ms = duration_ms
+
+
+class SamplingProfiler:
+    """
+    Low overhead sampling profiler for the backend's own Python code.
+
+    Code paths of interest are awaited through `run()`, which opens a named section. While any section is open, a
+    background thread samples the stack of each thread with an open section every `interval` seconds. A sample is
+    counted under the innermost `run()` frame on the stack, so other tasks interleaving on the same event loop
+    thread are not attributed to the section; samples outside any section (eg. an idle loop in select) are
+    skipped. Counts are appended periodically to `vss-profile.collapsed` in the plugin log directory in the
+    collapsed stack format read by flamegraph.pl and speedscope, rotating the file once it reaches `max_bytes`.
+    Enabled with VSS_PROFILE=1 or the profiler_enabled setting.
+    """
+
+    FILE_NAME = "vss-profile.collapsed"
+    IDLE_FUNCTIONS = {("selectors.py", "select"), ("selectors.py", "poll"), ("threading.py", "wait")}
+
+    def __init__(self, directory: str, interval: float = 0.005, max_bytes: int = 5 * 1024 * 1024, backups: int = 3,
+                 flush_interval: float = 10.0):
+        self.directory = directory
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.enabled = False
+        self.samples = 0
+        self.idle_samples = 0
+        self._lock = threading.Lock()
+        # Number of open sections per thread ident
+        self._active: dict[int, int] = {}
+        self._counts: collections.Counter[str] = collections.Counter()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.FILE_NAME)
+
+    def start(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="vss-profiler", daemon=True)
+        self._thread.start()
+        decky.logger.info("Sampling profiler enabled (every %.1fms); writing to %s", self.interval * 1000, self.path)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.flush()
+        decky.logger.info("Sampling profiler disabled (%d samples, %d idle)", self.samples, self.idle_samples)
+
+    async def run(self, name: str, awaitable: Awaitable):
+        """Awaits `awaitable` inside a profiler section called `name`. The sampler finds this frame by its code."""
+        if not self.enabled:
+            return await awaitable
+        ident = threading.get_ident()
+        with self._lock:
+            self._active[ident] = self._active.get(ident, 0) + 1
+        self._wake.set()
+        try:
+            return await awaitable
+        finally:
+            with self._lock:
+                if self._active.get(ident, 0) <= 1:
+                    self._active.pop(ident, None)
+                else:
+                    self._active[ident] -= 1
+
+    def wrap(self, name: str, func: Callable[..., Awaitable]):
+        """Wraps a coroutine function so every call runs in a profiler section."""
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return await func(*args, **kwargs)
+            return await self.run(name, func(*args, **kwargs))
+
+        return wrapper
+
+    def _sample_loop(self):
+        run_code = SamplingProfiler.run.__code__
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.clear()
+            with self._lock:
+                active = set(self._active)
+            if not active:
+                # Nothing to sample; sleep until a section opens
+                self._wake.wait(self.flush_interval)
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self.flush()
+                    last_flush = time.monotonic()
+                continue
+            frames = sys._current_frames()
+            for ident in active:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in self.IDLE_FUNCTIONS:
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                section_name = None
+                while frame is not None:
+                    if frame.f_code is run_code:
+                        section_name = frame.f_locals.get("name")
+                        break
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})")
+                    frame = frame.f_back
+                if section_name is None:
+                    # Another task is running on this thread
+                    self.idle_samples += 1
+                    continue
+                stack.append(section_name)
+                with self._lock:
+                    self._counts[";".join(reversed(stack))] += 1
+                self.samples += 1
+            del frames
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.monotonic()
+            self._stop.wait(self.interval)
+
+    def flush(self):
+        """Appends the samples collected since the last flush to the profile, rotating it when it is too large."""
+        with self._lock:
+            counts, self._counts = self._counts, collections.Counter()
+        if not counts:
+            return
+        data = "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with contextlib.suppress(FileNotFoundError):
+                if os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    self._rotate()
+            with open(self.path, "a", encoding="utf-8") as outfile:
+                outfile.write(data)
+        except OSError as e:
+            decky.logger.warning("Unable to write profile to %s: %s", self.path, e)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            with contextlib.suppress(FileNotFoundError):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+sampling_profiler = SamplingProfiler(log_dir)
+
+
+class CommandTrace:
+    """
+    Records every external command the backend runs (arguments, output, exit code and timing), the pw-dump monitor
+    stream and each reconcile pass to a JSONL trace file, gzip compressed when the path ends in '.gz'.
+    Enabled by setting VSS_TRACE_RECORD to the trace path. Traces are replayed with `main.py --replay`.
+    """
+
+    VERSION = 2
+    # Environment variables that change what a command does and are part of its identity on replay
+    TRACED_ENV_PREFIX = "VIRTUAL_SURROUND_"
+    # Number of the reconcile pass the current task is running, if any. Commands are tagged with it so replay can
+    # tell a pass's own decisions from commands that callables ran at the same time.
+    current_pass: contextvars.ContextVar[int | None] = contextvars.ContextVar("vss_trace_pass", default=None)
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") else open(
+            path, "w", encoding="utf-8")
+        self._start = time.monotonic()
+        self._settings_digest: str | None = None
+        self._passes = 0
+        self._write({"type": "header", "version": self.VERSION, "started": time.time()})
+
+    def elapsed_ms(self) -> float:
+        return round((time.monotonic() - self._start) * 1000, 3)
+
+    def _write(self, event: dict):
+        if self._file is None:
+            return
+        self._file.write(json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    @staticmethod
+    def encode_output(data: bytes) -> dict:
+        try:
+            return {"text": data.decode("utf-8")}
+        except UnicodeDecodeError:
+            return {"b64": base64.b64encode(data).decode("ascii")}
+
+    @staticmethod
+    def decode_output(field: dict | None) -> bytes:
+        if not field:
+            return b""
+        if "b64" in field:
+            return base64.b64decode(field["b64"])
+        return field.get("text", "").encode("utf-8")
+
+    @classmethod
+    def traced_env(cls, env: dict | None) -> dict[str, str]:
+        return {key: value for key, value in (env or {}).items() if key.startswith(cls.TRACED_ENV_PREFIX)}
+
+    def record_command(self, args: tuple[str, ...], env: dict | None, start_ms: float, duration_ms: float,
+                       result: "CommandResult | None" = None, timed_out: bool = False, missing: bool = False):
+        event = {"type": "command", "t": start_ms, "args": list(args), "env": self.traced_env(env),
+                 "duration_ms": round(duration_ms, 3)}
+        if result is not None:
+            event.update(returncode=result.returncode, stdout=self.encode_output(result.stdout),
+                         stderr=self.encode_output(result.stderr))
+        if timed_out:
+            event["timed_out"] = True
+        if missing:
+            event["missing"] = True
+        pass_number = self.current_pass.get()
+        if pass_number is not None:
+            event["pass"] = pass_number
+        self._write(event)
+
+    def begin_pass(self) -> contextvars.Token:
+        """Numbers a new reconcile pass and tags the commands the current task runs until the token is reset."""
+        self._passes += 1
+        return self.current_pass.set(self._passes)
+
+    def record_graph(self, text: str | None):
+        """Records a chunk of pw-dump monitor output, or a monitor restart when text is None."""
+        event = {"type": "graph", "t": self.elapsed_ms()}
+        if text is None:
+            event["reset"] = True
+        else:
+            event["text"] = text
+        self._write(event)
+
+    def record_call(self, name: str, start_ms: float, duration_ms: float, result, current_settings: dict):
+        event = {"type": "call", "t": start_ms, "name": name, "duration_ms": round(duration_ms, 3), "result": result}
+        pass_number = self.current_pass.get()
+        if pass_number is not None:
+            event["pass"] = pass_number
+        # Settings decide what the reconciler does, so record them whenever they change
+        digest = hashlib.sha1(json.dumps(current_settings, sort_keys=True).encode("utf-8")).hexdigest()
+        if digest != self._settings_digest:
+            self._settings_digest = digest
+            event["settings"] = current_settings
+        self._write(event)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def load(path: str) -> list[dict]:
+        """
+        Reads a trace. A recording that was not closed (eg. the process was killed) may end in a truncated gzip
+        stream or a partial line; the events read up to that point are returned.
+        """
+        opener = gzip.open if path.endswith(".gz") else open
+        events = []
+        try:
+            with opener(path, "rt", encoding="utf-8") as infile:
+                for line in infile:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        decky.logger.warning("Trace '%s' ends with a partial event; ignoring it", path)
+                        break
+        except (EOFError, gzip.BadGzipFile) as e:
+            if not events:
+                raise ValueError(f"'{path}' is not a readable command trace: {e}") from e
+            decky.logger.warning("Trace '%s' was not closed cleanly (%s); using the %d events read", path, e,
+                                 len(events))
+        if not events or events[0].get("type") != "header":
+            raise ValueError(f"'{path}' is not a command trace")
+        return events
+
+
+class CommandExecutor:
+    """
+    Runs external commands with per-command timeouts and a global concurrency limit.
+
+    Each command is started in its own session so that the whole process group can be killed when it times out
+    or its caller is cancelled. Idempotent reads may be retried with exponential back-off. Latencies are recorded
+    in a histogram per command (keyed by executable name and sub-command).
+    """
+
+    DEFAULT_TIMEOUT = 10.0
+    COMMAND_TIMEOUTS = {
+        "pactl": 5.0,
+        "wpctl": 5.0,
+        "pw-cli": 5.0,
+        "ffprobe": 10.0,
+        "service.sh": 120.0,
+    }
+    LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    # Executables whose first positional argument selects a sub-command worth tracking separately
+    SUB_COMMAND_EXECUTABLES = {"pactl", "wpctl", "pw-cli", "service.sh"}
+
+    def __init__(self, max_concurrency: int = 4, trace_path: str | None = None):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._stats: dict[str, dict] = {}
+        self.trace: CommandTrace | None = None
+        if trace_path:
+            try:
+                self.trace = CommandTrace(trace_path)
+                decky.logger.info("Recording external commands to %s", trace_path)
+            except OSError as e:
+                decky.logger.error("Unable to record command trace to %s: %s", trace_path, e)
+
+    @staticmethod
+    def command_key(args: tuple[str, ...]) -> str:
+        """Returns the histogram key for a command line, e.g. 'pactl list sinks' or 'service.sh print-vss-info'."""
+        executable = os.path.basename(args[0]) if args else ""
+        if executable not in CommandExecutor.SUB_COMMAND_EXECUTABLES:
+            return executable
+        positional = []
+        skip_value = False
+        for arg in args[1:]:
+            if skip_value:
+                skip_value = False
+            elif arg in ("-f", "--format"):
+                skip_value = True
+            elif not arg.startswith("-"):
+                positional.append(arg)
+        words = positional[:2] if positional[:1] == ["list"] else positional[:1]
+        return " ".join([executable, *words])
+
+    async def run(self, *args: str, timeout: float | None = None, retries: int = 0, env: dict | None = None,
+                  backoff: float = 0.2) -> CommandResult:
+        """
+        Runs a command and returns its result. Raises FileNotFoundError if the executable is missing and
+        CommandTimeoutError once every attempt has timed out. Non-zero exit codes are returned, not raised.
+        """
+        if timeout is None:
+            timeout = self.COMMAND_TIMEOUTS.get(os.path.basename(args[0]), self.DEFAULT_TIMEOUT)
+        attempt = 0
+        while True:
+            try:
+                result = await self._run_once(args, timeout, env)
+                if result.returncode == 0 or attempt >= retries:
+                    return result
+            except CommandTimeoutError:
+                if attempt >= retries:
+                    raise
+            attempt += 1
+            delay = backoff * (2 ** (attempt - 1))
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def read(self, *args: str, **kwargs) -> CommandResult:
+        """Runs an idempotent read, retrying twice with back-off if it fails or times out."""
+        kwargs.setdefault("retries", 2)
+        return await self.run(*args, **kwargs)
+
+    async def _run_once(self, args: tuple[str, ...], timeout: float, env: dict | None) -> CommandResult:
+        key = self.command_key(args)
+        async with self._semaphore:
+            return await sampling_profiler.run(f"command {key}", self._run_process(args, timeout, env, key))
+
+    async def _run_process(self, args: tuple[str, ...], timeout: float, env: dict | None, key: str) -> CommandResult:
+        start = time.monotonic()
+        trace_start_ms = self.trace.elapsed_ms() if self.trace else 0.0
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=env if env is not None else subprocess_exec_env(),
+                start_new_session=True
+            )
+        except FileNotFoundError:
+            if self.trace:
+                self.trace.record_command(args, env, trace_start_ms, 0.0, missing=True)
+            raise
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            self._kill_process_group(process)
+            await process.wait()
+            duration_ms = (time.monotonic() - start) * 1000
+            self._record(key, duration_ms, timed_out=True)
+            if self.trace:
+                self.trace.record_command(args, env, trace_start_ms, duration_ms, timed_out=True)
+            decky.logger.error("Command '%s' timed out after %.1fs", " ".join(args), timeout)
+            raise CommandTimeoutError(f"{key} timed out after {timeout}s")
+        except asyncio.CancelledError:
+            self._kill_process_group(process)
+            # Reap the child so its pipe transports are closed, even if the caller is cancelled again meanwhile
+            await asyncio.shield(process.wait())
+            raise
+        duration_ms = (time.monotonic() - start) * 1000
+        self._record(key, duration_ms, failed=process.returncode != 0)
+        result = CommandResult(args, process.returncode, stdout, stderr, duration_ms)
+        if self.trace:
+            self.trace.record_command(args, env, trace_start_ms, duration_ms, result)
+        return result
+
+    @staticmethod
+    def _kill_process_group(process: asyncio.subprocess.Process):
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.killpg(process.pid, signal.SIGKILL)
+
+    def _record(self, key: str, duration_ms: float, failed: bool = False, timed_out: bool = False):
+        stats = self._stats.setdefault(key, {
+            "count": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "buckets": [0] * (len(self.LATENCY_BUCKETS_MS) + 1),
+        })
+        stats["count"] += 1
+        stats["failures"] += int(failed)
+        stats["timeouts"] += int(timed_out)
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        bucket = next((i for i, bound in enumerate(self.LATENCY_BUCKETS_MS) if duration_ms <= bound),
+                      len(self.LATENCY_BUCKETS_MS))
+        stats["buckets"][bucket] += 1
+
+    def _percentile(self, buckets: list[int], count: int, fraction: float) -> float | None:
+        """Returns the upper bound of the histogram bucket containing the given percentile."""
+        threshold = count * fraction
+        seen = 0
+        for i, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= threshold and bucket_count:
+                return self.LATENCY_BUCKETS_MS[i] if i < len(self.LATENCY_BUCKETS_MS) else None
+        return None
+
+    def stats(self) -> dict[str, dict]:
+        """Returns call counts and latency histograms per command."""
+        report = {}
+        for key, stats in sorted(self._stats.items()):
+            count = stats["count"]
+            report[key] = {
+                "count": count,
+                "failures": stats["failures"],
+                "timeouts": stats["timeouts"],
+                "mean_ms": round(stats["total_ms"] / count, 1) if count else 0.0,
+                "max_ms": round(stats["max_ms"], 1),
+                "p50_ms": self._percentile(stats["buckets"], count, 0.5),
+                "p95_ms": self._percentile(stats["buckets"], count, 0.95),
+                "histogram": {
+                    f"<={bound}ms" if i < len(self.LATENCY_BUCKETS_MS) else f">{self.LATENCY_BUCKETS_MS[-1]}ms": n
+                    for i, (bound, n) in enumerate(zip(self.LATENCY_BUCKETS_MS + (None,), stats["buckets"]))
+                },
+            }
+        return report
+
+
+command_executor = CommandExecutor(trace_path=os.environ.get("VSS_TRACE_RECORD") or None)
+
+
+class ReplayExecutor(CommandExecutor):
+    """
+    Serves command results from a recorded trace instead of running anything.
+
+    Reads are answered with the recorded output of the same command (matched by executable name, arguments and
+    VIRTUAL_SURROUND_* environment) nearest to the current replay position, so the graph evolves as it did on the
+    recording machine. Every other command is a decision: it is collected in `decisions` and answered with its
+    recorded result, or with success if the recording never ran it. Recorded latencies are slept for, scaled by
+    `time_scale` (0 replays as fast as possible).
+    """
+
+    READ_COMMAND_PREFIXES = ("pactl list", "pactl get-", "pactl info", "wpctl status", "wpctl inspect",
+                             "wpctl get-volume", "pw-cli ls", "pw-cli info", "pw-cli enum-params", "ffprobe",
+                             "service.sh print-vss-info")
+
+    def __init__(self, events: list[dict], time_scale: float = 0.0):
+        super().__init__()
+        self.time_scale = time_scale
+        self.position_ms = 0.0
+        self.window_end_ms = float("inf")
+        self.decisions: list[str] = []
+        self.missing_reads: list[str] = []
+        self._commands: dict[str, list[dict]] = collections.defaultdict(list)
+        for event in events:
+            if event.get("type") == "command":
+                self._commands[self.match_key(event["args"], event.get("env"))].append(event)
+        self._cursors: dict[str, int] = {}
+
+    @staticmethod
+    def match_key(args, env: dict | None) -> str:
+        args = list(args)
+        if args:
+            args[0] = os.path.basename(args[0])
+        return json.dumps([args, CommandTrace.traced_env(env)], sort_keys=True)
+
+    @classmethod
+    def is_read(cls, args) -> bool:
+        key = cls.command_key(tuple(args))
+        return key.startswith(cls.READ_COMMAND_PREFIXES) or key == "pw-dump"
+
+    @staticmethod
+    def describe(args, env: dict | None = None) -> str:
+        words = [f"{key}={value}" for key, value in sorted(CommandTrace.traced_env(env).items())]
+        return " ".join(words + [os.path.basename(args[0]), *args[1:]])
+
+    def seek(self, position_ms: float, window_end_ms: float = float("inf")):
+        """Moves the replay position, eg. to the start of a recorded reconcile pass."""
+        self.position_ms = position_ms
+        self.window_end_ms = window_end_ms
+        self._cursors = {}
+
+    def _lookup(self, key: str) -> dict | None:
+        entries = self._commands.get(key)
+        if not entries:
+            return None
+        cursor = self._cursors.get(key)
+        if cursor is None:
+            cursor = bisect.bisect_left([entry["t"] for entry in entries], self.position_ms)
+        if cursor < len(entries) and entries[cursor]["t"] <= self.window_end_ms:
+            self._cursors[key] = cursor + 1
+            return entries[cursor]
+        # Nothing recorded for this command in the window; use the latest recording before it
+        before = bisect.bisect_left([entry["t"] for entry in entries], self.position_ms)
+        return entries[max(0, min(before, len(entries)) - 1)]
+
+    async def run(self, *args: str, **kwargs) -> CommandResult:
+        # Retries still consume recorded attempts in order, but only wait between them when replaying in real time
+        kwargs["backoff"] = kwargs.get("backoff", 0.2) * self.time_scale
+        return await super().run(*args, **kwargs)
+
+    async def _run_once(self, args: tuple[str, ...], timeout: float, env: dict | None) -> CommandResult:
+        key = self.command_key(args)
+        start = time.monotonic()
+        entry = self._lookup(self.match_key(args, env))
+        read = self.is_read(args)
+        if not read:
+            self.decisions.append(self.describe(args, env))
+        if entry is None:
+            if read:
+                self.missing_reads.append(self.describe(args, env))
+            result = CommandResult(args, 1 if read else 0, b"", b"not in trace" if read else b"", 0.0)
+        else:
+            if self.time_scale > 0:
+                await asyncio.sleep(entry["duration_ms"] * self.time_scale / 1000)
+            if entry.get("missing"):
+                raise FileNotFoundError(args[0])
+            if entry.get("timed_out"):
+                raise CommandTimeoutError(f"{key} timed out (recorded)")
+            result = CommandResult(args, entry["returncode"], CommandTrace.decode_output(entry.get("stdout")),
+                                   CommandTrace.decode_output(entry.get("stderr")), entry["duration_ms"])
+        self._record(key, (time.monotonic() - start) * 1000, failed=result.returncode != 0)
+        return result
+
+    def recorded_decisions(self, start_ms: float, end_ms: float, pass_number: int | None = None) -> list[str]:
+        """
+        Returns the decisions a recorded reconcile pass made. Commands are matched by the pass they were tagged
+        with; traces recorded before passes were tagged fall back to the pass's time window.
+        """
+        decisions = []
+        for entries in self._commands.values():
+            for entry in entries:
+                if pass_number is not None:
+                    in_pass = entry.get("pass") == pass_number
+                else:
+                    in_pass = start_ms <= entry["t"] <= end_ms
+                if in_pass and not self.is_read(entry["args"]):
+                    decisions.append((entry["t"], self.describe(entry["args"], entry.get("env"))))
+        return [description for _, description in sorted(decisions)]
+
+
+class ReplayControlChannel:
+    """Stands in for FilterControlChannel during replay, collecting control updates as decisions."""
+
+    def __init__(self, executor: ReplayExecutor):
+        self._executor = executor
+
+    async def set_params(self, node_id: int, params: dict[str, float]) -> bool:
+        self._executor.decisions.append(self._executor.describe(control_command_args(node_id, params)))
+        return True
+
+    async def close(self):
+        pass
+
+
+def parse_vss_info(output: str) -> dict[str, str]:
+    info: dict[str, str] = {}
+    for line in output.splitlines():
+        if ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        info[key.strip()] = value.strip()
+    return info
+
+
+async def service_script_exec(command, args=None, env_overrides: dict[str, str] | None = None) -> str | None:
+    """Runs a service.sh command, returning its output on success or None on failure."""
+    if args is None:
+        args = []
+    service_script = os.path.join(script_directory, "service.sh")
+    env = subprocess_exec_env()
+    if env_overrides:
+        env.update(env_overrides)
+    try:
+        result = await command_executor.run(service_script, command, *args, env=env)
+        stdout, stderr = result.stdout, result.stderr
+        if result.returncode != 0:
+            decky.logger.error(f"Service script exec failed: {stderr.decode()}")
+            for line in stdout.decode().splitlines():
+                decky.logger.error(line)
+        else:
+            decky.logger.info("Service script exec output:")
+            for line in stdout.decode().splitlines():
+                decky.logger.info(line)
+            return stdout.decode()
+    except Exception as e:
+        decky.logger.error(f"Error executing service script: {e}")
+    return None
+
+
+async def _fetch_virtual_surround_sink_info() -> dict[str, str]:
+    service_script = os.path.join(script_directory, "service.sh")
+    try:
+        result = await command_executor.read(service_script, "print-vss-info")
+    except FileNotFoundError:
+        decky.logger.error("service.sh not found at %s", service_script)
+        return {}
+    except Exception as exc:
+        decky.logger.error("Error executing service script: %s", exc)
+        return {}
+
+    if result.returncode != 0:
+        decky.logger.error("service.sh print-vss-info failed: %s", result.stderr.decode().strip())
+        return {}
+
+    return parse_vss_info(result.stdout.decode())
+
+
+_virtual_surround_sink_names: tuple[str, str] | None = None
+
+
+async def get_virtual_surround_sink_names() -> tuple[str | None, str | None]:
+    # The names are static for a given service.sh, so only ask the script once
+    global _virtual_surround_sink_names
+    if _virtual_surround_sink_names is not None:
+        return _virtual_surround_sink_names
+    info = await _fetch_virtual_surround_sink_info()
+    filter_name = info.get("VSS Filter Capture Name")
+    device_name = info.get("VSS Device Capture Name")
+    if not filter_name or not device_name:
+        decky.logger.error("service.sh missing virtual surround sink names: %s", info)
+        return None, None
+    _virtual_surround_sink_names = (filter_name, device_name)
+    return _virtual_surround_sink_names
+
+
+# Map full pactl channel names to the short codes used in mixer profiles
+PACTL_CHANNEL_CODES = {
+    "front-left": "FL",
+    "front-right": "FR",
+    "front-center": "FC",
+    "lfe": "LFE",
+    "rear-left": "RL",
+    "rear-right": "RR",
+    "side-left": "SL",
+    "side-right": "SR",
+}
+
+PACTL_CHANNEL_NAMES = {code: name for name, code in PACTL_CHANNEL_CODES.items()}
+
+# Stream properties that may carry the Steam app ID of the game that owns an audio stream
+STEAM_APP_ID_PROPERTY_KEYS = ("steam.app.id", "steam.appid", "application.steam.appid", "SteamAppId", "SteamGameId")
+
+# Channel order of 7.1 WAV files (WAVE_FORMAT_EXTENSIBLE channel mask 0x63F) and the speakers of the filter graph
+SURROUND_CHANNEL_ORDER = ("FL", "FR", "FC", "LFE", "RL", "RR", "SL", "SR")
+SURROUND_CHANNEL_MASK = 0x63F
+
+# (left ear, right ear) HRIR channel indices used by the convolver graph in service.sh for each speaker.
+# LFE shares the front-center responses.
+HRIR_SPEAKER_EAR_CHANNELS = {
+    "FL": (0, 1),
+    "FR": (8, 7),
+    "FC": (6, 13),
+    "LFE": (6, 13),
+    "RL": (4, 5),
+    "RR": (12, 11),
+    "SL": (2, 3),
+    "SR": (10, 9),
+}
+HRIR_CHANNEL_COUNT = 14
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavData:
+    __slots__ = ("sample_rate", "channels")
+
+    def __init__(self, sample_rate: int, channels: list[list[float]]):
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @property
+    def frames(self) -> int:
+        return len(self.channels[0]) if self.channels else 0
+
+
+def read_wav_header(infile) -> tuple[int, int, int, int, int]:
+    """
+    Reads RIFF/WAVE chunks up to the start of the sample data.
+    Returns (format_tag, channel_count, sample_rate, bits_per_sample, data_size) with the file positioned at the data.
+    """
+    riff, _, wave = struct.unpack("<4sI4s", infile.read(12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+    fmt = None
+    while True:
+        chunk_header = infile.read(8)
+        if len(chunk_header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            chunk = infile.read(chunk_size + (chunk_size & 1))
+            format_tag, channel_count, sample_rate, _, _, bits_per_sample = struct.unpack("<HHIIHH", chunk[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(chunk) >= 26:
+                # The sub-format GUID starts with the actual format tag
+                format_tag = struct.unpack("<H", chunk[24:26])[0]
+            fmt = (format_tag, channel_count, sample_rate, bits_per_sample)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes its fmt chunk")
+            return (*fmt, chunk_size)
+        else:
+            infile.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def read_wav(path: str) -> WavData:
+    """Reads a PCM 8/16/24/32-bit or IEEE float 32/64-bit WAV file into per-channel float samples."""
+    with open(path, "rb") as infile:
+        format_tag, channel_count, sample_rate, bits_per_sample, data_size = read_wav_header(infile)
+        raw = infile.read(data_size)
+    sample_width = bits_per_sample // 8
+    raw = raw[:len(raw) - len(raw) % (sample_width * channel_count)]
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits_per_sample in (32, 64):
+        samples = array.array("f" if bits_per_sample == 32 else "d", raw)
+        scale = 1.0
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 8:
+        samples = array.array("b", bytes((b - 128) & 0xFF for b in raw))
+        scale = 1.0 / 128
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 16:
+        samples = array.array("h", raw)
+        scale = 1.0 / 32768
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 24:
+        # Widen each 3-byte sample to 4 bytes so it can be read as a 32-bit integer
+        padded = bytearray(len(raw) // 3 * 4)
+        padded[1::4] = raw[0::3]
+        padded[2::4] = raw[1::3]
+        padded[3::4] = raw[2::3]
+        samples = array.array("i", bytes(padded))
+        scale = 1.0 / 2147483648
+    elif format_tag == WAVE_FORMAT_PCM and bits_per_sample == 32:
+        samples = array.array("i", raw)
+        scale = 1.0 / 2147483648
+    else:
+        raise ValueError(f"Unsupported WAV format {format_tag} with {bits_per_sample} bits per sample")
+    if sys.byteorder == "big":
+        samples.byteswap()
+    channels = [[value * scale for value in samples[c::channel_count]] for c in range(channel_count)]
+    return WavData(sample_rate, channels)
+
+
+def write_wav(path: str, sample_rate: int, channels: list, channel_mask: int | None = None,
+              float_samples: bool = False):
+    """
+    Writes per-channel float samples as a 16-bit PCM WAV file, or as 32-bit IEEE float when float_samples is set.
+    Files with more than two channels (or an explicit channel mask) are written as WAVE_FORMAT_EXTENSIBLE so
+    players pick up the speaker layout. The file is written to a temporary path and moved into place.
+    """
+    channel_count = len(channels)
+    frames = len(channels[0]) if channels else 0
+    if float_samples:
+        format_tag, bits_per_sample = WAVE_FORMAT_IEEE_FLOAT, 32
+        interleaved = array.array("f", bytes(frames * channel_count * 4))
+        for c, samples in enumerate(channels):
+            interleaved[c::channel_count] = array.array("f", samples)
+    else:
+        format_tag, bits_per_sample = WAVE_FORMAT_PCM, 16
+        interleaved = array.array("h", bytes(frames * channel_count * 2))
+        for c, samples in enumerate(channels):
+            interleaved[c::channel_count] = array.array(
+                "h", (max(-32768, min(32767, int(round(value * 32767)))) for value in samples))
+    if sys.byteorder == "big":
+        interleaved.byteswap()
+    data = interleaved.tobytes()
+    block_align = channel_count * bits_per_sample // 8
+    if channel_count > 2 or channel_mask is not None:
+        fmt_chunk = struct.pack(
+            "<HHIIHHHHI16s", WAVE_FORMAT_EXTENSIBLE, channel_count, sample_rate, sample_rate * block_align,
+            block_align, bits_per_sample, 22, bits_per_sample, channel_mask or 0,
+            struct.pack("<H", format_tag) + b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71")
+    else:
+        fmt_chunk = struct.pack("<HHIIHH", format_tag, channel_count, sample_rate, sample_rate * block_align,
+                                block_align, bits_per_sample)
+    header = b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt_chunk) + 8 + len(data)) + b"WAVE"
+    header += b"fmt " + struct.pack("<I", len(fmt_chunk)) + fmt_chunk + b"data" + struct.pack("<I", len(data))
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".wav")
+    try:
+        with os.fdopen(fd, "wb") as outfile:
+            outfile.write(header)
+            outfile.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def fft(values: list, inverse: bool = False) -> list[complex]:
+    """
+    Iterative radix-2 FFT of a sequence whose length is a power of two. The inverse transform is not scaled by 1/n.
+    Used for HRIR processing, which must work without NumPy since it is not available on SteamOS.
+    """
+    n = len(values)
+    if n & (n - 1):
+        raise ValueError(f"FFT length {n} is not a power of two")
+    data = [complex(value) for value in values]
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            data[i], data[j] = data[j], data[i]
+    sign = 1.0 if inverse else -1.0
+    size = 2
+    while size <= n:
+        half = size // 2
+        twiddles = [complex(math.cos(2 * math.pi * k / size), sign * math.sin(2 * math.pi * k / size))
+                    for k in range(half)]
+        for start in range(0, n, size):
+            for k, twiddle in enumerate(twiddles):
+                a = start + k
+                t = data[a + half] * twiddle
+                data[a + half] = data[a] - t
+                data[a] += t
+        size *= 2
+    return data
+
+
+def fft_real_pair(first: list[float], second: list[float], fft_size: int) -> tuple[list[complex], list[complex]]:
+    """
+    Returns the one-sided spectra (fft_size // 2 + 1 bins) of two real signals zero-padded to fft_size, computed
+    with a single complex FFT of first + j * second.
+    """
+    packed = [complex(a, b) for a, b in itertools.zip_longest(first, second, fillvalue=0.0)]
+    spectrum = fft(packed + [0j] * (fft_size - len(packed)))
+    first_spectrum, second_spectrum = [], []
+    for k in range(fft_size // 2 + 1):
+        mirrored = spectrum[-k].conjugate()
+        first_spectrum.append((spectrum[k] + mirrored) * 0.5)
+        second_spectrum.append((spectrum[k] - mirrored) * -0.5j)
+    return first_spectrum, second_spectrum
+
+
+# Parameters of the channel identification signal. Changing any of them renders a new cached file.
+CHANNEL_ID_SIGNAL = {
+    "version": 1,
+    "sample_rate": 48000,
+    "lead_in": 0.25,
+    "burst": 0.35,
+    "spacing": 0.6,
+    "fade": 0.005,
+    "level": 0.5,
+    "lfe_frequency": 50.0,
+}
+
+
+def channel_id_signal_key() -> str:
+    return hashlib.sha1(json.dumps(CHANNEL_ID_SIGNAL, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def channel_id_signal_path() -> str:
+    """Returns the path of the channel identification WAV, rendering it on first use."""
+    path = os.path.join(settings_dir, "cache", f"channel-id-{channel_id_signal_key()}.wav")
+    if not os.path.isfile(path):
+        render_channel_id_signal(path)
+    return path
+
+
+def render_channel_id_signal(path: str):
+    """
+    Renders the 7.1 channel identification signal. Each speaker in turn (FL, FR, FC, LFE, RL, RR, SL, SR) plays a
+    short noise burst, which is easy to localise, except for the LFE which plays a low sine tone.
+    """
+    params = CHANNEL_ID_SIGNAL
+    sample_rate = params["sample_rate"]
+    burst_frames = int(params["burst"] * sample_rate)
+    fade_frames = max(1, int(params["fade"] * sample_rate))
+    total_frames = int((params["lead_in"] + params["spacing"] * len(SURROUND_CHANNEL_ORDER)) * sample_rate)
+    envelope = [
+        params["level"] * min(1.0, i / fade_frames, (burst_frames - 1 - i) / fade_frames)
+        for i in range(burst_frames)
+    ]
+    rng = random.Random(params["version"])
+    channels = []
+    for position, code in enumerate(SURROUND_CHANNEL_ORDER):
+        samples = [0.0] * total_frames
+        start = int((params["lead_in"] + params["spacing"] * position) * sample_rate)
+        if code == "LFE":
+            step = 2 * math.pi * params["lfe_frequency"] / sample_rate
+            burst = [gain * math.sin(step * i) for i, gain in enumerate(envelope)]
+        else:
+            burst = [gain * rng.uniform(-1.0, 1.0) for gain in envelope]
+        samples[start:start + burst_frames] = burst
+        channels.append(samples)
+    write_wav(path, sample_rate, channels, SURROUND_CHANNEL_MASK)
+    decky.logger.info("Rendered channel identification signal to '%s'", path)
+
+
+def _response_onset(samples: list[float], threshold_ratio: float = 0.1) -> int | None:
+    """Returns the index of the first sample reaching the given fraction of the response's peak."""
+    peak = max((abs(value) for value in samples), default=0.0)
+    if peak <= 0.0:
+        return None
+    threshold = peak * threshold_ratio
+    return next(i for i, value in enumerate(samples) if abs(value) >= threshold)
+
+
+def verify_hrir_channel_routing(wav: WavData, min_ild_db: float = 1.0, max_center_ild_db: float = 3.0,
+                                max_center_itd_ms: float = 0.1, min_level_db: float = -20.0) -> dict:
+    """
+    Checks offline that each speaker of the filter graph reaches the expected ear under the given HRIR.
+
+    Side speakers must be louder (ILD) and earlier (ITD) at the ipsilateral ear, the centre and LFE speakers must
+    be balanced between the ears, and no speaker may be far quieter than the loudest one.
+    """
+    if len(wav.channels) != HRIR_CHANNEL_COUNT:
+        return {
+            "ok": False,
+            "error": f"HRIR has {len(wav.channels)} channels, the filter graph expects {HRIR_CHANNEL_COUNT}",
+            "channels": [],
+        }
+    measurements = {}
+    for code, (left_index, right_index) in HRIR_SPEAKER_EAR_CHANNELS.items():
+        left = wav.channels[left_index]
+        right = wav.channels[right_index]
+        measurements[code] = {
+            "left_energy": sum(value * value for value in left),
+            "right_energy": sum(value * value for value in right),
+            "left_onset": _response_onset(left),
+            "right_onset": _response_onset(right),
+        }
+    loudest = max(m["left_energy"] + m["right_energy"] for m in measurements.values()) or 1.0
+    results = []
+    for code in SURROUND_CHANNEL_ORDER:
+        m = measurements[code]
+        issues = []
+        expected_ear = "left" if code.endswith("L") else "right" if code.endswith("R") else "both"
+        total_energy = m["left_energy"] + m["right_energy"]
+        level_db = 10 * math.log10(total_energy / loudest) if total_energy > 0 else float("-inf")
+        if m["left_onset"] is None or m["right_onset"] is None:
+            issues.append("silent response")
+            results.append({"channel": code, "expected_ear": expected_ear, "ok": False, "issues": issues,
+                            "level_db": None, "ild_db": None, "itd_ms": None})
+            continue
+        # Positive ILD/ITD values mean the left ear receives the sound louder/earlier
+        ild_db = 10 * math.log10(m["left_energy"] / m["right_energy"]) if m["right_energy"] > 0 else float("inf")
+        itd_ms = (m["right_onset"] - m["left_onset"]) * 1000 / wav.sample_rate
+        if expected_ear == "both":
+            if abs(ild_db) > max_center_ild_db:
+                issues.append(f"level differs between ears by {ild_db:+.1f} dB")
+            if abs(itd_ms) > max_center_itd_ms:
+                issues.append(f"arrival differs between ears by {itd_ms:+.3f} ms")
+        else:
+            sign = 1 if expected_ear == "left" else -1
+            if ild_db * sign < min_ild_db:
+                issues.append(f"not louder at the {expected_ear} ear ({ild_db:+.1f} dB)")
+            if itd_ms * sign < 0:
+                issues.append(f"reaches the {expected_ear} ear later ({itd_ms:+.3f} ms)")
+        if level_db < min_level_db:
+            issues.append(f"{level_db:.1f} dB below the loudest speaker")
+        results.append({
+            "channel": code,
+            "expected_ear": expected_ear,
+            "ok": not issues,
+            "issues": issues,
+            "level_db": round(level_db, 2),
+            "ild_db": round(ild_db, 2),
+            "itd_ms": round(itd_ms, 3),
+        })
+    return {"ok": all(r["ok"] for r in results), "channels": results}
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as infile:
+        for chunk in iter(lambda: infile.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HrirAnalysisIndex:
+    """
+    Caches per-speaker HRIR analysis in a compact binary index keyed by the SHA-256 of each file's content.
+
+    Analysis only uses the standard library. Each speaker records its onset delay, effective IR length, ITD, ILD,
+    relative level and per-ear magnitude responses decimated to log-spaced bands (stored as int8 in half-dB steps).
+    A path table records the (mtime, size) a digest was computed for, so unchanged files are not hashed again.
+    """
+
+    MAGIC = b"VSSH"
+    VERSION = 1
+    BAND_COUNT = 32
+    BAND_MIN_HZ = 20.0
+    BAND_MAX_HZ = 20000.0
+    # Uniformly partitioned FFT convolution as used by the PipeWire convolver, per convolver in the graph
+    CONVOLVER_COUNT = 16
+    CONVOLVER_BLOCK = 256
+    HEADER = struct.Struct("<4sHII")
+    RECORD_HEADER = struct.Struct("<32sIHIH")
+    SPEAKER = struct.Struct("<5f")
+    PATH_ENTRY = struct.Struct("<32sqQH")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._records: dict[str, dict] | None = None
+        self._paths: dict[str, tuple[int, int, str]] = {}
+        self._dirty = False
+
+    @classmethod
+    def band_frequencies(cls) -> list[float]:
+        ratio = (cls.BAND_MAX_HZ / cls.BAND_MIN_HZ) ** (1 / cls.BAND_COUNT)
+        return [round(cls.BAND_MIN_HZ * ratio ** (i + 0.5), 1) for i in range(cls.BAND_COUNT)]
+
+    def _load(self):
+        if self._records is not None:
+            return
+        self._records = {}
+        try:
+            with open(self.path, "rb") as infile:
+                data = infile.read()
+        except FileNotFoundError:
+            return
+        try:
+            magic, version, record_count, path_count = self.HEADER.unpack_from(data, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                return
+            offset = self.HEADER.size
+            for _ in range(record_count):
+                digest, sample_rate, channel_count, frames, band_count = self.RECORD_HEADER.unpack_from(data, offset)
+                offset += self.RECORD_HEADER.size
+                speakers = {}
+                for code in SURROUND_CHANNEL_ORDER:
+                    onset_ms, length_ms, itd_ms, ild_db, level_db = self.SPEAKER.unpack_from(data, offset)
+                    offset += self.SPEAKER.size
+                    bands = struct.unpack_from(f"<{band_count * 2}b", data, offset)
+                    offset += band_count * 2
+                    speakers[code] = {
+                        "onset_ms": round(onset_ms, 3),
+                        "length_ms": round(length_ms, 2),
+                        "itd_ms": round(itd_ms, 3),
+                        "ild_db": round(ild_db, 2),
+                        "level_db": round(level_db, 2),
+                        "bands_left_db": [value / 2 for value in bands[:band_count]],
+                        "bands_right_db": [value / 2 for value in bands[band_count:]],
+                    }
+                self._records[digest.hex()] = {
+                    "sample_rate": sample_rate,
+                    "channel_count": channel_count,
+                    "frames": frames,
+                    "speakers": speakers,
+                }
+            for _ in range(path_count):
+                digest, mtime_ns, size, path_length = self.PATH_ENTRY.unpack_from(data, offset)
+                offset += self.PATH_ENTRY.size
+                file_path = data[offset:offset + path_length].decode("utf-8")
+                offset += path_length
+                self._paths[file_path] = (mtime_ns, size, digest.hex())
+        except (struct.error, UnicodeDecodeError) as e:
+            decky.logger.warning("Discarding unreadable HRIR analysis index '%s': %s", self.path, e)
+            self._records = {}
+            self._paths = {}
+
+    def save(self):
+        if not self._dirty or self._records is None:
+            return
+        chunks = [self.HEADER.pack(self.MAGIC, self.VERSION, len(self._records), len(self._paths))]
+        for digest, record in self._records.items():
+            chunks.append(self.RECORD_HEADER.pack(bytes.fromhex(digest), record["sample_rate"],
+                                                  record["channel_count"], record["frames"], self.BAND_COUNT))
+            for code in SURROUND_CHANNEL_ORDER:
+                speaker = record["speakers"][code]
+                chunks.append(self.SPEAKER.pack(speaker["onset_ms"], speaker["length_ms"], speaker["itd_ms"],
+                                                speaker["ild_db"], speaker["level_db"]))
+                bands = speaker["bands_left_db"] + speaker["bands_right_db"]
+                chunks.append(struct.pack(f"<{len(bands)}b", *(int(round(value * 2)) for value in bands)))
+        for file_path, (mtime_ns, size, digest) in self._paths.items():
+            encoded = file_path.encode("utf-8")
+            chunks.append(self.PATH_ENTRY.pack(bytes.fromhex(digest), mtime_ns, size, len(encoded)) + encoded)
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as outfile:
+                outfile.write(b"".join(chunks))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+        self._dirty = False
+
+    def content_digest(self, file_path: str) -> str:
+        """Returns the SHA-256 of a file, only re-hashing it when its size or mtime changed."""
+        self._load()
+        stat = os.stat(file_path)
+        cached = self._paths.get(file_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = file_sha256(file_path)
+        self._paths[file_path] = (stat.st_mtime_ns, stat.st_size, digest)
+        self._dirty = True
+        return digest
+
+    def get(self, file_path: str) -> dict | None:
+        """Returns the analysis of an HRIR WAV, computing and caching it on first use."""
+        self._load()
+        digest = self.content_digest(file_path)
+        record = self._records.get(digest)
+        if record is None:
+            record = self.analyse(file_path)
+            self._records[digest] = record
+            self._dirty = True
+        return record
+
+    @classmethod
+    def analyse(cls, file_path: str) -> dict:
+        wav = read_wav(file_path)
+        sample_rate, frames, channel_count = wav.sample_rate, wav.frames, len(wav.channels)
+        if frames == 0:
+            raise ValueError("WAV file contains no samples")
+        record = {"sample_rate": sample_rate, "channel_count": channel_count, "frames": frames, "speakers": {}}
+        if channel_count != HRIR_CHANNEL_COUNT:
+            # Only the 14 channel layout is used by the filter graph, so there are no speakers to analyse
+            record["speakers"] = {code: cls._empty_speaker() for code in SURROUND_CHANNEL_ORDER}
+            return record
+        fft_size = 1 << max(9, (frames - 1).bit_length())
+        bin_count = fft_size // 2 + 1
+        ratio = (cls.BAND_MAX_HZ / cls.BAND_MIN_HZ) ** (1 / cls.BAND_COUNT)
+        edges = [cls.BAND_MIN_HZ * ratio ** i for i in range(cls.BAND_COUNT + 1)]
+        # Narrow low bands that fall between FFT bins use the bin nearest to their centre
+        band_bins = []
+        for low, high in zip(edges[:-1], edges[1:]):
+            bins = range(min(bin_count, math.ceil(low * fft_size / sample_rate)),
+                         min(bin_count, math.ceil(high * fft_size / sample_rate)))
+            if not bins:
+                nearest = min(bin_count - 1, int(round(math.sqrt(low * high) * fft_size / sample_rate)))
+                bins = range(nearest, nearest + 1)
+            band_bins.append(bins)
+        energies = [sum(value * value for value in channel) for channel in wav.channels]
+        peak_energy = max(energies[left] + energies[right] for left, right in HRIR_SPEAKER_EAR_CHANNELS.values())
+        spectra = {}
+        for left, right in HRIR_SPEAKER_EAR_CHANNELS.values():
+            if left not in spectra:
+                spectra[left], spectra[right] = (
+                    [abs(value) for value in spectrum]
+                    for spectrum in fft_real_pair(wav.channels[left], wav.channels[right], fft_size)
+                )
+        reference = max(max(spectrum) for spectrum in spectra.values()) or 1.0
+        for code, (left, right) in HRIR_SPEAKER_EAR_CHANNELS.items():
+            ear_peaks = [max(abs(value) for value in wav.channels[ear]) for ear in (left, right)]
+            peak = max(ear_peaks)
+            if peak <= 0.0:
+                record["speakers"][code] = cls._empty_speaker()
+                continue
+            # Onset: first sample within 20 dB of the pair's peak, per ear
+            onsets = [
+                next(i for i, value in enumerate(wav.channels[ear]) if abs(value) >= peak * 0.1)
+                if ear_peak >= peak * 0.1 else frames
+                for ear, ear_peak in zip((left, right), ear_peaks)
+            ]
+            # Effective length: where 99.9% of the energy has arrived, from the earliest onset
+            ends = []
+            for ear in (left, right):
+                cumulative = list(itertools.accumulate(value * value for value in wav.channels[ear]))
+                ends.append(bisect.bisect_left(cumulative, cumulative[-1] * 0.999))
+            band_db = []
+            for ear in (left, right):
+                levels = []
+                for bins in band_bins:
+                    band_magnitude = math.sqrt(sum(spectra[ear][k] ** 2 for k in bins) / len(bins))
+                    level = 20 * math.log10(max(band_magnitude, 1e-9) / reference)
+                    levels.append(min(63.5, max(-64.0, round(level * 2) / 2)))
+                band_db.append(levels)
+            left_energy, right_energy = energies[left], energies[right]
+            record["speakers"][code] = {
+                "onset_ms": min(onsets) * 1000 / sample_rate,
+                "length_ms": (max(ends) - min(onsets) + 1) * 1000 / sample_rate,
+                "itd_ms": (onsets[1] - onsets[0]) * 1000 / sample_rate,
+                "ild_db": 10 * math.log10(max(left_energy, 1e-20) / max(right_energy, 1e-20)),
+                "level_db": 10 * math.log10(max(left_energy + right_energy, 1e-20) / peak_energy),
+                "bands_left_db": band_db[0],
+                "bands_right_db": band_db[1],
+            }
+        return record
+
+    @classmethod
+    def _empty_speaker(cls) -> dict:
+        return {"onset_ms": 0.0, "length_ms": 0.0, "itd_ms": 0.0, "ild_db": 0.0, "level_db": -200.0,
+                "bands_left_db": [-64.0] * cls.BAND_COUNT, "bands_right_db": [-64.0] * cls.BAND_COUNT}
+
+    @classmethod
+    def dsp_cost(cls, record: dict) -> dict:
+        """Estimates the cost of running an HRIR through the convolver graph."""
+        block = cls.CONVOLVER_BLOCK
+        partitions = max(1, math.ceil(record["frames"] / block))
+        fft_size = 2 * block
+        # Per block and convolver: one forward and one inverse FFT plus a complex multiply-add per partition bin
+        flops_per_block = 2 * 5 * fft_size * math.log2(fft_size) + partitions * (block + 1) * 8
+        blocks_per_second = record["sample_rate"] / block
+        return {
+            "taps": record["frames"],
+            "convolvers": cls.CONVOLVER_COUNT,
+            "partitions": partitions,
+            "estimated_mflops": round(cls.CONVOLVER_COUNT * flops_per_block * blocks_per_second / 1e6, 1),
+        }
+
+    @classmethod
+    def summary(cls, record: dict) -> dict:
+        """Returns the scalar per-speaker measurements and DSP cost of an analysis, without magnitude bands."""
+        return {
+            "sample_rate": record["sample_rate"],
+            "frames": record["frames"],
+            "length_ms": round(max(s["length_ms"] for s in record["speakers"].values()), 2),
+            "dsp_cost": cls.dsp_cost(record),
+            "speakers": {
+                code: {key: value for key, value in speaker.items() if not key.startswith("bands_")}
+                for code, speaker in record["speakers"].items()
+            },
+        }
+
+
+hrir_analysis_index = HrirAnalysisIndex(os.path.join(settings_dir, "cache", "hrir-analysis.idx"))
+
+
+class PresetLibrary:
+    """
+    Indexes HRIR WAV and SOFA presets from the bundled plugin directories and a user library under settings_dir.
+
+    Imported files are stored by content hash (library/<kind>/<sha256>.<ext>), so identical files are only kept
+    once and plugin updates never touch them. The bundled directories are only rescanned when their mtime
+    changes. Listing presets reads the JSON index rather than the filesystem.
+    """
+
+    KINDS = {"hrir": ".wav", "sofa": ".sofa"}
+    HDF5_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+    SUPPORTED_SAMPLE_RATES = (44100, 48000, 88200, 96000)
+    VALIDATION_WORKERS = 4
+    COPY_CHUNK_SIZE = 1 << 20
+
+    def __init__(self, directory: str, bundled_directories: dict[str, str]):
+        self.directory = directory
+        self.bundled_directories = bundled_directories
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._index: dict | None = None
+
+    def _load(self) -> dict:
+        if self._index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as infile:
+                    self._index = json.load(infile)
+            except FileNotFoundError:
+                self._index = {}
+            except (OSError, ValueError) as e:
+                decky.logger.warning("Discarding unreadable preset library index '%s': %s", self.index_path, e)
+                self._index = {}
+            self._index.setdefault("bundled", {})
+            self._index.setdefault("library", {})
+        return self._index
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".index-", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as outfile:
+                json.dump(self._index, outfile, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def validate(cls, kind: str, path: str) -> dict:
+        """Returns metadata for a preset file, raising ValueError when it cannot be used by the filter."""
+        if kind == "sofa":
+            with open(path, "rb") as infile:
+                if infile.read(len(cls.HDF5_SIGNATURE)) != cls.HDF5_SIGNATURE:
+                    raise ValueError("not a SOFA (HDF5) file")
+            return {"size": os.path.getsize(path)}
+        with open(path, "rb") as infile:
+            format_tag, channel_count, sample_rate, bits_per_sample, data_size = read_wav_header(infile)
+        if channel_count != HRIR_CHANNEL_COUNT:
+            raise ValueError(f"{channel_count} channels, expected a {HRIR_CHANNEL_COUNT} channel HeSuVi layout")
+        if sample_rate not in cls.SUPPORTED_SAMPLE_RATES:
+            raise ValueError(f"unsupported sample rate {sample_rate} Hz")
+        if data_size == 0:
+            raise ValueError("no sample data")
+        return {"channel_count": channel_count, "sample_rate": sample_rate, "size": os.path.getsize(path)}
+
+    def _scan_bundled(self, kind: str) -> list[dict]:
+        index = self._load()
+        directory = self.bundled_directories[kind]
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return []
+        cached = index["bundled"].get(kind)
+        if cached and cached.get("directory") == directory and cached.get("mtime_ns") == mtime_ns:
+            return cached["entries"]
+        entries = []
+        extension = self.KINDS[kind]
+        for filename in sorted(os.listdir(directory)):
+            filepath = os.path.join(directory, filename)
+            if not filename.endswith(extension) or not os.path.isfile(filepath):
+                continue
+            entry = {"label": filename[:-len(extension)], "path": filepath, "source": "bundled",
+                     "size": os.path.getsize(filepath), "digest": file_sha256(filepath)}
+            try:
+                entry.update(self.validate(kind, filepath))
+            except ValueError:
+                # Bundled files are listed even if the graph cannot use them, as they always have been
+                if kind == "hrir":
+                    with contextlib.suppress(OSError, ValueError), open(filepath, "rb") as infile:
+                        entry["channel_count"] = read_wav_header(infile)[1]
+            except OSError as e:
+                decky.logger.warning("Unable to read bundled preset %s: %s", filepath, e)
+            entries.append(entry)
+        index["bundled"][kind] = {"directory": directory, "mtime_ns": mtime_ns, "entries": entries}
+        try:
+            self._save()
+        except OSError as e:
+            decky.logger.warning("Failed to save preset library index: %s", e)
+        return entries
+
+    def list(self, kind: str) -> list[dict]:
+        """Returns bundled and imported presets of one kind."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._scan_bundled(kind)]
+            for digest, entry in self._load()["library"].items():
+                if entry["kind"] != kind:
+                    continue
+                path = os.path.join(self.directory, kind, digest + self.KINDS[kind])
+                entries.append({key: value for key, value in entry.items() if key != "kind"} | {
+                    "path": path, "source": "library"})
+            return entries
+
+    def _stream_to_library(self, kind: str, infile, staging_directory: str) -> tuple[str, str]:
+        """Copies a stream into the staging directory while hashing it. Returns (digest, staged path)."""
+        digest = hashlib.sha256()
+        fd, staged_path = tempfile.mkstemp(dir=staging_directory, suffix=self.KINDS[kind])
+        with os.fdopen(fd, "wb") as outfile:
+            for chunk in iter(lambda: infile.read(self.COPY_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                outfile.write(chunk)
+        return digest.hexdigest(), staged_path
+
+    def _sources(self, source_path: str):
+        """Yields (kind, name, opener) for each preset file in a directory tree or zip archive."""
+        extensions = {extension: kind for kind, extension in self.KINDS.items()}
+        if zipfile.is_zipfile(source_path):
+            with zipfile.ZipFile(source_path) as archive:
+                for member in archive.infolist():
+                    kind = extensions.get(os.path.splitext(member.filename)[1].lower())
+                    if kind and not member.is_dir():
+                        name = member.filename
+                        if not member.flag_bits & 0x800:
+                            # Archivers often store UTF-8 names without setting the UTF-8 flag
+                            with contextlib.suppress(UnicodeError):
+                                name = name.encode("cp437").decode("utf-8")
+                        yield kind, name, lambda m=member: archive.open(m)
+            return
+        for root, _dirs, files in os.walk(source_path):
+            for filename in sorted(files):
+                kind = extensions.get(os.path.splitext(filename)[1].lower())
+                if kind:
+                    filepath = os.path.join(root, filename)
+                    yield kind, os.path.relpath(filepath, source_path), lambda p=filepath: open(p, "rb")
+
+    def _unique_label(self, kind: str, label: str, taken: set[str]) -> str:
+        candidate = label
+        suffix = 2
+        while candidate in taken:
+            candidate = f"{label} ({suffix})"
+            suffix += 1
+        taken.add(candidate)
+        return candidate
+
+    def import_presets(self, source_path: str) -> dict:
+        """
+        Imports every HRIR WAV and SOFA file from a directory or zip archive. Files are stream-copied and hashed
+        one at a time, then the new ones are validated in parallel. Returns the imported, duplicate and rejected
+        files.
+        """
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(source_path)
+        result = {"imported": [], "duplicates": [], "rejected": []}
+        staging_directory = os.path.join(self.directory, ".staging")
+        os.makedirs(staging_directory, exist_ok=True)
+        try:
+            with self._lock:
+                # Files identical to a bundled preset are duplicates too
+                known = set(self._load()["library"])
+                for kind in self.KINDS:
+                    known.update(entry.get("digest") for entry in self._scan_bundled(kind))
+            staged = {}
+            for kind, name, opener in self._sources(source_path):
+                try:
+                    with opener() as infile:
+                        digest, staged_path = self._stream_to_library(kind, infile, staging_directory)
+                except (OSError, zipfile.BadZipFile) as e:
+                    result["rejected"].append({"name": name, "reason": str(e)})
+                    continue
+                if digest in known or digest in staged:
+                    os.remove(staged_path)
+                    result["duplicates"].append(name)
+                    continue
+                staged[digest] = (kind, name, staged_path)
+
+            def validate_staged(item):
+                kind, name, staged_path = item
+                try:
+                    return self.validate(kind, staged_path), None
+                except (OSError, ValueError) as e:
+                    return None, str(e)
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.VALIDATION_WORKERS) as pool:
+                validations = list(pool.map(validate_staged, staged.values()))
+
+            with self._lock:
+                library = self._load()["library"]
+                taken = {entry["label"] for entry in library.values()}
+                for kind in self.KINDS:
+                    taken.update(entry["label"] for entry in self._scan_bundled(kind))
+                for (digest, (kind, name, staged_path)), (metadata, error) in zip(staged.items(), validations):
+                    if error is not None:
+                        os.remove(staged_path)
+                        result["rejected"].append({"name": name, "reason": error})
+                        continue
+                    destination = os.path.join(self.directory, kind, digest + self.KINDS[kind])
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    os.replace(staged_path, destination)
+                    label = self._unique_label(kind, os.path.splitext(os.path.basename(name))[0], taken)
+                    library[digest] = {"kind": kind, "label": label, "source_name": name,
+                                       "imported": int(time.time()), **metadata}
+                    result["imported"].append({"kind": kind, "label": label, "path": destination})
+                self._save()
+        finally:
+            shutil.rmtree(staging_directory, ignore_errors=True)
+        decky.logger.info("Imported %d presets from %s (%d duplicates, %d rejected)", len(result["imported"]),
+                          source_path, len(result["duplicates"]), len(result["rejected"]))
+        return result
+
+    def remove(self, path: str) -> bool:
+        """Removes an imported preset from the library. Bundled presets cannot be removed."""
+        digest, extension = os.path.splitext(os.path.basename(path))
+        with self._lock:
+            library = self._load()["library"]
+            entry = library.get(digest)
+            if entry is None or self.KINDS[entry["kind"]] != extension:
+                return False
+            del library[digest]
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.directory, entry["kind"], digest + extension))
+            self._save()
+        return True
+
+
+preset_library = PresetLibrary(library_directory, {"hrir": hrir_directory, "sofa": sofa_directory})
+
+
+class ParametricEq:
+    """
+    A parametric EQ profile in the AutoEQ / Equalizer APO text format, eg.
+
+        Preamp: -6.2 dB
+        Filter 1: ON LSC Fc 105 Hz Gain 5.3 dB Q 0.70
+        Filter 2: ON PK Fc 2000 Hz Gain -2.1 dB Q 1.41
+
+    Filters are realised as RBJ cookbook biquads and rendered to a minimum phase impulse response that can be
+    folded into an HRIR, so equalization adds no filter nodes to the graph.
+    """
+
+    PREAMP_RE = re.compile(r"^\s*Preamp:\s*(?P<gain>[-+]?[\d.]+)\s*dB", re.IGNORECASE)
+    FILTER_RE = re.compile(
+        r"^\s*Filter\s*\d*:\s*(?P<state>ON|OFF)\s+(?P<type>[A-Z]+)\s+Fc\s+(?P<fc>[\d.]+)\s*Hz"
+        r"(?:\s+Gain\s+(?P<gain>[-+]?[\d.]+)\s*dB)?(?:\s+Q\s+(?P<q>[\d.]+))?",
+        re.IGNORECASE,
+    )
+    FILTER_TYPES = {"PK": "peak", "PEQ": "peak", "LS": "low_shelf", "LSC": "low_shelf", "HS": "high_shelf",
+                    "HSC": "high_shelf", "LP": "low_pass", "LPQ": "low_pass", "HP": "high_pass", "HPQ": "high_pass"}
+    # Upper bound on the rendered impulse response, trimmed further to where its energy has decayed
+    MAX_IR_LENGTH = 8192
+    IR_ENERGY_THRESHOLD = 1 - 1e-6
+
+    def __init__(self, preamp_db: float, filters: list[dict]):
+        self.preamp_db = preamp_db
+        self.filters = filters
+
+    @classmethod
+    def parse(cls, text: str) -> "ParametricEq":
+        """Parses an EQ profile, raising ValueError when it contains no usable filters or an unknown filter type."""
+        preamp_db = 0.0
+        filters = []
+        for line in text.splitlines():
+            if match := cls.PREAMP_RE.match(line):
+                preamp_db = float(match.group("gain"))
+                continue
+            match = cls.FILTER_RE.match(line)
+            if not match or match.group("state").upper() != "ON":
+                continue
+            filter_type = cls.FILTER_TYPES.get(match.group("type").upper())
+            if filter_type is None:
+                raise ValueError(f"Unsupported EQ filter type '{match.group('type')}'")
+            filters.append({
+                "type": filter_type,
+                "fc": float(match.group("fc")),
+                "gain_db": float(match.group("gain") or 0.0),
+                "q": float(match.group("q") or 0.7071),
+            })
+        if not filters and preamp_db == 0.0:
+            raise ValueError("No EQ filters found in profile")
+        return cls(preamp_db, filters)
+
+    def digest(self) -> str:
+        canonical = json.dumps({"preamp_db": self.preamp_db, "filters": self.filters}, sort_keys=True)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def biquad(filter_type: str, fc: float, gain_db: float, q: float, sample_rate: int) -> tuple[float, ...]:
+        """Returns normalised RBJ cookbook coefficients (b0, b1, b2, a1, a2)."""
+        a = 10 ** (gain_db / 40)
+        w0 = 2 * math.pi * min(fc, sample_rate * 0.49) / sample_rate
+        cos_w0, alpha = math.cos(w0), math.sin(w0) / (2 * q)
+        if filter_type == "peak":
+            b = (1 + alpha * a, -2 * cos_w0, 1 - alpha * a)
+            den = (1 + alpha / a, -2 * cos_w0, 1 - alpha / a)
+        elif filter_type in ("low_shelf", "high_shelf"):
+            sign = 1 if filter_type == "low_shelf" else -1
+            sqrt_a_alpha = 2 * math.sqrt(a) * alpha
+            b = (a * ((a + 1) - sign * (a - 1) * cos_w0 + sqrt_a_alpha),
+                 sign * 2 * a * ((a - 1) - sign * (a + 1) * cos_w0),
+                 a * ((a + 1) - sign * (a - 1) * cos_w0 - sqrt_a_alpha))
+            den = ((a + 1) + sign * (a - 1) * cos_w0 + sqrt_a_alpha,
+                   -sign * 2 * ((a - 1) + sign * (a + 1) * cos_w0),
+                   (a + 1) + sign * (a - 1) * cos_w0 - sqrt_a_alpha)
+        elif filter_type == "low_pass":
+            b = ((1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2)
+            den = (1 + alpha, -2 * cos_w0, 1 - alpha)
+        else:
+            b = ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2)
+            den = (1 + alpha, -2 * cos_w0, 1 - alpha)
+        return b[0] / den[0], b[1] / den[0], b[2] / den[0], den[1] / den[0], den[2] / den[0]
+
+    def impulse_response(self, sample_rate: int) -> list[float]:
+        """Renders the cascade of biquads (plus preamp) as an impulse response, trimmed once its energy decays."""
+        response = [0.0] * self.MAX_IR_LENGTH
+        response[0] = 10 ** (self.preamp_db / 20)
+        for eq_filter in self.filters:
+            b0, b1, b2, a1, a2 = self.biquad(eq_filter["type"], eq_filter["fc"], eq_filter["gain_db"],
+                                             eq_filter["q"], sample_rate)
+            x1 = x2 = y1 = y2 = 0.0
+            for i, x in enumerate(response):
+                y = b0 * x + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+                x2, x1, y2, y1 = x1, x, y1, y
+                response[i] = y
+        total = sum(value * value for value in response)
+        cumulative = 0.0
+        for length, value in enumerate(response, start=1):
+            cumulative += value * value
+            if cumulative >= total * self.IR_ENERGY_THRESHOLD:
+                return response[:length]
+        return response
+
+
+def equalized_hrir_path(hrir_path: str, eq: ParametricEq) -> str:
+    """
+    Returns the path of the HRIR with the EQ folded into every channel, rendering it on first use.
+    Files are cached by the content hash of the HRIR and the EQ profile.
+    """
+    path = os.path.join(settings_dir, "cache", "eq-hrir", f"{file_sha256(hrir_path)[:16]}-{eq.digest()[:16]}.wav")
+    if os.path.isfile(path):
+        return path
+    wav = read_wav(hrir_path)
+    if wav.frames == 0:
+        raise ValueError("WAV file contains no samples")
+    eq_response = eq.impulse_response(wav.sample_rate)
+    length = wav.frames + len(eq_response) - 1
+    fft_size = 1 << (length - 1).bit_length()
+    eq_spectrum = fft(eq_response + [0.0] * (fft_size - len(eq_response)))
+    # The EQ response is real, so two channels are convolved at once as the real and imaginary parts of one signal
+    combined = []
+    for pair in itertools.zip_longest(wav.channels[0::2], wav.channels[1::2]):
+        packed = [complex(a, b) for a, b in zip(pair[0], pair[1] or itertools.repeat(0.0))]
+        spectrum = fft(packed + [0j] * (fft_size - len(packed)))
+        convolved = fft([value * gain for value, gain in zip(spectrum, eq_spectrum)], inverse=True)[:length]
+        combined.append([value.real / fft_size for value in convolved])
+        if pair[1] is not None:
+            combined.append([value.imag / fft_size for value in convolved])
+    write_wav(path, wav.sample_rate, combined, float_samples=True)
+    decky.logger.info("Rendered equalized HRIR %s (%d taps, EQ adds %d)", path, length, len(eq_response) - 1)
+    return path
+
+
+# Number of per-channel HRIR splits kept. Convolvers load their IR when the filter chain starts, so evicting a split
+# never affects a running filter; service.sh falls back to the multichannel file if a split is missing.
+HRIR_SPLIT_CACHE_LIMIT = 8
+
+
+def split_hrir_channels(hrir_path: str) -> str:
+    """
+    Writes each channel of the HRIR as a mono 32-bit float WAV to hrir-split/<content hash>/<channel>.wav, where
+    service.sh points every convolver at its own channel file. Returns the split directory.
+    """
+    directory = os.path.join(hrir_split_directory, file_sha256(hrir_path)[:16])
+    if os.path.isdir(directory):
+        os.utime(directory)
+        return directory
+    wav = read_wav(hrir_path)
+    if len(wav.channels) != HRIR_CHANNEL_COUNT:
+        raise ValueError(f"HRIR has {len(wav.channels)} channels, the filter graph expects {HRIR_CHANNEL_COUNT}")
+    os.makedirs(hrir_split_directory, exist_ok=True)
+    # Stage the channels and rename the directory into place so service.sh never sees a partial split
+    staging = tempfile.mkdtemp(dir=hrir_split_directory, prefix=".tmp-")
+    try:
+        for channel, samples in enumerate(wav.channels):
+            write_wav(os.path.join(staging, f"{channel:02d}.wav"), wav.sample_rate, [samples], float_samples=True)
+        os.rename(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+    decky.logger.info("Split HRIR '%s' into %d channel files in %s", hrir_path, HRIR_CHANNEL_COUNT, directory)
+    splits = sorted(
+        (entry for entry in os.scandir(hrir_split_directory) if entry.is_dir() and not entry.name.startswith(".")),
+        key=lambda entry: entry.stat().st_mtime, reverse=True
+    )
+    for entry in splits[HRIR_SPLIT_CACHE_LIMIT:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return directory
+
+
+async def prepare_hrir_split(hrir_path: str):
+    """Splits an HRIR before a filter chain loads it. Failures only cost the faster load, so they are logged."""
+    try:
+        await asyncio.to_thread(split_hrir_channels, hrir_path)
+    except (ValueError, OSError, struct.error) as e:
+        decky.logger.warning("Unable to split HRIR '%s' into channel files, the filter will load the full file: %s",
+                             hrir_path, e)
+
+
+# Gain applied to every convolver output by the mixers of the filter graph (mix_gain_db in service.sh)
+HRIR_MIX_GAIN_DB = -6.0
+
+
+def hrir_preview_path(hrir_path: str) -> tuple[str, bool]:
+    """
+    Returns (path, cached) for a stereo preview of the channel identification signal rendered through the HRIR,
+    rendering it on first use. Previews are cached by the content hash of the HRIR.
+    """
+    path = os.path.join(settings_dir, "cache", "preview",
+                        f"{file_sha256(hrir_path)[:16]}-{channel_id_signal_key()}.wav")
+    if os.path.isfile(path):
+        return path, True
+    render_hrir_preview(hrir_path, channel_id_signal_path(), path)
+    return path, False
+
+
+def resample(samples: list[float], source_rate: int, target_rate: int, half_width: int = 16) -> list[float]:
+    """Band-limited resampling with a Hann windowed sinc kernel. Meant for short signals such as HRIRs."""
+    ratio = target_rate / source_rate
+    cutoff = min(1.0, ratio)
+    reach = half_width / cutoff
+    resampled = []
+    for n in range(max(1, int(round(len(samples) * ratio)))):
+        centre = n / ratio
+        value = 0.0
+        for k in range(max(0, math.ceil(centre - reach)), min(len(samples), math.floor(centre + reach) + 1)):
+            x = (k - centre) * cutoff
+            if x == 0.0:
+                value += samples[k] * cutoff
+                continue
+            window = 0.5 + 0.5 * math.cos(math.pi * x / half_width)
+            value += samples[k] * cutoff * window * math.sin(math.pi * x) / (math.pi * x)
+        resampled.append(value)
+    return resampled
+
+
+def render_hrir_preview(hrir_path: str, clip_path: str, path: str):
+    """
+    Renders a 7.1 clip to binaural stereo offline, the way the convolver graph in service.sh does: each speaker is
+    convolved with its (left ear, right ear) HRIR channels, summed per ear and scaled by the mixer gain. Channel
+    gains are left at unity. HRIRs at a different sample rate than the clip are resampled first.
+
+    Convolution is done by overlap-add in blocks, skipping silent blocks of the clip. The left and right ear
+    responses of a speaker are packed into one complex kernel, so each block costs one forward and one inverse FFT.
+    """
+    clip = read_wav(clip_path)
+    hrir = read_wav(hrir_path)
+    if len(clip.channels) != len(SURROUND_CHANNEL_ORDER):
+        raise ValueError(f"Preview clip has {len(clip.channels)} channels, expected {len(SURROUND_CHANNEL_ORDER)}")
+    if len(hrir.channels) != HRIR_CHANNEL_COUNT:
+        raise ValueError(f"HRIR has {len(hrir.channels)} channels, the filter graph expects {HRIR_CHANNEL_COUNT}")
+    if clip.frames == 0 or hrir.frames == 0:
+        raise ValueError("WAV file contains no samples")
+    hrir_channels = hrir.channels
+    if hrir.sample_rate != clip.sample_rate:
+        hrir_channels = [resample(channel, hrir.sample_rate, clip.sample_rate) for channel in hrir_channels]
+    hrir_frames = len(hrir_channels[0])
+    length = clip.frames + hrir_frames - 1
+    fft_size = 1 << max(13, (2 * hrir_frames - 1).bit_length())
+    block = fft_size - hrir_frames + 1
+    ears = [[0.0] * length, [0.0] * length]
+    kernels: dict[tuple[int, int], list[complex]] = {}
+    for speaker, code in enumerate(SURROUND_CHANNEL_ORDER):
+        samples = clip.channels[speaker]
+        for start in range(0, clip.frames, block):
+            chunk = samples[start:start + block]
+            if not any(chunk):
+                continue
+            ear_channels = HRIR_SPEAKER_EAR_CHANNELS[code]
+            if ear_channels not in kernels:
+                left, right = (hrir_channels[channel] for channel in ear_channels)
+                kernels[ear_channels] = fft([complex(a, b) for a, b in zip(left, right)] +
+                                            [0j] * (fft_size - hrir_frames))
+            spectrum = fft(chunk + [0.0] * (fft_size - len(chunk)))
+            convolved = fft([value * gain for value, gain in zip(spectrum, kernels[ear_channels])], inverse=True)
+            for offset, value in enumerate(convolved[:min(fft_size, length - start)]):
+                ears[0][start + offset] += value.real
+                ears[1][start + offset] += value.imag
+    gain = 10 ** (HRIR_MIX_GAIN_DB / 20) / fft_size
+    stereo = [[value * gain for value in ear] for ear in ears]
+    peak = max(abs(value) for channel in stereo for value in channel)
+    if peak > 1.0:
+        decky.logger.info("HRIR preview of '%s' peaks at %+.1f dBFS, scaling it down", hrir_path,
+                          20 * math.log10(peak))
+        stereo = [[value / peak for value in channel] for channel in stereo]
+    write_wav(path, clip.sample_rate, stereo, float_samples=True)
+    decky.logger.info("Rendered HRIR preview %s (%.2fs)", path, length / clip.sample_rate)
+
+
+class AppMatcher:
+    """
+    Compiled index of the rules that enable Virtual Surround Sound for an app.
+
+    Exact rules are stored in a hash set per field and all glob rules for a field are merged into a single
+    alternation pattern, so a stream costs at most one set lookup and one glob match per field regardless of the
+    number of rules. Regex rules are compiled separately and searched in turn, since user patterns may carry inline
+    flags, named groups or backreferences that cannot be merged. Results are cached per stream fingerprint.
+    """
+
+    FIELDS = ("application.name", "application.process.binary", "steam.app_id")
+    MATCH_TYPES = ("exact", "glob", "regex")
+    _CACHE_LIMIT = 1024
+
+    def __init__(self, rules: list[dict] | None = None, enabled_apps: list[str] | None = None):
+        self._exact: dict[str, set[str]] = {field: set() for field in self.FIELDS}
+        patterns: dict[str, list[str]] = {field: [] for field in self.FIELDS}
+        self._regexes: dict[str, list[re.Pattern]] = {field: [] for field in self.FIELDS}
+        # The legacy list of enabled app names are exact matches on the app name
+        for app_name in enabled_apps or []:
+            if isinstance(app_name, str) and app_name:
+                self._exact["application.name"].add(app_name)
+        for rule in rules or []:
+            try:
+                field, match_type, pattern = self.compile_rule(rule)
+            except ValueError as e:
+                decky.logger.warning("Ignoring invalid app rule %s: %s", rule, e)
+                continue
+            if match_type == "exact":
+                self._exact[field].add(pattern)
+            elif match_type == "glob":
+                patterns[field].append(fnmatch.translate(pattern))
+            else:
+                self._regexes[field].append(re.compile(pattern))
+        self._patterns: dict[str, re.Pattern | None] = {}
+        for field, field_patterns in patterns.items():
+            try:
+                self._patterns[field] = re.compile(
+                    "|".join(f"(?:{p})" for p in field_patterns)) if field_patterns else None
+            except re.error as e:
+                decky.logger.warning("Ignoring glob app rules for %s: %s", field, e)
+                self._patterns[field] = None
+        self._cache: dict[tuple, bool] = {}
+
+    @classmethod
+    def compile_rule(cls, rule) -> tuple[str, str, str]:
+        """Validates a rule dict and returns its (field, match type, pattern). Raises ValueError if invalid."""
+        if not isinstance(rule, dict):
+            raise ValueError("rule must be an object")
+        field = rule.get("field", "application.name")
+        match_type = rule.get("match", "exact")
+        pattern = rule.get("pattern")
+        if field not in cls.FIELDS:
+            raise ValueError(f"unknown field '{field}'")
+        if match_type not in cls.MATCH_TYPES:
+            raise ValueError(f"unknown match type '{match_type}'")
+        if not isinstance(pattern, str) or not pattern:
+            raise ValueError("pattern must be a non-empty string")
+        if match_type == "regex":
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"invalid regex: {e}") from e
+        return field, match_type, pattern
+
+    def matches(self, app_name: str | None, binary: str | None, steam_app_id: str | None) -> bool:
+        fingerprint = (app_name, binary, steam_app_id)
+        cached = self._cache.get(fingerprint)
+        if cached is not None:
+            return cached
+        result = False
+        for field, value in zip(self.FIELDS, fingerprint):
+            if not value:
+                continue
+            if value in self._exact[field]:
+                result = True
+                break
+            pattern = self._patterns[field]
+            if pattern is not None and pattern.fullmatch(value):
+                result = True
+                break
+            if any(regex.search(value) for regex in self._regexes[field]):
+                result = True
+                break
+        if len(self._cache) >= self._CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[fingerprint] = result
+        return result
+
+
+class WirePlumberStreamRules:
+    """
+    Generates WirePlumber 0.5 `stream.rules` from the enabled apps and app rules, so WirePlumber creates the streams
+    of enabled apps directly on the Virtual Surround Sound sink instead of the reconciler moving them afterwards.
+
+    Matching streams get `target.object` set to the VSS sink plus the MARKER_PROPERTY, which tells the reconciler
+    that the target came from these rules rather than from the app pinning its own output. WirePlumber only reads
+    its configuration on start, so changes apply from its next start; until then the reconciler keeps correcting
+    streams as before.
+
+    WirePlumber matches `~` values as POSIX extended regexes, so regex rules are translated from Python syntax.
+    Rules using features ERE lacks (lookarounds, backreferences, inline flags, word boundaries, ...) are left out
+    of the file, and the reconciler keeps routing their streams.
+    """
+
+    MARKER_PROPERTY = "vss.routed"
+    _POSIX_REGEX_SPECIAL = set(".^$*+?()[]{}|\\")
+    _POSIX_CLASS_ESCAPES = {"d": "0-9", "s": "[:space:]", "w": "[:alnum:]_"}
+    _QUANTIFIER_RE = re.compile(r"\{\d+(?:,\d*)?\}")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._written_content: str | None = None
+
+    @classmethod
+    def is_marked(cls, props: dict) -> bool:
+        return str(props.get(cls.MARKER_PROPERTY, "")).lower() in ("true", "1")
+
+    @classmethod
+    def _escape(cls, text: str) -> str:
+        return "".join(f"\\{char}" if char in cls._POSIX_REGEX_SPECIAL else char for char in text)
+
+    @classmethod
+    def _glob_to_regex(cls, pattern: str) -> str:
+        """Translates an fnmatch glob into an anchored POSIX extended regex, as WirePlumber uses regcomp()"""
+        parts = []
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if char == "*":
+                parts.append(".*")
+            elif char == "?":
+                parts.append(".")
+            elif char == "[" and "]" in pattern[i + 2:]:
+                end = pattern.index("]", i + 2)
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+            else:
+                parts.append(cls._escape(char))
+            i += 1
+        return "^" + "".join(parts) + "$"
+
+    @classmethod
+    def _regex_to_posix(cls, pattern: str) -> str | None:
+        """
+        Translates the subset of Python regex syntax that POSIX ERE can express, or returns None. Only whether a
+        value matches is used, so lazy quantifiers are made greedy.
+        """
+        parts = []
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if char == "\\":
+                if i + 1 >= len(pattern):
+                    return None
+                escaped = pattern[i + 1]
+                if escaped.lower() in cls._POSIX_CLASS_ESCAPES:
+                    negate = "^" if escaped.isupper() else ""
+                    parts.append(f"[{negate}{cls._POSIX_CLASS_ESCAPES[escaped.lower()]}]")
+                elif escaped in cls._POSIX_REGEX_SPECIAL:
+                    parts.append(f"\\{escaped}")
+                elif not escaped.isalnum() and escaped.isprintable():
+                    parts.append(escaped)
+                else:
+                    # Backreferences, anchors such as \b and \A, and control character escapes
+                    return None
+                i += 2
+            elif char == "[":
+                end, body = cls._posix_bracket(pattern, i)
+                if body is None:
+                    return None
+                parts.append(body)
+                i = end
+            elif char == "(":
+                if pattern.startswith("(?:", i):
+                    i += 3
+                elif pattern.startswith("(?", i):
+                    # Named groups, lookarounds, inline flags and comments
+                    return None
+                else:
+                    i += 1
+                parts.append("(")
+            elif char in "*+?":
+                parts.append(char)
+                i += 1
+                if pattern.startswith("+", i):
+                    # Possessive quantifiers change which values match
+                    return None
+                if pattern.startswith("?", i):
+                    i += 1
+            elif char == "{":
+                quantifier = cls._QUANTIFIER_RE.match(pattern, i)
+                if quantifier is None:
+                    parts.append("\\{")
+                    i += 1
+                    continue
+                parts.append(quantifier.group())
+                i = quantifier.end()
+                if pattern.startswith("+", i):
+                    return None
+                if pattern.startswith("?", i):
+                    i += 1
+            elif char == "}":
+                parts.append("\\}")
+                i += 1
+            else:
+                parts.append(char)
+                i += 1
+        return "".join(parts)
+
+    @classmethod
+    def _posix_bracket(cls, pattern: str, start: int) -> tuple[int, str | None]:
+        """Translates the bracket expression starting at pattern[start], returning (end index, bracket or None)"""
+        i = start + 1
+        negate = pattern.startswith("^", i)
+        if negate:
+            i += 1
+        items = []
+        # "]", "^" and "-" cannot be escaped in a POSIX bracket, so they are placed where they are literal
+        literal_bracket = literal_caret = literal_dash = False
+        first = True
+        while i < len(pattern):
+            char = pattern[i]
+            if char == "]" and not first:
+                break
+            if char == "[" and pattern[i + 1:i + 2] in (":", "=", "."):
+                return i, None
+            if char == "\\":
+                escaped = pattern[i + 1:i + 2]
+                if escaped in cls._POSIX_CLASS_ESCAPES:
+                    items.append(cls._POSIX_CLASS_ESCAPES[escaped])
+                elif escaped == "]":
+                    literal_bracket = True
+                elif escaped == "^":
+                    literal_caret = True
+                elif escaped == "-":
+                    literal_dash = True
+                elif escaped and not escaped.isalnum() and escaped.isprintable():
+                    items.append(escaped)
+                else:
+                    return i, None
+                i += 2
+            elif char == "]":
+                literal_bracket = True
+                i += 1
+            else:
+                items.append(char)
+                i += 1
+            first = False
+        else:
+            return i, None
+        body = "".join(items)
+        if body.startswith("-") or body.endswith("-"):
+            body = body.strip("-")
+            literal_dash = True
+        # Emitted as "]" first, then the items, "^" and "-" last, unless that would put "^" first
+        if literal_caret and not negate and not literal_bracket and not body:
+            return i + 1, "[-^]" if literal_dash else "\\^"
+        return i + 1, "".join((
+            "[", "^" if negate else "", "]" if literal_bracket else "", body, "^" if literal_caret else "",
+            "-" if literal_dash else "", "]",
+        ))
+
+    @classmethod
+    def _match_values(cls, match_type: str, pattern: str) -> str | None:
+        if match_type == "glob":
+            return "~" + cls._glob_to_regex(pattern)
+        if match_type == "regex":
+            translated = cls._regex_to_posix(pattern)
+            return "~" + translated if translated is not None else None
+        # A leading "~" would make WirePlumber treat an exact value as a regex
+        return f"~^{cls._escape(pattern)}$" if pattern.startswith("~") else pattern
+
+    @classmethod
+    def render(cls, enabled_apps: list[str], rules: list[dict], target_name: str) -> str | None:
+        """Returns the configuration file contents, or None if no app is enabled"""
+        matches: list[tuple[str, str]] = []
+        for app_name in enabled_apps or []:
+            if isinstance(app_name, str) and app_name:
+                matches.append(("application.name", cls._match_values("exact", app_name)))
+        for rule in rules or []:
+            try:
+                field, match_type, pattern = AppMatcher.compile_rule(rule)
+            except ValueError:
+                continue
+            value = cls._match_values(match_type, pattern)
+            if value is None:
+                decky.logger.info("Regex rule '%s' cannot be expressed for WirePlumber; the reconciler will route "
+                                  "its streams", pattern)
+                continue
+            # Steam app IDs are read from several properties, depending on how the game was launched
+            for key in (STEAM_APP_ID_PROPERTY_KEYS if field == "steam.app_id" else (field,)):
+                matches.append((key, value))
+        matches = list(dict.fromkeys(matches))
+        if not matches:
+            return None
+        lines = [
+            "# Generated by the Virtual Surround Sound plugin from its enabled apps. Changes will be overwritten.",
+            "stream.rules = [",
+            "  {",
+            "    matches = [",
+            *(f"      {{ {key} = {json.dumps(value)} }}" for key, value in matches),
+            "    ]",
+            "    actions = {",
+            "      update-props = {",
+            f"        target.object = {json.dumps(target_name)}",
+            f"        {cls.MARKER_PROPERTY} = true",
+            "      }",
+            "    }",
+            "  }",
+            "]",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def sync(self, enabled_apps: list[str], rules: list[dict], target_name: str) -> bool:
+        """Writes the rules if they differ from the file on disk. Returns True if the file was changed."""
+        content = self.render(enabled_apps, rules, target_name)
+        if self._written_content is not None and content == self._written_content:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        except OSError as e:
+            decky.logger.warning("Unable to read WirePlumber rules %s: %s", self.path, e)
+            current = None
+        self._written_content = content
+        if content == current:
+            return False
+        if content is None:
+            self.remove()
+            return True
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".conf")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as outfile:
+                    outfile.write(content)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            self._written_content = None
+            decky.logger.error("Unable to write WirePlumber rules %s: %s", self.path, e)
+            return False
+        decky.logger.info("Updated WirePlumber stream rules %s (%s matches). They apply from WirePlumber's next start.",
+                          self.path, content.count("\n      { "))
+        return True
+
+    def remove(self):
+        self._written_content = None
+        if os.path.exists(self.path):
+            decky.logger.info("Removing WirePlumber stream rules %s", self.path)
+            with contextlib.suppress(OSError):
+                os.remove(self.path)
+
+
+class JsonStreamParser:
+    """
+    Incremental parser that splits a stream of concatenated JSON documents (such as `pw-dump --monitor` output)
+    into complete values. Each character is scanned once, tracking string/escape state and bracket depth, so a
+    document is only decoded once its final closing bracket has arrived.
+    """
+
+    _TOKEN_RE = re.compile(r'[\[\]{}"\\]')
+    _STRING_TOKEN_RE = re.compile(r'["\\]')
+
+    def __init__(self):
+        self._buffer = ""
+        self._scan_pos = 0
+        self._start: int | None = None
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, data: str) -> list:
+        self._buffer += data
+        values = []
+        buffer = self._buffer
+        pos = self._scan_pos
+        while True:
+            if self._in_string:
+                match = self._STRING_TOKEN_RE.search(buffer, pos)
+            else:
+                match = self._TOKEN_RE.search(buffer, pos)
+            if match is None:
+                break
+            token = match.group()
+            pos = match.end()
+            if self._in_string:
+                if token == "\\":
+                    if pos >= len(buffer):
+                        # Escape sequence is split across chunks; rescan it with the next chunk
+                        pos = match.start()
+                        break
+                    pos += 1
+                else:
+                    self._in_string = False
+                continue
+            if token == '"':
+                self._in_string = True
+            elif token in "[{":
+                if self._depth == 0:
+                    self._start = match.start()
+                self._depth += 1
+            elif token in "]}":
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    try:
+                        values.append(json.loads(buffer[self._start:pos]))
+                    except json.JSONDecodeError as e:
+                        decky.logger.warning("Discarding malformed JSON document from stream: %s", e)
+                    buffer = buffer[pos:]
+                    pos = 0
+                    self._start = None
+                elif self._depth < 0:
+                    self._depth = 0
+        if self._start is None and self._depth == 0 and not self._in_string:
+            # Nothing pending, drop any whitespace between documents
+            buffer = ""
+            pos = 0
+        self._buffer = buffer
+        self._scan_pos = pos
+        return values
+
+
+class PipeWireGraph:
+    """
+    In-memory mirror of the PipeWire object graph fed by a streaming `pw-dump --monitor` parser.
+
+    Objects are indexed by id, nodes by name and media class, and ports/links by node. Each update from pw-dump is
+    applied as a diff and bumps `version`. Sinks and sink inputs can be projected into the same shape as the
+    `pactl -f json` listings so that existing code can consume either source.
+    """
+
+    NODE_TYPE = "PipeWire:Interface:Node"
+    PORT_TYPE = "PipeWire:Interface:Port"
+    LINK_TYPE = "PipeWire:Interface:Link"
+    DEVICE_TYPE = "PipeWire:Interface:Device"
+    METADATA_TYPE = "PipeWire:Interface:Metadata"
+
+    def __init__(self):
+        self.objects: dict[int, dict] = {}
+        self.nodes_by_name: dict[str, int] = {}
+        self.nodes_by_media_class: dict[str, set[int]] = collections.defaultdict(set)
+        self.ports_by_node: dict[int, set[int]] = collections.defaultdict(set)
+        self.links_by_output_node: dict[int, set[int]] = collections.defaultdict(set)
+        self.links_by_input_node: dict[int, set[int]] = collections.defaultdict(set)
+        self.version = 0
+        self._changed = asyncio.Event()
+        self._ready = False
+        self._task: asyncio.Task | None = None
+        self._process: asyncio.subprocess.Process | None = None
+
+    @property
+    def ready(self) -> bool:
+        """True once the initial dump has been received from a running pw-dump monitor."""
+        return self._ready
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def wait_for_change(self, version: int, timeout: float) -> int:
+        """Waits until the graph version differs from `version` (or the timeout expires) and returns it."""
+        if self.version == version:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._changed.wait(), timeout)
+        return self.version
+
+    async def _monitor(self):
+        while True:
+            try:
+                self._process = await asyncio.create_subprocess_exec(
+                    "pw-dump", "--monitor", "--no-colors",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    env=subprocess_exec_env()
+                )
+            except FileNotFoundError:
+                decky.logger.warning("pw-dump not found. Falling back to pactl for graph lookups.")
+                return
+            parser = JsonStreamParser()
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            try:
+                while True:
+                    chunk = await self._process.stdout.read(65536)
+                    if not chunk:
+                        break
+                    text = decoder.decode(chunk)
+                    if command_executor.trace:
+                        command_executor.trace.record_graph(text)
+                    self.feed(parser, text)
+            except asyncio.CancelledError:
+                with contextlib.suppress(ProcessLookupError):
+                    self._process.terminate()
+                with contextlib.suppress(asyncio.TimeoutError, asyncio.CancelledError):
+                    await asyncio.wait_for(self._process.wait(), 2)
+                raise
+            finally:
+                self._ready = False
+            decky.logger.warning("pw-dump monitor exited; restarting graph mirror")
+            if command_executor.trace:
+                command_executor.trace.record_graph(None)
+            self.clear()
+            await asyncio.sleep(1)
+
+    def feed(self, parser: JsonStreamParser, text: str):
+        """Applies pw-dump output to the mirror. Also used to replay recorded monitor output."""
+        for update in parser.feed(text):
+            self.apply_update(update)
+            if not self._ready:
+                self._ready = True
+                decky.logger.info("PipeWire graph mirror ready (%s objects)", len(self.objects))
+
+    def clear(self):
+        self.objects.clear()
+        self.nodes_by_name.clear()
+        self.nodes_by_media_class.clear()
+        self.ports_by_node.clear()
+        self.links_by_output_node.clear()
+        self.links_by_input_node.clear()
+        self._bump_version()
+
+    def _bump_version(self):
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def apply_update(self, update):
+        """Applies one pw-dump document (a list of added, changed or removed objects) to the mirror."""
+        if not isinstance(update, list):
+            return
+        for entry in update:
+            if not isinstance(entry, dict) or not isinstance(entry.get("id"), int):
+                continue
+            object_id = entry["id"]
+            existing = self.objects.get(object_id)
+            if existing is not None:
+                self._unindex(existing)
+            if "info" in entry and entry["info"] is None:
+                # Removed object
+                self.objects.pop(object_id, None)
+                continue
+            if existing is not None:
+                merged = dict(existing)
+                for key, value in entry.items():
+                    if key == "info" and isinstance(value, dict) and isinstance(existing.get("info"), dict):
+                        merged["info"] = {**existing["info"], **value}
+                    else:
+                        merged[key] = value
+                entry = merged
+            self.objects[object_id] = entry
+            self._index(entry)
+        self._bump_version()
+
+    def _index(self, obj: dict):
+        object_id = obj["id"]
+        object_type = obj.get("type")
+        info = obj.get("info") or {}
+        props = info.get("props") or {}
+        if object_type == self.NODE_TYPE:
+            name = props.get("node.name")
+            if name:
+                self.nodes_by_name[name] = object_id
+            media_class = props.get("media.class")
+            if media_class:
+                self.nodes_by_media_class[media_class].add(object_id)
+        elif object_type == self.PORT_TYPE:
+            node_id = props.get("node.id")
+            if node_id is not None:
+                self.ports_by_node[int(node_id)].add(object_id)
+        elif object_type == self.LINK_TYPE:
+            if info.get("output-node-id") is not None:
+                self.links_by_output_node[info["output-node-id"]].add(object_id)
+            if info.get("input-node-id") is not None:
+                self.links_by_input_node[info["input-node-id"]].add(object_id)
+
+    def _unindex(self, obj: dict):
+        object_id = obj["id"]
+        info = obj.get("info") or {}
+        props = info.get("props") or {}
+        name = props.get("node.name")
+        if name and self.nodes_by_name.get(name) == object_id:
+            del self.nodes_by_name[name]
+        media_class = props.get("media.class")
+        if media_class:
+            self.nodes_by_media_class[media_class].discard(object_id)
+        node_id = props.get("node.id")
+        if node_id is not None:
+            self.ports_by_node[int(node_id)].discard(object_id)
+        if info.get("output-node-id") is not None:
+            self.links_by_output_node[info["output-node-id"]].discard(object_id)
+        if info.get("input-node-id") is not None:
+            self.links_by_input_node[info["input-node-id"]].discard(object_id)
+
+    def node(self, object_id: int) -> dict | None:
+        obj = self.objects.get(object_id)
+        return obj if obj and obj.get("type") == self.NODE_TYPE else None
+
+    def node_by_name(self, name: str) -> dict | None:
+        object_id = self.nodes_by_name.get(name)
+        return self.node(object_id) if object_id is not None else None
+
+    def nodes_with_media_class(self, media_class: str) -> list[dict]:
+        return [self.objects[i] for i in sorted(self.nodes_by_media_class.get(media_class, ())) if i in self.objects]
+
+    @staticmethod
+    def node_props(node: dict | None) -> dict:
+        return ((node or {}).get("info") or {}).get("props") or {}
+
+    def node_index(self, node: dict) -> int:
+        """Returns the index pipewire-pulse reports for a node (its object.serial)."""
+        props = self.node_props(node)
+        try:
+            return int(props.get("object.serial", node["id"]))
+        except (TypeError, ValueError):
+            return node["id"]
+
+    def linked_input_nodes(self, node_id: int) -> list[int]:
+        """Returns the ids of the nodes that the given node's output ports are linked to."""
+        node_ids = []
+        for link_id in sorted(self.links_by_output_node.get(node_id, ())):
+            info = (self.objects.get(link_id) or {}).get("info") or {}
+            input_node_id = info.get("input-node-id")
+            if input_node_id is not None and input_node_id not in node_ids:
+                node_ids.append(input_node_id)
+        return node_ids
+
+    def default_sink_name(self) -> str | None:
+        for obj in self.objects.values():
+            if obj.get("type") != self.METADATA_TYPE or (obj.get("props") or {}).get("metadata.name") != "default":
+                continue
+            for item in obj.get("metadata") or []:
+                if item.get("key") == "default.audio.sink" and isinstance(item.get("value"), dict):
+                    return item["value"].get("name")
+        return None
+
+    def _device_route_availability(self, props: dict) -> list[dict]:
+        device = self.objects.get(self._to_int(props.get("device.id")))
+        if not device:
+            return []
+        profile_device = self._to_int(props.get("card.profile.device"))
+        routes = ((device.get("info") or {}).get("params") or {}).get("EnumRoute") or []
+        availability_names = {"yes": "available", "no": "not available"}
+        ports = []
+        for route in routes:
+            if not isinstance(route, dict) or route.get("direction") != "Output":
+                continue
+            if profile_device is not None and profile_device not in (route.get("devices") or []):
+                continue
+            ports.append({
+                "name": route.get("name"),
+                "availability": availability_names.get(route.get("available"), "availability unknown"),
+            })
+        return ports
+
+    @staticmethod
+    def _to_int(value) -> int | None:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def pactl_sinks(self) -> list[dict]:
+        """Projects Audio/Sink nodes into the shape of `pactl -f json list sinks` entries."""
+        sinks = []
+        for node in self.nodes_with_media_class("Audio/Sink"):
+            props = dict(self.node_props(node))
+            props["object.id"] = str(node["id"])
+            sinks.append({
+                "index": self.node_index(node),
+                "name": props.get("node.name"),
+                "description": props.get("node.description"),
+                "properties": props,
+                "ports": self._device_route_availability(props),
+                "channel_map": [
+                    PACTL_CHANNEL_NAMES.get(position, position.lower())
+                    for position in str(props.get("audio.position") or "").replace(" ", "").split(",") if position
+                ],
+            })
+        return sinks
+
+    def pactl_sink_inputs(self) -> list[dict]:
+        """Projects playback stream nodes into the shape of `pactl -f json list sink-inputs` entries."""
+        sink_node_ids = self.nodes_by_media_class.get("Audio/Sink", set())
+        sink_inputs = []
+        for node in self.nodes_with_media_class("Stream/Output/Audio"):
+            props = dict(self.node_props(node))
+            props["object.id"] = str(node["id"])
+            sink_id = next((i for i in self.linked_input_nodes(node["id"]) if i in sink_node_ids), None)
+            sink_node = self.node(sink_id) if sink_id is not None else None
+            sink_input = {
+                "index": self.node_index(node),
+                "sink": self.node_index(sink_node) if sink_node else -1,
+                "properties": props,
+            }
+            sink_input.update(self._pactl_format_fields(node))
+            volume = self._pactl_volume_field(node)
+            if volume:
+                sink_input["volume"] = volume
+            sink_inputs.append(sink_input)
+        return sink_inputs
+
+    @staticmethod
+    def _pactl_volume_field(node: dict) -> dict:
+        """
+        Converts a node's Props channel volumes into pactl's per-channel `volume` field. PipeWire stores linear
+        amplitudes while pactl reports cubic volumes, so each value is mapped the way pipewire-pulse does.
+        """
+        props_params = ((node.get("info") or {}).get("params") or {}).get("Props") or []
+        props = next((p for p in props_params if isinstance(p, dict) and "channelVolumes" in p), None)
+        if props is None:
+            return {}
+        channel_volumes = props.get("channelVolumes") or []
+        channel_map = props.get("channelMap") or []
+        volume = {}
+        for position, linear in enumerate(channel_volumes):
+            try:
+                linear = max(0.0, float(linear))
+            except (TypeError, ValueError):
+                continue
+            cubic = linear ** (1 / 3)
+            code = channel_map[position] if position < len(channel_map) else f"AUX{position}"
+            volume[PACTL_CHANNEL_NAMES.get(code, str(code).lower())] = {
+                "value": int(round(cubic * 65536)),
+                "value_percent": f"{int(round(cubic * 100))}%",
+                "db": f"{20 * math.log10(linear):.2f} dB" if linear > 0 else "-inf dB",
+            }
+        return volume
+
+    def _pactl_format_fields(self, node: dict) -> dict:
+        """Converts a node's negotiated Format param into pactl's format, sample spec and channel map fields."""
+        formats = ((node.get("info") or {}).get("params") or {}).get("Format") or []
+        if not formats or not isinstance(formats[0], dict):
+            return {}
+        spa_format = formats[0]
+        sample_format = str(spa_format.get("format") or "").lower()
+        if sample_format[:1] == "f":
+            sample_format = "float" + sample_format[1:]
+        channel_map = [PACTL_CHANNEL_NAMES.get(position, str(position).lower())
+                       for position in spa_format.get("position") or []]
+        return {
+            "format": "pcm" if spa_format.get("mediaSubtype") == "raw" else str(spa_format.get("mediaSubtype") or ""),
+            "sample_specification":
+                f"{sample_format} {spa_format.get('channels', '')}ch {spa_format.get('rate', '')}Hz",
+            "channel_map": ",".join(channel_map),
+        }
+
+
+def control_command_args(node_id: int, params: dict[str, float]) -> tuple[str, ...]:
+    """Describes a filter control update as a command line for traces."""
+    return ("pw-cli", "set-param", str(node_id), *(f"{name}={value}" for name, value in params.items()))
+
+
+class FilterControlChannel:
+    """
+    Persistent `pw-cli` session used to push control parameter updates (eg. channel gains) to a running
+    filter-chain node without spawning a process per update.
+
+    The session does not report errors back, so the first update sent to each node is verified in the background
+    by reading the node's Props with `pw-cli enum-params`. Updates return as soon as they are written, and once a
+    node has failed verification every further update to it returns False.
+    """
+
+    VERIFY_ATTEMPTS = 3
+    VERIFY_DELAY = 0.05
+    VERIFY_TOLERANCE = 1e-4
+    # A control in the Props params struct: its name followed by its value on the next line
+    _PROPS_PARAM_RE = re.compile(r'String "([^"]*)"\s*\n\s*(?:Float|Double|Int|Long) (\S+)')
+
+    def __init__(self):
+        self._process: asyncio.subprocess.Process | None = None
+        self._lock = asyncio.Lock()
+        # Maps node id -> verification result, or None while the verification is still running
+        self._verified_nodes: dict[int, bool | None] = {}
+        self._verify_tasks: set[asyncio.Task] = set()
+
+    async def _ensure_process(self) -> asyncio.subprocess.Process | None:
+        if self._process is not None and self._process.returncode is None:
+            return self._process
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                "pw-cli",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                env=subprocess_exec_env()
+            )
+        except FileNotFoundError:
+            decky.logger.warning("pw-cli not found. Filter controls are unavailable.")
+            self._process = None
+        return self._process
+
+    async def set_params(self, node_id: int, params: dict[str, float]) -> bool:
+        """
+        Sets filter graph control values (eg. {"gainFL:Mult": 1.0}) on the given filter node. Returns False if the
+        session is unavailable or the node failed verification of an earlier update.
+        """
+        if self._verified_nodes.get(node_id) is False:
+            return False
+        param_args = " ".join(f'"{name}" {value}' for name, value in params.items())
+        command = f"set-param {node_id} Props {{ params = [ {param_args} ] }}\n"
+        if command_executor.trace:
+            args = control_command_args(node_id, params)
+            command_executor.trace.record_command(args, None, command_executor.trace.elapsed_ms(), 0.0,
+                                                  CommandResult(args, 0, b"", b"", 0.0))
+        async with self._lock:
+            process = await self._ensure_process()
+            if process is None or process.stdin is None:
+                return False
+            try:
+                process.stdin.write(command.encode())
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                decky.logger.warning("Filter control session closed: %s", e)
+                self._process = None
+                return False
+        if node_id not in self._verified_nodes:
+            self._verified_nodes[node_id] = None
+            task = asyncio.get_running_loop().create_task(self._verify_node(node_id, params))
+            self._verify_tasks.add(task)
+            task.add_done_callback(self._verify_tasks.discard)
+        return True
 
-    class SettingsManager:
-        """Simple JSON-backed settings manager for CLI mode."""
+    def forget_node(self, node_id: int):
+        """Drops the verification result of a node id, eg. when PipeWire reuses it for a recreated filter."""
+        self._verified_nodes.pop(node_id, None)
 
-        def __init__(self, name: str, settings_directory: str | None = None):
-            self.name = name
-            self.settings_directory = settings_directory
-            self.settings_path = os.path.join(self.settings_directory, ".plugin-config.json")
-            self._settings: dict[str, object] = {}
+    async def _verify_node(self, node_id: int, params: dict[str, float]):
+        verified = await self._verify_params(node_id, params)
+        if node_id in self._verified_nodes:
+            self._verified_nodes[node_id] = verified
 
-        def read(self):
+    @classmethod
+    def parse_props_params(cls, output: str) -> dict[str, float]:
+        """Extracts the control values from `pw-cli enum-params <id> Props` output."""
+        values = {}
+        for name, value in cls._PROPS_PARAM_RE.findall(output):
             try:
-                with open(self.settings_path, "r", encoding="utf-8") as infile:
-                    self._settings = json.load(infile)
-            except FileNotFoundError:
-                self._settings = {}
-            except json.JSONDecodeError:
-                self._settings = {}
+                values[name] = float(value)
+            except ValueError:
+                continue
+        return values
 
-        def _write(self):
-            os.makedirs(os.path.dirname(self.settings_path), exist_ok=True)
-            with open(self.settings_path, "w", encoding="utf-8") as outfile:
-                json.dump(self._settings, outfile, indent=2)
+    async def read_params(self, node_id: int) -> dict[str, float] | None:
+        """Returns the control values a filter node currently reports, or None if it cannot be queried."""
+        try:
+            result = await command_executor.read("pw-cli", "enum-params", str(node_id), "Props")
+        except (FileNotFoundError, CommandTimeoutError) as e:
+            decky.logger.warning("Unable to read controls of filter node %s: %s", node_id, e)
+            return None
+        if result.returncode != 0:
+            return None
+        return self.parse_props_params(result.stdout.decode(errors="replace"))
+
+    async def _verify_params(self, node_id: int, params: dict[str, float]) -> bool:
+        current: dict[str, float] | None = None
+        for _ in range(self.VERIFY_ATTEMPTS):
+            # The update is applied asynchronously by the session, so give it a moment before each read
+            await asyncio.sleep(self.VERIFY_DELAY)
+            current = await self.read_params(node_id)
+            if current is None:
+                break
+            if all(name in current and abs(current[name] - value) <= self.VERIFY_TOLERANCE
+                   for name, value in params.items()):
+                return True
+        if current is None:
+            decky.logger.warning("Filter node %s could not be queried; control update not confirmed", node_id)
+        else:
+            mismatched = {name: current.get(name) for name, value in params.items()
+                          if name not in current or abs(current[name] - value) > self.VERIFY_TOLERANCE}
+            decky.logger.warning("Filter node %s did not apply controls %s (reports %s)", node_id,
+                                 {name: params[name] for name in mismatched}, mismatched)
+        return False
 
-        def getSetting(self, key, default=None):
-            return self._settings.get(key, default)
+    async def close(self):
+        for task in list(self._verify_tasks):
+            task.cancel()
+        self._verified_nodes.clear()
+        async with self._lock:
+            process = self._process
+            self._process = None
+            if process is None or process.returncode is not None:
+                return
+            with contextlib.suppress(ProcessLookupError):
+                process.terminate()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(process.wait(), timeout=2)
 
-        def setSetting(self, key, value):
-            self._settings[key] = value
-            self._write()
 
-# Read settings
-settings = SettingsManager(name="settings", settings_directory=settings_dir)
-settings.read()
+class HrirPreviewPlayer:
+    """
+    Plays HRIR preview renders on a sink with `pw-play` (or `paplay`). Only one preview plays at a time, so starting
+    a new preview stops the previous one. Previews never touch the running filter chain.
+    """
 
-# Configure other plugin files and directories
-hrir_directory = os.path.join(script_directory, "hrir-audio")
-default_hrir_file = "HRTF from Aureal Vortex 2 - WIP v2.wav"
-pipewire_config_path = os.path.join(os.path.expanduser("~"), ".config", "pipewire")
-hrir_dest_path = os.path.join(pipewire_config_path, "hrir.wav")
-sofa_directory = os.path.join(script_directory, "hrtf-sofa")
-sofa_dest_path = os.path.join(pipewire_config_path, "hrir.sofa")
+    def __init__(self):
+        self._process: asyncio.subprocess.Process | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def playing(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def play(self, path: str, sink_name: str | None) -> bool:
+        async with self._lock:
+            await self._stop()
+            candidates = [("pw-play", *(("--target", sink_name) if sink_name else ()), path),
+                          ("paplay", *((f"--device={sink_name}",) if sink_name else ()), path)]
+            for args in candidates:
+                try:
+                    self._process = await asyncio.create_subprocess_exec(
+                        *args,
+                        stdout=asyncio.subprocess.DEVNULL,
+                        stderr=asyncio.subprocess.DEVNULL,
+                        env=subprocess_exec_env(),
+                        start_new_session=True
+                    )
+                    return True
+                except FileNotFoundError:
+                    continue
+            decky.logger.warning("Neither pw-play nor paplay found. HRIR previews are unavailable.")
+            return False
 
+    async def _stop(self):
+        process = self._process
+        self._process = None
+        if process is None or process.returncode is not None:
+            return
+        with contextlib.suppress(ProcessLookupError):
+            process.terminate()
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(process.wait(), timeout=2)
 
-def subprocess_exec_env():
-    uid = os.getuid()
-    if uid not in (1000, 1001):
-        decky.logger.warning("Attempting to run subprocess as uid %s. Looks like something is going wrong here.", uid)
-    allowed_keys = [
-        "DBUS_SESSION_BUS_ADDRESS", "HOME", "LANG", "PATH", "SHELL", "USER",
-        "XDG_DATA_DIRS", "XDG_RUNTIME_DIR", "XDG_SESSION_CLASS", "XDG_SESSION_ID", "XDG_SESSION_TYPE",
-    ]
-    env = {key: os.environ[key] for key in allowed_keys if key in os.environ}
-    env['XDG_RUNTIME_DIR'] = f"/run/user/{uid}"
-    env['DBUS_SESSION_BUS_ADDRESS'] = f"unix:path=/run/user/{uid}/bus"
-    return env
+    async def stop(self):
+        async with self._lock:
+            await self._stop()
 
 
-async def service_script_exec(command, args=None):
-    if args is None:
-        args = []
-    service_script = os.path.join(script_directory, "service.sh")
-    try:
-        process = await asyncio.create_subprocess_exec(
-            service_script, command, *args,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=subprocess_exec_env()
-        )
-        stdout, stderr = await process.communicate()
-        if process.returncode != 0:
-            decky.logger.error(f"Service script exec failed: {stderr.decode()}")
-        else:
-            decky.logger.info("Service script exec output:")
-            for line in stdout.decode().splitlines():
-                decky.logger.info(line)
-    except Exception as e:
-        decky.logger.error(f"Error executing service script: {e}")
+class FilterChainPool:
+    """
+    LRU pool of suffixed filter-chain instances, one per HRIR preset, used to give apps their own HRIR.
 
+    Instances are created on demand through `service.sh load-instance` and are evicted least recently used first
+    once the pool grows beyond its cap and the instance is no longer serving any running app.
+    """
 
-async def _fetch_virtual_surround_sink_info() -> dict[str, str]:
-    service_script = os.path.join(script_directory, "service.sh")
-    try:
-        process = await asyncio.create_subprocess_exec(
-            service_script, "print-vss-info",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=subprocess_exec_env()
+    def __init__(self):
+        # Maps suffix -> {"hrir_path": str, "sink_name": str}, ordered from least to most recently used
+        self._instances: collections.OrderedDict[str, dict[str, str]] = collections.OrderedDict()
+
+    @staticmethod
+    def suffix_for_preset(hrir_path: str) -> str:
+        digest = hashlib.sha1(os.path.abspath(hrir_path).encode("utf-8")).hexdigest()
+        return f"hrir-{digest[:8]}"
+
+    def sink_names(self) -> dict[str, str]:
+        """Returns the capture sink name of each loaded instance keyed by suffix."""
+        return {suffix: instance["sink_name"] for suffix, instance in self._instances.items()}
+
+    def prune_missing(self, available_sink_names: set[str]):
+        """Forgets instances whose sink has disappeared (eg. the service was restarted)."""
+        for suffix, instance in list(self._instances.items()):
+            if instance["sink_name"] not in available_sink_names:
+                decky.logger.info("Filter instance %s is no longer available", instance["sink_name"])
+                del self._instances[suffix]
+
+    async def acquire(self, hrir_path: str, in_use: set[str], max_instances: int) -> str | None:
+        """
+        Returns the capture sink name of the instance for the given preset, creating it if required.
+        Returns None when the pool is full of instances that are all in use.
+        """
+        suffix = self.suffix_for_preset(hrir_path)
+        instance = self._instances.get(suffix)
+        if instance is not None:
+            self._instances.move_to_end(suffix)
+            return instance["sink_name"]
+        if not os.path.isfile(hrir_path):
+            decky.logger.error("HRIR preset '%s' does not exist", hrir_path)
+            return None
+        await self.evict(in_use, max_instances - 1)
+        if len(self._instances) >= max_instances:
+            decky.logger.warning("Filter instance pool is full (%s); unable to load '%s'", max_instances, hrir_path)
+            return None
+        decky.logger.info("Loading filter instance %s for HRIR preset '%s'", suffix, hrir_path)
+        await prepare_hrir_split(hrir_path)
+        output = await service_script_exec("load-instance", env_overrides={
+            "VIRTUAL_SURROUND_SINK_SUFFIX": suffix,
+            "VIRTUAL_SURROUND_HRIR_PATH": hrir_path,
+        })
+        sink_name = parse_vss_info(output or "").get("VSS Filter Capture Name")
+        if not sink_name:
+            decky.logger.error("Failed to load filter instance for HRIR preset '%s'", hrir_path)
+            return None
+        self._instances[suffix] = {"hrir_path": hrir_path, "sink_name": sink_name}
+        return sink_name
+
+    async def evict(self, in_use: set[str], max_instances: int):
+        """Unloads least recently used instances that are not in use until the pool is within max_instances."""
+        for suffix in list(self._instances.keys()):
+            if len(self._instances) <= max(0, max_instances):
+                break
+            if suffix in in_use:
+                continue
+            await self.unload(suffix)
+
+    async def unload(self, suffix: str):
+        instance = self._instances.pop(suffix, None)
+        if instance is None:
+            return
+        decky.logger.info("Unloading filter instance %s (%s)", suffix, instance["hrir_path"])
+        await service_script_exec("unload-instance", env_overrides={"VIRTUAL_SURROUND_SINK_SUFFIX": suffix})
+
+    async def unload_all(self):
+        for suffix in list(self._instances.keys()):
+            await self.unload(suffix)
+
+
+class DeviceVirtualizerSupervisor:
+    """
+    Keeps a suffixed filter-chain instance per physical headphone sink that has been seen, each with its own HRIR
+    and gain.
+
+    An instance is loaded as soon as its device appears and its output stays linked to that device, so switching
+    outputs only moves app streams to a different instance instead of rebuilding the filter. Instances of devices
+    that went away are kept so reconnecting is instant, until the cap is reached and the least recently seen ones
+    are unloaded.
+    """
+
+    HEADPHONE_FORM_FACTORS = {"headphone", "headset", "hands-free"}
+    HEADPHONE_BUSES = {"bluetooth", "usb"}
+    HEADPHONE_PORT_KEYWORDS = ("headphone", "headset")
+
+    def __init__(self, controls: FilterControlChannel):
+        self._controls = controls
+        # Maps device sink name -> instance state, ordered from least to most recently seen
+        self._instances: collections.OrderedDict[str, dict] = collections.OrderedDict()
+
+    @staticmethod
+    def suffix_for_device(device_sink_name: str) -> str:
+        digest = hashlib.sha1(device_sink_name.encode("utf-8")).hexdigest()
+        return f"dev-{digest[:8]}"
+
+    @classmethod
+    def is_headphone_sink(cls, sink: dict) -> bool:
+        """
+        Returns True for hardware sinks that are headphones. The device form factor decides when it is set, then a
+        headphone or headset active port. USB and Bluetooth devices (DACs, docks and speakers among them) only
+        count when a headphone port is available on them or a Bluetooth headset profile is active.
+        """
+        props = sink.get("properties") or {}
+        if props.get("node.virtual") == "true" or not props.get("device.id"):
+            return False
+        form_factor = str(props.get("device.form_factor") or "").lower()
+        if form_factor:
+            return form_factor in cls.HEADPHONE_FORM_FACTORS
+        active_port = str(sink.get("active_port") or "").lower()
+        if any(keyword in active_port for keyword in cls.HEADPHONE_PORT_KEYWORDS):
+            return True
+        bus = str(props.get("device.bus") or "").lower()
+        if bus not in cls.HEADPHONE_BUSES and props.get("device.api") != "bluez5":
+            return False
+        # Break the tie with weaker hints: an available headphone port or a Bluetooth headset profile
+        port_names = [str(port.get("name") or "").lower() for port in sink.get("ports") or []
+                      if port.get("availability") == "available"]
+        port_names.append(str(props.get("api.bluez5.profile") or "").lower())
+        return any(keyword in name for name in port_names for keyword in cls.HEADPHONE_PORT_KEYWORDS)
+
+    def sink_names(self) -> dict[str, str]:
+        """Returns the capture sink name of each loaded instance keyed by device sink name."""
+        return {device: instance["sink_name"] for device, instance in self._instances.items()}
+
+    def status(self) -> list[dict]:
+        return [
+            {"device": device, "sink_name": instance["sink_name"], "hrir_path": instance["hrir_path"],
+             "gain_db": instance["gain_db"], "present": instance["present"]}
+            for device, instance in self._instances.items()
+        ]
+
+    def prune_missing(self, available_sink_names: set[str]):
+        """Forgets instances whose capture sink has disappeared (eg. the service was restarted)."""
+        for device, instance in list(self._instances.items()):
+            if instance["sink_name"] not in available_sink_names:
+                decky.logger.info("Device filter instance %s is no longer available", instance["sink_name"])
+                del self._instances[device]
+
+    async def reconcile(self, sinks: list[dict], profiles: dict[str, dict], default_hrir_path: str,
+                        max_instances: int, graph: PipeWireGraph) -> bool:
+        """
+        Loads an instance for every present headphone sink, keeps each linked to its device and unloads the least
+        recently seen absent devices beyond max_instances. Returns True if any instance was loaded.
+        """
+        self.prune_missing({sink.get("name") for sink in sinks if sink.get("name")})
+        instance_sink_names = set(self.sink_names().values())
+        present = [sink.get("name") for sink in sinks
+                   if sink.get("name") and sink.get("name") not in instance_sink_names and self.is_headphone_sink(sink)]
+        was_present = {device: instance["present"] for device, instance in self._instances.items()}
+        for instance in self._instances.values():
+            if instance["present"] and instance["device"] not in present:
+                decky.logger.info("Output device %s went away; keeping its filter instance", instance["device"])
+            instance["present"] = instance["device"] in present
+        loaded = False
+        for device in present:
+            profile = profiles.get(device) or {}
+            hrir_path = profile.get("hrir_path") or default_hrir_path
+            instance = self._instances.get(device)
+            if instance is not None and instance["hrir_path"] != hrir_path:
+                await self.unload(device)
+                instance = None
+            if instance is None:
+                instance = await self._load(device, hrir_path)
+                loaded = loaded or instance is not None
+            elif not self._is_linked(instance, graph, was_present.get(device, False)):
+                decky.logger.info("Relinking device filter instance %s to %s", instance["sink_name"], device)
+                await service_script_exec("link-instance", env_overrides={
+                    "VIRTUAL_SURROUND_SINK_SUFFIX": instance["suffix"],
+                    "VIRTUAL_SURROUND_TARGET_SINK": device,
+                })
+            if instance is not None:
+                instance["present"] = True
+                instance["gain_db"] = float(profile.get("gain_db") or 0.0)
+                self._instances.move_to_end(device)
+        for device in list(self._instances.keys()):
+            if len(self._instances) <= max(len(present), max_instances):
+                break
+            if device not in present:
+                await self.unload(device)
+        return loaded
+
+    @staticmethod
+    def _is_linked(instance: dict, graph: PipeWireGraph, was_present: bool) -> bool:
+        if not graph.ready:
+            # Without the mirror, only relink when the device has just come back
+            return was_present
+        playback_node = graph.node_by_name(instance["playback_name"])
+        device_node = graph.node_by_name(instance["device"])
+        if playback_node is None or device_node is None:
+            return False
+        return device_node["id"] in graph.linked_input_nodes(playback_node["id"])
+
+    async def _load(self, device: str, hrir_path: str) -> dict | None:
+        if not os.path.isfile(hrir_path):
+            decky.logger.error("HRIR preset '%s' for device %s does not exist", hrir_path, device)
+            return None
+        suffix = self.suffix_for_device(device)
+        decky.logger.info("Loading filter instance %s for output device %s", suffix, device)
+        await prepare_hrir_split(hrir_path)
+        output = await service_script_exec("load-instance", env_overrides={
+            "VIRTUAL_SURROUND_SINK_SUFFIX": suffix,
+            "VIRTUAL_SURROUND_HRIR_PATH": hrir_path,
+            "VIRTUAL_SURROUND_TARGET_SINK": device,
+        })
+        info = parse_vss_info(output or "")
+        sink_name = info.get("VSS Filter Capture Name")
+        if not sink_name:
+            decky.logger.error("Failed to load filter instance for output device %s", device)
+            return None
+        instance = {
+            "device": device,
+            "suffix": suffix,
+            "hrir_path": hrir_path,
+            "sink_name": sink_name,
+            "playback_name": info.get("VSS Filter Playback Name") or f"output.vss-filter-{suffix}",
+            "gain_db": 0.0,
+            "present": True,
+            "applied_gain": None,
+        }
+        self._instances[device] = instance
+        return instance
+
+    async def apply_gains(self, sinks: list[dict]):
+        """Pushes each instance's gain to its filter node, skipping nodes that already have it."""
+        node_ids = {sink.get("name"): Plugin._object_id_from_sink(sink) for sink in sinks if sink.get("name")}
+        for instance in self._instances.values():
+            node_id = node_ids.get(instance["sink_name"])
+            if node_id is None:
+                continue
+            multiplier = round(10 ** (instance["gain_db"] / 20), 6)
+            if instance["applied_gain"] == (node_id, multiplier):
+                continue
+            gains = {f"gain{code}:Mult": multiplier for code in PACTL_CHANNEL_CODES.values()}
+            if await self._controls.set_params(node_id, gains):
+                instance["applied_gain"] = (node_id, multiplier)
+
+    async def unload(self, device: str):
+        instance = self._instances.pop(device, None)
+        if instance is None:
+            return
+        decky.logger.info("Unloading filter instance %s for output device %s", instance["suffix"], device)
+        await service_script_exec("unload-instance", env_overrides={"VIRTUAL_SURROUND_SINK_SUFFIX": instance["suffix"]})
+
+    async def unload_all(self):
+        for device in list(self._instances.keys()):
+            await self.unload(device)
+
+
+class RoutingFlapDamper:
+    """
+    Tracks the moves the reconciler makes per sink input and damps streams that keep getting moved back.
+
+    A move only counts as a flap when it undoes an earlier move of ours (A -> B -> A): either the stream was found
+    back on a sink we had moved it away from, or we are moving it back there ourselves. A stream with more than
+    MAX_FLAPS flaps within WINDOW seconds is fighting something else (the app itself or the session manager). It is
+    then left alone for an exponentially growing back-off, starting at BASE_BACKOFF and capped at MAX_BACKOFF. The
+    back-off level resets once a stream has not needed a move for QUIET_PERIOD. Streams the user re-routes by
+    changing the enabled apps or rules start over.
+    """
+
+    WINDOW = 60.0
+    MAX_FLAPS = 2
+    BASE_BACKOFF = 20.0
+    MAX_BACKOFF = 600.0
+    QUIET_PERIOD = 300.0
+
+    def __init__(self):
+        # Maps sink input index -> {"app", "moves": deque of (time, source, target), "flaps": deque of times, "level",
+        # "last_move", "suppressed_until", "notified"}
+        self._streams: dict[int, dict] = {}
+        self.flaps_detected = 0
+        self.moves_suppressed = 0
+
+    def _stream(self, index: int, app_name: str, now: float) -> dict:
+        stream = self._streams.setdefault(index, {
+            "app": app_name, "moves": collections.deque(), "flaps": collections.deque(), "level": 0,
+            "last_move": now, "suppressed_until": 0.0, "notified": False,
+        })
+        if stream["level"] and now - max(stream["last_move"], stream["suppressed_until"]) >= self.QUIET_PERIOD:
+            stream["level"] = 0
+        while stream["moves"] and now - stream["moves"][0][0] > self.WINDOW:
+            stream["moves"].popleft()
+        while stream["flaps"] and now - stream["flaps"][0] > self.WINDOW:
+            stream["flaps"].popleft()
+        return stream
+
+    def allow(self, index: int, app_name: str, target: int, now: float | None = None) -> bool:
+        """Returns False while the stream is backing off, in which case the move should be skipped."""
+        now = time.monotonic() if now is None else now
+        stream = self._stream(index, app_name, now)
+        if now >= stream["suppressed_until"]:
+            return True
+        self.moves_suppressed += 1
+        if not stream["notified"]:
+            stream["notified"] = True
+            decky.logger.info("Not moving %s (sink input %s) to sink %s for another %.0fs while it is flapping",
+                              app_name, index, target, stream["suppressed_until"] - now)
+        return False
+
+    def record_move(self, index: int, app_name: str, source: int | None, target: int, now: float | None = None):
+        """Records a move from source to target, starting a back-off if the stream keeps being moved back."""
+        now = time.monotonic() if now is None else now
+        stream = self._stream(index, app_name, now)
+        undoes_earlier_move = any(
+            earlier_source in (source, target) for _, earlier_source, _ in stream["moves"]
+            if earlier_source is not None
+        )
+        stream["moves"].append((now, source, target))
+        stream["last_move"] = now
+        if not undoes_earlier_move:
+            return
+        stream["flaps"].append(now)
+        if len(stream["flaps"]) <= self.MAX_FLAPS:
+            return
+        backoff = min(self.MAX_BACKOFF, self.BASE_BACKOFF * 2 ** stream["level"])
+        stream["level"] += 1
+        stream["suppressed_until"] = now + backoff
+        stream["notified"] = False
+        stream["moves"].clear()
+        stream["flaps"].clear()
+        self.flaps_detected += 1
+        decky.logger.warning(
+            "%s (sink input %s) was moved back %d times in %.0fs; something else keeps re-routing it. "
+            "Backing off for %.0fs (level %d)", app_name, index, self.MAX_FLAPS + 1, self.WINDOW, backoff,
+            stream["level"]
         )
-    except FileNotFoundError:
-        decky.logger.error("service.sh not found at %s", service_script)
-        return {}
-    except Exception as exc:
-        decky.logger.error("Error executing service script: %s", exc)
-        return {}
 
-    stdout, stderr = await process.communicate()
-    if process.returncode != 0:
-        decky.logger.error("service.sh print-vss-info failed: %s", stderr.decode().strip())
-        return {}
+    def forget_apps(self, app_names: set[str] | None = None):
+        """Forgets the move history of the given apps, or of every stream when app_names is None."""
+        for index, stream in list(self._streams.items()):
+            if app_names is None or stream["app"] in app_names:
+                del self._streams[index]
 
-    info: dict[str, str] = {}
-    for line in stdout.decode().splitlines():
-        if ':' not in line:
-            continue
-        key, value = line.split(':', 1)
-        info[key.strip()] = value.strip()
-    return info
+    def prune(self, live_indices: set[int]):
+        """Forgets streams that no longer exist."""
+        for index in list(self._streams):
+            if index not in live_indices:
+                del self._streams[index]
 
+    def stats(self, now: float | None = None) -> dict:
+        now = time.monotonic() if now is None else now
+        return {
+            "flaps_detected": self.flaps_detected,
+            "moves_suppressed": self.moves_suppressed,
+            "backing_off": {
+                str(index): {"app": stream["app"], "level": stream["level"],
+                             "retry_in_s": round(stream["suppressed_until"] - now, 1)}
+                for index, stream in self._streams.items() if stream["suppressed_until"] > now
+            },
+        }
 
-async def get_virtual_surround_sink_names() -> tuple[str | None, str | None]:
-    info = await _fetch_virtual_surround_sink_info()
-    filter_name = info.get("VSS Filter Capture Name")
-    device_name = info.get("VSS Device Capture Name")
-    if not filter_name or not device_name:
-        decky.logger.error("service.sh missing virtual surround sink names: %s", info)
-        return None, None
-    return filter_name, device_name
+
+class ReconcileScheduler:
+    """
+    Serializes reconcile runs. Triggers that arrive while a run is in flight are merged into exactly one follow-up
+    run, and every caller awaits the first run that starts after its trigger so that it observes its own change.
+    """
+
+    def __init__(self, reconcile: Callable[[], Awaitable[bool]]):
+        self._reconcile = reconcile
+        self._in_flight: asyncio.Future | None = None
+        self._follow_up: asyncio.Future | None = None
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.coalesced_triggers = 0
+
+    def trigger(self) -> asyncio.Future:
+        """Schedules a reconcile and returns a future for the result of the run that will service it."""
+        loop = asyncio.get_running_loop()
+        if self._in_flight is None:
+            self._in_flight = loop.create_future()
+            self._task = loop.create_task(self._run())
+            return self._in_flight
+        if self._follow_up is None:
+            self._follow_up = loop.create_future()
+        else:
+            self.coalesced_triggers += 1
+        return self._follow_up
+
+    async def request(self) -> bool:
+        """Triggers a reconcile and waits for it. Cancelling the caller does not cancel the shared run."""
+        return await asyncio.shield(self.trigger())
+
+    async def _run(self):
+        try:
+            while self._in_flight is not None:
+                future = self._in_flight
+                try:
+                    self.runs += 1
+                    result = await self._reconcile()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    decky.logger.error(f"[reconcile error]: {e}")
+                    result = False
+                if not future.done():
+                    future.set_result(result)
+                self._in_flight, self._follow_up = self._follow_up, None
+        except asyncio.CancelledError:
+            for future in (self._in_flight, self._follow_up):
+                if future is not None and not future.done():
+                    future.cancel()
+            self._in_flight = self._follow_up = None
+            raise
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+
+class VersionedState:
+    """
+    Holds the latest projected UI state with a monotonically increasing version and a bounded history of deltas.
+    Keyed sections (apps, sinks) are diffed per entry, with removed entries reported as None, so that clients only
+    receive what changed since the version they last saw.
+    """
+
+    KEYED_SECTIONS = ("apps", "sinks")
+
+    def __init__(self, history_size: int = 64):
+        self.version = 0
+        self.state: dict = {}
+        self._history: collections.deque[tuple[int, dict]] = collections.deque(maxlen=history_size)
+
+    def update(self, new_state: dict) -> dict | None:
+        """Replaces the state, returning the delta (or None if nothing changed)."""
+        delta = {}
+        for key, value in new_state.items():
+            if key in self.KEYED_SECTIONS:
+                previous = self.state.get(key) or {}
+                section = {name: entry for name, entry in value.items() if previous.get(name) != entry}
+                section.update({name: None for name in previous if name not in value})
+                if section:
+                    delta[key] = section
+            elif key not in self.state or self.state[key] != value:
+                delta[key] = value
+        if not delta:
+            return None
+        self.state = new_state
+        self.version += 1
+        self._history.append((self.version, delta))
+        return delta
+
+    def delta_since(self, since_version: int) -> dict:
+        """
+        Returns the merged delta between `since_version` and the current version. Falls back to the full state when
+        the requested version is no longer in the history.
+        """
+        oldest_version = self._history[0][0] if self._history else self.version + 1
+        if since_version > self.version or since_version < oldest_version - 1:
+            return {"version": self.version, "full": True, "delta": self.state}
+        merged: dict = {}
+        for version, delta in self._history:
+            if version <= since_version:
+                continue
+            for key, value in delta.items():
+                if key in self.KEYED_SECTIONS:
+                    merged.setdefault(key, {}).update(value)
+                else:
+                    merged[key] = value
+        return {"version": self.version, "full": False, "delta": merged}
 
 
 async def async_wait(evt: asyncio.Event, timeout: float) -> bool:
@@ -238,19 +3528,48 @@ class Plugin:
     IGNORED_APP_BINARIES = {"steamwebhelper"}
 
     def __init__(self):
+        self._graph = PipeWireGraph()
+        self._filter_pool = FilterChainPool()
+        self._filter_controls = FilterControlChannel()
+        self._device_virtualizers = DeviceVirtualizerSupervisor(self._filter_controls)
+        # Object ID of the running filter-chain sink node, plus the gains last pushed to it
+        self._filter_node_id: int | None = None
+        self._filter_channel_volumes: dict[str, int] | None = None
+        self._applied_filter_gains: tuple[int, dict[str, float]] | None = None
+        self._flat_volume_node_id: int | None = None
+        # Per-app mixer volumes last applied to each sink input, keyed by sink input index
+        self._applied_stream_volumes: dict[int, tuple[int, ...]] = {}
+        self._app_matcher: AppMatcher | None = None
+        self._app_matcher_key: str | None = None
+        # Projected routing state pushed to the frontend as versioned deltas
+        self._ui_state = VersionedState()
+        self._ui_state_task = None
+        self._reconciler = ReconcileScheduler(self._traced_reconcile_state)
+        self._flap_damper = RoutingFlapDamper()
+        self._stream_rules = WirePlumberStreamRules(wireplumber_rules_path)
+        self._preview_player = HrirPreviewPlayer()
         self._background_task = None
+        self._install_task = None
+        self._plugin_load_time: float | None = None
         self.stop_event = asyncio.Event()
 
     # Asyncio-compatible long-running code, executed in a task when the plugin is loaded
     async def _main(self):
         self.loop = asyncio.get_event_loop()
+        self._plugin_load_time = time.monotonic()
 
-        # Install initial files
-        await self.init_config()
+        # Install initial files. The reconciler does not need to wait for this as it will simply retry until the
+        # service has created the virtual surround sinks.
+        self._install_task = self.loop.create_task(self.init_config())
+        # Mirror the PipeWire graph so the reconciler does not need to shell out to pactl on every pass
+        self._graph.start()
 
         self.stop_event.clear()
         # Start the background task.
         self._background_task = self.loop.create_task(self.background_tasks())
+        self._ui_state_task = self.loop.create_task(self.ui_state_tasks())
+        if os.environ.get("VSS_PROFILE") == "1" or settings.getSetting("profiler_enabled", False):
+            sampling_profiler.start()
         decky.logger.info("Plugin main started")
 
     # Function called first during the unload process, utilize this to handle your plugin being stopped, but not
@@ -259,12 +3578,30 @@ class Plugin:
         decky.logger.info("Unloading plugin: stopping background tasks...")
         # Signal the background task to exit.
         self.stop_event.set()
+        await settings.flush()
+        if self._install_task and not self._install_task.done():
+            self._install_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._install_task
+        await self._filter_pool.unload_all()
+        await self._device_virtualizers.unload_all()
+        await self._filter_controls.close()
+        await self._preview_player.stop()
+        await self._graph.stop()
+        await self._reconciler.close()
+        sampling_profiler.stop()
+        if self._ui_state_task:
+            self._ui_state_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._ui_state_task
         if self._background_task:
             self._background_task.cancel()
             try:
                 await self._background_task
             except asyncio.CancelledError:
                 decky.logger.info("Background task cancelled successfully")
+        if command_executor.trace:
+            command_executor.trace.close()
         decky.logger.info("Plugin unloaded")
 
     # Function called after `_unload` during uninstall, utilize this to clean up processes and other remnants of your
@@ -280,6 +3617,8 @@ class Plugin:
         decky.logger.info("Removing '%s' if it exists", hrir_dest_path)
         if os.path.exists(hrir_dest_path):
             os.remove(hrir_dest_path)
+        shutil.rmtree(hrir_split_directory, ignore_errors=True)
+        self._stream_rules.remove()
         decky.logger.info("Plugin uninstalled")
 
     # Migrations that should be performed before entering `_main()`.
@@ -302,15 +3641,28 @@ class Plugin:
             os.path.join(decky.DECKY_HOME, "template"),
             os.path.join(decky.DECKY_USER_HOME, ".local", "share", "decky-template"))
 
+    def _install_in_progress(self) -> bool:
+        return self._install_task is not None and not self._install_task.done()
+
     async def background_tasks(self):
         decky.logger.info("Background tasks started")
+        reconciled_once = False
         while not self.stop_event.is_set():
             try:
                 # decky.logger.info("Running task to ensure applications are assigned to their configured sinks")
-                await self.check_state()
+                success = await self.check_state()
+                if success and not reconciled_once:
+                    reconciled_once = True
+                    if self._plugin_load_time is not None:
+                        decky.logger.info(
+                            "First successful reconcile completed %.0fms after plugin load",
+                            (time.monotonic() - self._plugin_load_time) * 1000,
+                        )
                 # Wait for 10 seconds, or exit early if stop_event is set.
+                # While the initial install is still running (service starting), retry every second.
+                fast_retry = not reconciled_once and self._install_in_progress()
                 try:
-                    await asyncio.wait_for(self.stop_event.wait(), timeout=10)
+                    await asyncio.wait_for(self.stop_event.wait(), timeout=1 if fast_retry else 10)
                 except asyncio.TimeoutError:
                     # Timeout occurred: continue loop.
                     pass
@@ -321,12 +3673,55 @@ class Plugin:
                 decky.logger.error(f"[background_tasks error]: {e}")
         decky.logger.info("Background tasks stopped")
 
+    async def ui_state_tasks(self):
+        """Publishes the projected UI state whenever the PipeWire graph mirror changes."""
+        graph_version = self._graph.version
+        sink_node_ids: set[int] = set()
+        while not self.stop_event.is_set():
+            try:
+                if not self._graph.ready:
+                    # Without the mirror, the reconciler publishes after each pass instead
+                    await async_wait(self.stop_event, 1)
+                    graph_version = self._graph.version
+                    continue
+                new_version = await self._graph.wait_for_change(graph_version, 5)
+                if new_version == graph_version:
+                    continue
+                # Let bursts of graph updates (stream start, link creation) settle into a single publish
+                await async_wait(self.stop_event, 0.1)
+                graph_version = self._graph.version
+                # Output devices that come or go get their filter instance right away rather than on the next pass
+                current_sink_node_ids = {node["id"] for node in self._graph.nodes_with_media_class("Audio/Sink")}
+                if current_sink_node_ids != sink_node_ids:
+                    if sink_node_ids and settings.getSetting("device_virtualizers_enabled", False):
+                        self._reconciler.trigger()
+                    sink_node_ids = current_sink_node_ids
+                await self.publish_ui_state()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                decky.logger.error(f"[ui_state_tasks error]: {e}")
+                await async_wait(self.stop_event, 1)
+
     async def init_config(self):
         if not os.path.exists(os.path.join(pipewire_config_path, "hrir.wav")):
             decky.logger.info("Installing default HRIR .wav file '%s'", default_hrir_file)
             await self.set_hrir_file(os.path.join(hrir_directory, default_hrir_file))
+        else:
+            # HRIRs installed before channel splits existed are split here; a cached split is only hashed
+            await prepare_hrir_split(hrir_dest_path)
         decky.logger.info("Installing service")
         await service_script_exec("install")
+        await self._sync_stream_rules()
+
+    async def _sync_stream_rules(self):
+        """Regenerates the WirePlumber stream rules that place enabled apps on Virtual Surround Sound at creation"""
+        _, device_name = await get_virtual_surround_sink_names()
+        if not device_name:
+            return
+        self._stream_rules.sync(
+            settings.getSetting("enabled_apps", []), settings.getSetting("enabled_app_rules", []), device_name
+        )
 
     async def get_surround_sink_default(self):
         """Checks if the Virtual Surround Sound sink should be the default"""
@@ -352,88 +3747,336 @@ class Plugin:
 
     async def enable_for_app(self, app_name: str):
         """Adds a given app name to the list of enabled apps"""
-        decky.logger.info("Enabling Virtual Surround Sound for app %s", app_name)
-        enabled_apps = settings.getSetting("enabled_apps", [])
-        if app_name not in enabled_apps:
-            enabled_apps.append(app_name)
-            settings.setSetting("enabled_apps", enabled_apps)
-            decky.logger.info("App %s enabled.", app_name)
-            await self.check_state()
-        else:
-            decky.logger.info("App %s was already enabled.", app_name)
-        return True
+        return await self.enable_for_apps([app_name])
 
     async def disable_for_app(self, app_name: str):
         """Removes a given app name from the list of enabled apps"""
-        decky.logger.info("Disabling Virtual Surround Sound for app %s", app_name)
+        return await self.disable_for_apps([app_name])
+
+    async def enable_for_apps(self, app_names: list[str]):
+        """Adds many app names to the list of enabled apps, reconciling once"""
+        enabled_apps = list(settings.getSetting("enabled_apps", []))
+        added = [name for name in dict.fromkeys(app_names or []) if name not in enabled_apps]
+        return await self.set_enabled_apps(enabled_apps + added)
+
+    async def disable_for_apps(self, app_names: list[str]):
+        """Removes many app names from the list of enabled apps, reconciling once"""
+        removed = set(app_names or [])
+        return await self.set_enabled_apps([a for a in settings.getSetting("enabled_apps", []) if a not in removed])
+
+    async def set_enabled_apps(self, app_names: list[str]):
+        """Replaces the list of enabled apps, reconciling once if it changed"""
+        if not isinstance(app_names, list) or not all(isinstance(name, str) for name in app_names):
+            decky.logger.error("Enabled apps must be a list of app names")
+            return False
         enabled_apps = settings.getSetting("enabled_apps", [])
-        if app_name in enabled_apps:
-            updated_list = [a for a in enabled_apps if a != app_name]
-            settings.setSetting("enabled_apps", updated_list)
-            decky.logger.info("App %s disabled.", app_name)
-            await self.check_state()
-        else:
-            decky.logger.info("App %s was not enabled.", app_name)
+        updated_list = list(dict.fromkeys(app_names))
+        if updated_list == enabled_apps:
+            decky.logger.info("Enabled apps unchanged.")
+            return True
+        for app_name in updated_list:
+            if app_name not in enabled_apps:
+                decky.logger.info("Enabling Virtual Surround Sound for app %s", app_name)
+        for app_name in enabled_apps:
+            if app_name not in updated_list:
+                decky.logger.info("Disabling Virtual Surround Sound for app %s", app_name)
+        # The user asked for these apps to move, so earlier moves must not count against them as flaps
+        self._flap_damper.forget_apps(set(updated_list).symmetric_difference(enabled_apps))
+        settings.setSetting("enabled_apps", updated_list)
+        await self._sync_stream_rules()
+        await self.check_state()
         return True
 
-    async def is_app_connected_to_virtual_surround_sink(self, app_name: str) -> bool:
-        """Determines if the given app is currently routed to the Virtual Surround Sound sink."""
-        if not isinstance(app_name, str):
-            return False
-        target_name = app_name.strip()
-        if not target_name:
+    async def get_enabled_app_rules(self):
+        """Reads the current list of rules used to enable apps by name, binary or Steam app ID"""
+        return settings.getSetting("enabled_app_rules", [])
+
+    async def set_enabled_app_rules(self, rules: list[dict]):
+        """Replaces the list of rules used to enable apps"""
+        if not isinstance(rules, list):
+            decky.logger.error("Enabled app rules must be a list")
             return False
-        try:
-            filter_name, device_name = await get_virtual_surround_sink_names()
-            if not filter_name or not device_name:
-                decky.logger.error("Unable to resolve virtual surround sink names")
+        validated_rules = []
+        for rule in rules:
+            try:
+                field, match_type, pattern = AppMatcher.compile_rule(rule)
+            except ValueError as e:
+                decky.logger.error("Invalid enabled app rule %s: %s", rule, e)
                 return False
-            sinks = await self.list_sinks()
-            virtual_sink_indices: set[int] = set()
-            for sink in sinks:
-                sink_index = self._sink_index_from_entry(sink)
-                if sink_index is None:
-                    continue
-                sink_name = sink.get("name")
-                if sink_name == device_name or sink_name == filter_name:
-                    virtual_sink_indices.add(sink_index)
+            validated_rules.append({"field": field, "match": match_type, "pattern": pattern})
+        decky.logger.info("Updating enabled app rules (%s rules)", len(validated_rules))
+        settings.setSetting("enabled_app_rules", validated_rules)
+        # Rules can match any stream, so every stream starts over
+        self._flap_damper.forget_apps()
+        await self._sync_stream_rules()
+        await self.check_state()
+        return True
+
+    def _get_app_matcher(self) -> AppMatcher:
+        """Returns the compiled app matcher, only recompiling it when the configured rules have changed."""
+        enabled_apps = settings.getSetting("enabled_apps", [])
+        rules = settings.getSetting("enabled_app_rules", [])
+        matcher_key = json.dumps([enabled_apps, rules], sort_keys=True)
+        if self._app_matcher is None or matcher_key != self._app_matcher_key:
+            self._app_matcher = AppMatcher(rules, enabled_apps)
+            self._app_matcher_key = matcher_key
+        return self._app_matcher
+
+    def _sink_input_is_enabled(self, sink_input: dict | None, matcher: AppMatcher) -> bool:
+        props = self._sink_input_properties(sink_input)
+        binary = props.get("application.process.binary")
+        return matcher.matches(
+            self._sink_input_app_name(sink_input),
+            binary if isinstance(binary, str) else None,
+            self._sink_input_steam_app_id(sink_input),
+        )
 
-            if not virtual_sink_indices:
+    async def get_app_hrir_profiles(self):
+        """Reads the mapping of app name to the HRIR preset path used for that app"""
+        return settings.getSetting("app_hrir_profiles", {})
+
+    async def set_app_hrir_profile(self, app_name: str, hrir_path: str | None):
+        """Assigns an HRIR preset to an app. Passing an empty path reverts the app to the shared HRIR"""
+        app_hrir_profiles = dict(settings.getSetting("app_hrir_profiles", {}))
+        if hrir_path:
+            if not os.path.isfile(hrir_path):
+                decky.logger.error("HRIR preset '%s' does not exist", hrir_path)
                 return False
+            decky.logger.info("Using HRIR preset '%s' for app %s", hrir_path, app_name)
+            app_hrir_profiles[app_name] = hrir_path
+        else:
+            decky.logger.info("Using the shared HRIR preset for app %s", app_name)
+            app_hrir_profiles.pop(app_name, None)
+        settings.setSetting("app_hrir_profiles", app_hrir_profiles)
+        await self.check_state()
+        return True
+
+    async def get_hrir_pool_max_instances(self) -> int:
+        """Reads the maximum number of per-app HRIR filter instances that may be loaded at once"""
+        return self._parse_int(settings.getSetting("hrir_pool_max_instances", 2), 2)
+
+    async def set_hrir_pool_max_instances(self, max_instances: int):
+        """Sets the maximum number of per-app HRIR filter instances that may be loaded at once"""
+        max_instances = max(0, self._parse_int(max_instances, 2))
+        settings.setSetting("hrir_pool_max_instances", max_instances)
+        # The reconcile pass evicts idle instances beyond the new cap, keeping those apps are routed to
+        await self.check_state()
+        return True
+
+    async def get_device_virtualizers_enabled(self) -> bool:
+        """Checks if a filter instance is kept per headphone output device"""
+        return settings.getSetting("device_virtualizers_enabled", False)
+
+    async def set_device_virtualizers_enabled(self, enabled: bool):
+        """Enables or disables keeping a filter instance per headphone output device"""
+        decky.logger.info("%s per-device filter instances", "Enabling" if enabled else "Disabling")
+        settings.setSetting("device_virtualizers_enabled", bool(enabled))
+        if not enabled:
+            await self._device_virtualizers.unload_all()
+        await self.check_state()
+        return True
+
+    async def get_device_virtualizer_profiles(self) -> dict[str, dict]:
+        """Reads the mapping of output device sink name to its {hrir_path, gain_db} profile"""
+        return settings.getSetting("device_virtualizer_profiles", {})
+
+    async def set_device_virtualizer_profile(self, device_sink_name: str, hrir_path: str | None = None,
+                                             gain_db: float = 0.0):
+        """
+        Assigns an HRIR preset and gain to an output device. An empty path uses the shared HRIR.
+        The device's filter instance is reloaded if its preset changed.
+        """
+        if hrir_path and not os.path.isfile(hrir_path):
+            decky.logger.error("HRIR preset '%s' does not exist", hrir_path)
+            return False
+        try:
+            gain_db = max(-24.0, min(12.0, float(gain_db)))
+        except (TypeError, ValueError):
+            gain_db = 0.0
+        profiles = dict(settings.getSetting("device_virtualizer_profiles", {}))
+        if hrir_path or gain_db:
+            profiles[device_sink_name] = {"hrir_path": hrir_path or None, "gain_db": gain_db}
+        else:
+            profiles.pop(device_sink_name, None)
+        decky.logger.info("Output device %s profile: HRIR '%s', gain %sdB", device_sink_name,
+                          hrir_path or "shared", gain_db)
+        settings.setSetting("device_virtualizer_profiles", profiles)
+        await self.check_state()
+        return True
+
+    async def get_device_virtualizer_status(self) -> list[dict]:
+        """Lists the loaded per-device filter instances and whether their device is currently present"""
+        return self._device_virtualizers.status()
+
+    async def _reconcile_device_virtualizers(self, sinks: list[dict]) -> list[dict]:
+        """
+        Keeps a filter instance loaded and linked for every headphone output device when enabled.
+        Returns the (possibly refreshed) sink list.
+        """
+        if not settings.getSetting("device_virtualizers_enabled", False):
+            if self._device_virtualizers.sink_names():
+                await self._device_virtualizers.unload_all()
+            return sinks
+        max_instances = self._parse_int(settings.getSetting("device_virtualizers_max_instances", 3), 3)
+        loaded = await self._device_virtualizers.reconcile(
+            sinks, settings.getSetting("device_virtualizer_profiles", {}), hrir_dest_path, max_instances, self._graph
+        )
+        if loaded:
+            # New instances were loaded, refresh the sink list so their indices are known
+            sinks = await self.list_sinks() or []
+        await self._device_virtualizers.apply_gains(sinks)
+        return sinks
 
-            sink_inputs = await self.list_sink_inputs()
-            normalized_target = target_name.lower()
+    async def _resolve_hrir_profile_targets(self, sinks: list[dict], sink_inputs: list[dict],
+                                            app_matcher: AppMatcher) -> tuple[list[dict], dict[str, int]]:
+        """
+        Ensures a filter instance is loaded for every running enabled app that has its own HRIR preset.
+        Returns the (possibly refreshed) sink list and a mapping of app name to the sink index it should use.
+        """
+        app_hrir_profiles = settings.getSetting("app_hrir_profiles", {})
+        max_instances = await self.get_hrir_pool_max_instances()
+        self._filter_pool.prune_missing({sink.get("name") for sink in sinks if sink.get("name")})
+        required_presets: dict[str, str] = {}
+        if app_hrir_profiles and max_instances > 0:
             for sink_input in sink_inputs:
-                entry_name = sink_input.get("name")
-                candidate_names: list[str] = []
-                if isinstance(entry_name, str):
-                    candidate_names.append(entry_name.strip())
-                canonical_name = self._sink_input_app_name(sink_input)
-                if canonical_name:
-                    candidate_names.append(canonical_name.strip())
-                if not candidate_names:
+                app_name = self._sink_input_app_name(sink_input)
+                if not app_name or app_name not in app_hrir_profiles:
                     continue
-                if not any((name or '').lower() == normalized_target for name in candidate_names if name):
+                if self._sink_input_pinned_target(sink_input):
                     continue
-                sink_index = self._parse_int(sink_input.get("sink"), -1)
-                if sink_index in virtual_sink_indices:
-                    return True
+                if self._sink_input_is_enabled(sink_input, app_matcher):
+                    required_presets[app_name] = app_hrir_profiles[app_name]
+
+        in_use = {FilterChainPool.suffix_for_preset(path) for path in required_presets.values()}
+        known_sink_names = set(self._filter_pool.sink_names().values())
+        app_sink_names: dict[str, str] = {}
+        for app_name, hrir_path in required_presets.items():
+            sink_name = await self._filter_pool.acquire(hrir_path, in_use, max_instances)
+            if sink_name:
+                app_sink_names[app_name] = sink_name
+        # Evict idle instances beyond the cap
+        await self._filter_pool.evict(in_use, max_instances)
+
+        if set(app_sink_names.values()) - known_sink_names:
+            # New instances were loaded, refresh the sink list so their indices are known
+            sinks = await self.list_sinks() or []
+        sink_index_by_name = {
+            sink.get("name"): self._sink_index_from_entry(sink) for sink in sinks if sink.get("name")
+        }
+        app_targets = {
+            app_name: sink_index_by_name[sink_name]
+            for app_name, sink_name in app_sink_names.items()
+            if sink_index_by_name.get(sink_name) is not None
+        }
+        return sinks, app_targets
+
+    async def is_app_connected_to_virtual_surround_sink(self, app_name: str) -> bool:
+        """Determines if the given app is currently routed to the Virtual Surround Sound sink."""
+        if not isinstance(app_name, str):
+            return False
+        normalized_target = app_name.strip().lower()
+        if not normalized_target:
+            return False
+        try:
+            app_statuses = await self.get_app_routing_status()
         except Exception as exc:
             decky.logger.error("Error checking virtual sink connection for %s: %s", app_name, exc)
-        return False
+            return False
+        return any(name.lower() == normalized_target and status["connected"]
+                   for name, status in app_statuses.items())
+
+    async def get_app_routing_status(self) -> dict[str, dict]:
+        """
+        Returns the routing state of every running app from a single snapshot of the audio graph.
+        Each app reports whether it is enabled, whether it is connected to a Virtual Surround Sound sink, the index
+        of its current sink, and whether the app pins its own output with `target.object`.
+        """
+        sinks, sink_inputs = await self._list_sinks_and_inputs()
+        virtual_sink_indices = await self._virtual_sink_indices(sinks)
+        return {
+            app_name: {
+                "enabled": entry["enabled"],
+                "connected": entry["connected"],
+                "sink": entry["sink"],
+                "pinned": bool(entry["target_object"].strip()),
+            }
+            for app_name, entry in self._app_routing_states(sink_inputs, virtual_sink_indices).items()
+        }
+
+    async def _virtual_sink_indices(self, sinks: list) -> set[int]:
+        """Returns the indices of the Virtual Surround Sound sinks, including any per-app HRIR filter instances."""
+        filter_name, device_name = await get_virtual_surround_sink_names()
+        if not filter_name or not device_name:
+            decky.logger.error("Unable to resolve virtual surround sink names")
+            return set()
+        virtual_sink_names = {filter_name, device_name, *self._filter_pool.sink_names().values(),
+                              *self._device_virtualizers.sink_names().values()}
+        return {
+            sink_index for sink in sinks
+            if sink.get("name") in virtual_sink_names and (sink_index := self._sink_index_from_entry(sink)) is not None
+        }
+
+    def _app_routing_states(self, sink_inputs: list, virtual_sink_indices: set[int]) -> dict[str, dict]:
+        """Consolidates sink inputs by app name into the routing state shared by the UI projection and callables."""
+        app_matcher = self._get_app_matcher()
+        apps: dict[str, dict] = {}
+        for sink_input in sink_inputs:
+            index = self._parse_int(sink_input.get("index"), -1)
+            app_name = (sink_input.get("name") or self._sink_input_app_name(sink_input) or "").strip()
+            if index < 0 or not app_name:
+                continue
+            sink_index = self._parse_int(sink_input.get("sink"), -1)
+            entry = apps.setdefault(app_name, {
+                "name": app_name,
+                "index": index,
+                "formats": [],
+                "target_object": "",
+                "sink": None,
+                "enabled": False,
+                "connected": False,
+            })
+            format_info = sink_input.get("format")
+            if format_info and format_info not in entry["formats"]:
+                entry["formats"].append(format_info)
+            entry["index"] = min(entry["index"], index)
+            entry["target_object"] = self._sink_input_pinned_target(sink_input) or entry["target_object"]
+            if sink_index >= 0:
+                entry["sink"] = sink_index
+            entry["enabled"] = entry["enabled"] or self._sink_input_is_enabled(sink_input, app_matcher)
+            entry["connected"] = entry["connected"] or sink_index in virtual_sink_indices
+        return apps
+
+    async def check_state(self) -> bool:
+        """
+        Reconciles app routing and the default sink. Concurrent calls are coalesced so that only one reconcile runs
+        at a time, with at most one follow-up run queued behind it.
+        """
+        return await self._reconciler.request()
+
+    async def _traced_reconcile_state(self) -> bool:
+        """Runs a reconcile pass, recording it in the command trace when one is being captured."""
+        trace = command_executor.trace
+        if trace is None:
+            return await self._reconcile_state()
+        start_ms = trace.elapsed_ms()
+        result = False
+        token = trace.begin_pass()
+        try:
+            result = await self._reconcile_state()
+            return result
+        finally:
+            trace.record_call("check_state", start_ms, trace.elapsed_ms() - start_ms, result, settings.snapshot())
+            CommandTrace.current_pass.reset(token)
 
-    async def check_state(self):
+    async def _reconcile_state(self) -> bool:
         settings.read()
-        enabled_apps = await self.get_enabled_apps_list()
-        sinks = await self.list_sinks() or []
-        sink_inputs = await self.list_sink_inputs()
-        if not isinstance(sink_inputs, list):
-            sink_inputs = []
+        app_matcher = self._get_app_matcher()
+        sinks, sink_inputs = await self._list_sinks_and_inputs()
 
         filter_name, device_name = await get_virtual_surround_sink_names()
         if not filter_name or not device_name:
             decky.logger.error("Unable to resolve virtual surround sink names")
-            return
+            return False
 
         # Find the sinks for the Virtual Surround Sound nodes
         virtual_surround_filter_sink = next((sink for sink in sinks if sink.get("name")
@@ -441,14 +4084,23 @@ class Plugin:
         virtual_surround_device_sink = next((sink for sink in sinks if sink.get("name")
                                              == device_name), None)
         if not virtual_surround_filter_sink:
-            decky.logger.error("Required sink not found. Virtual Surround Sound is missing.")
-            return
+            if self._install_in_progress():
+                decky.logger.debug("Virtual Surround Sound sink not created yet; waiting for the install to finish.")
+            else:
+                decky.logger.error("Required sink not found. Virtual Surround Sound is missing.")
+            return False
 
         virtual_surround_object_id = self._object_id_from_sink(virtual_surround_filter_sink)
         virtual_surround_index = self._sink_index_from_entry(virtual_surround_filter_sink)
         if virtual_surround_object_id is None or virtual_surround_index is None:
             decky.logger.error("Virtual Surround Sound sink is missing required metadata.")
-            return
+            return False
+        if virtual_surround_object_id != self._filter_node_id:
+            # The filter was (re)created. Re-apply the last requested channel gains to the new node.
+            self._filter_node_id = virtual_surround_object_id
+            self._filter_controls.forget_node(virtual_surround_object_id)
+            if self._filter_channel_volumes is not None:
+                await self._apply_filter_channel_gains(self._filter_channel_volumes)
         virtual_surround_device_object_id = self._object_id_from_sink(virtual_surround_device_sink)
         virtual_surround_device_index = self._sink_index_from_entry(virtual_surround_device_sink)
         virtual_surround_target_index = virtual_surround_device_index if virtual_surround_device_index is not None else virtual_surround_index
@@ -456,7 +4108,7 @@ class Plugin:
         # Determine the default_sink_id and default_sink_index
         default_sink_id: int | None = None
         default_sink_index: int | None = None
-        fallback_sink_id = await self.get_highest_priority_sink_id()
+        fallback_sink_id = await self.get_highest_priority_sink_id(sinks)
         if fallback_sink_id is not None:
             fallback_sink = next(
                 (sink for sink in sinks if self._object_id_from_sink(sink) == fallback_sink_id),
@@ -490,15 +4142,39 @@ class Plugin:
             else:
                 decky.logger.warning("Default sink id not resolved; cannot update default sink.")
 
+        # Keep a filter instance per headphone output device. Enabled apps follow the instance of the active device,
+        # so switching outputs only moves streams instead of rebuilding the filter.
+        sinks = await self._reconcile_device_virtualizers(sinks)
+        active_device_sink_name = next(
+            (sink.get("name") for sink in sinks if self._object_id_from_sink(sink) == fallback_sink_id), None
+        ) if fallback_sink_id is not None else None
+        device_instance_sink_name = self._device_virtualizers.sink_names().get(active_device_sink_name)
+        if device_instance_sink_name:
+            device_instance_index = next(
+                (self._sink_index_from_entry(sink) for sink in sinks if sink.get("name") == device_instance_sink_name),
+                None
+            )
+            if device_instance_index is not None:
+                virtual_surround_target_index = device_instance_index
+
+        # Load per-app HRIR filter instances for any running apps that need one
+        sinks, hrir_profile_targets = await self._resolve_hrir_profile_targets(sinks, sink_inputs, app_matcher)
+
         # Loop over each sink input and check its assignment.
         surround_sink_indices: set[int] = set()
         if virtual_surround_index is not None:
             surround_sink_indices.add(virtual_surround_index)
         if virtual_surround_device_index is not None:
             surround_sink_indices.add(virtual_surround_device_index)
+        pool_sink_names = {*self._filter_pool.sink_names().values(), *self._device_virtualizers.sink_names().values()}
+        for sink in sinks:
+            pool_sink_index = self._sink_index_from_entry(sink)
+            if sink.get("name") in pool_sink_names and pool_sink_index is not None:
+                surround_sink_indices.add(pool_sink_index)
+        moved_sink_inputs = False
         for sink_input in sink_inputs:
-            target_object = self._sink_input_target_object(sink_input)
-            if target_object.strip():
+            # Streams pinned by the app are left alone. Targets set by our own stream rules are only verified.
+            if self._sink_input_pinned_target(sink_input):
                 continue
 
             app_name = self._sink_input_app_name(sink_input)
@@ -506,21 +4182,29 @@ class Plugin:
                 continue
 
             current_sink_index = sink_input.get('sink')
-            # If the app is in the enabled_apps list,
+            # If the app matches the enabled_apps list or rules,
             # it should be assigned to the Virtual Surround Sound sink.
-            if app_name in enabled_apps:
-                if virtual_surround_target_index is None:
+            if self._sink_input_is_enabled(sink_input, app_matcher):
+                # Apps with their own HRIR preset are routed to the matching filter instance
+                app_target_index = hrir_profile_targets.get(app_name, virtual_surround_target_index)
+                if app_target_index is None:
                     decky.logger.warning(
                         "Unable to assign %s to Virtual Surround Sound: sink index unavailable.",
                         app_name,
                     )
                     continue
-                if current_sink_index != virtual_surround_target_index:
+                if current_sink_index != app_target_index:
+                    if not self._flap_damper.allow(sink_input['index'], app_name, app_target_index):
+                        continue
                     decky.logger.info(
                         "Moving %s (sink input %s) to Virtual Surround Sound (sink %s)",
-                        app_name, sink_input['index'], virtual_surround_target_index
+                        app_name, sink_input['index'], app_target_index
                     )
-                    await self.set_sink_for_application(sink_input['index'], virtual_surround_target_index)
+                    if await self.set_sink_for_application(sink_input['index'], app_target_index):
+                        self._flap_damper.record_move(
+                            sink_input['index'], app_name, current_sink_index, app_target_index
+                        )
+                    moved_sink_inputs = True
             else:
                 # If the app is not enabled but is currently assigned to the Virtual Surround Sound sink,
                 # move it to the Virtual Sink unless the VSS device is currently the default sink.
@@ -532,102 +4216,197 @@ class Plugin:
                             "Default sink index unresolved; cannot move %s to fallback sink.", app_name
                         )
                         continue
+                    if not self._flap_damper.allow(sink_input['index'], app_name, default_sink_index):
+                        continue
                     decky.logger.info(
                         "Moving %s (sink input %s) to fallback sink (sink %s)",
                         app_name, sink_input['index'], default_sink_index
                     )
-                    await self.set_sink_for_application(sink_input['index'], default_sink_index)
+                    if await self.set_sink_for_application(sink_input['index'], default_sink_index):
+                        self._flap_damper.record_move(
+                            sink_input['index'], app_name, current_sink_index, default_sink_index
+                        )
+                    moved_sink_inputs = True
+
+        self._flap_damper.prune({sink_input['index'] for sink_input in sink_inputs})
+
+        # Apply per-app mixer profiles to any new streams
+        await self.apply_app_mixer_profiles(sink_inputs)
+        if moved_sink_inputs:
+            # Streams changed sinks during this pass, so re-read them before publishing
+            await self.publish_ui_state()
+        else:
+            await self.publish_ui_state(sinks, sink_inputs)
+        return True
+
+    def _project_ui_state(self, sinks: list, sink_inputs: list, virtual_sink_indices: set[int]) -> dict:
+        """Projects the sinks and sink inputs down to only the fields rendered by the audio controls view."""
+        apps = self._app_routing_states(sink_inputs, virtual_sink_indices)
+        projected_sinks: dict[str, dict] = {}
+        for sink in sinks:
+            sink_index = self._sink_index_from_entry(sink)
+            if sink_index is None:
+                continue
+            projected_sinks[str(sink_index)] = {
+                "name": sink.get("name") or "",
+                "description": (sink.get("properties") or {}).get("node.description") or sink.get("description") or "",
+            }
+        return {
+            "apps": apps,
+            "sinks": projected_sinks,
+            "surround_sink_default": bool(settings.getSetting("surround_sink_default", True)),
+            "enabled_apps": list(settings.getSetting("enabled_apps", [])),
+        }
+
+    async def publish_ui_state(self, sinks: list | None = None, sink_inputs: list | None = None):
+        """Updates the projected UI state and emits a delta event to the frontend if anything changed."""
+        if sinks is None or sink_inputs is None:
+            sinks, sink_inputs = await self._list_sinks_and_inputs()
+        virtual_sink_indices = await self._virtual_sink_indices(sinks)
+        delta = self._ui_state.update(self._project_ui_state(sinks, sink_inputs, virtual_sink_indices))
+        if delta is not None:
+            await decky.emit("vss_state_delta", {"version": self._ui_state.version, "delta": delta})
+
+    async def get_profiler_enabled(self) -> bool:
+        """Checks if the sampling profiler is running"""
+        return sampling_profiler.enabled
+
+    async def set_profiler_enabled(self, enabled: bool) -> bool:
+        """Starts or stops the sampling profiler. Profiles are written to the plugin log directory."""
+        settings.setSetting("profiler_enabled", bool(enabled))
+        if enabled:
+            sampling_profiler.start()
+        else:
+            sampling_profiler.stop()
+        return True
+
+    async def get_routing_stats(self) -> dict:
+        """Returns routing flap counters and the streams the reconciler is currently backing off from"""
+        return self._flap_damper.stats()
+
+    async def get_command_stats(self) -> dict[str, dict]:
+        """Returns call counts and latency histograms for every external command run by the plugin"""
+        return command_executor.stats()
+
+    async def get_state_delta(self, since_version: int = 0) -> dict:
+        """
+        Returns the projected UI state changes since the given version.
+        The response is {"version", "full", "delta"}; when "full" is set the delta is the complete state.
+        """
+        if self._ui_state.version == 0:
+            await self.publish_ui_state()
+        return self._ui_state.delta_since(self._parse_int(since_version, 0))
 
     async def get_hrir_file_list(self) -> list[dict[str, str | None | int]] | None:
-        """Lists available HRIR files with channel count."""
-        hrir_files = []
-        i = 1
-        # Check if ffprobe is installed
-        try:
-            process = await asyncio.create_subprocess_exec(
-                "ffprobe", "-version",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=subprocess_exec_env()
-            )
-            await process.communicate()
-            ffprobe = process.returncode == 0
-        except FileNotFoundError:
-            decky.logger.warning("ffprobe not found. HRIR channel detection will be skipped.")
-            ffprobe = False
-        except Exception as e:
-            decky.logger.error(f"Error checking ffprobe: {e}")
-            ffprobe = False
-        for filename in os.listdir(hrir_directory):
-            if filename.endswith(".wav") and os.path.isfile(os.path.join(hrir_directory, filename)):
-                filepath = os.path.join(hrir_directory, filename)
-                channel_count = None
-                try:
-                    if ffprobe:
-                        process = await asyncio.create_subprocess_exec(
-                            "ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=channels",
-                            "-of", "default=noprint_wrappers=1:nokey=1", filepath,
-                            stdout=asyncio.subprocess.PIPE,
-                            stderr=asyncio.subprocess.PIPE,
-                            env=subprocess_exec_env()
-                        )
-                        stdout, stderr = await process.communicate()
-                        if process.returncode != 0:
-                            decky.logger.error(f"ffprobe failed for {filename}: {stderr.decode()}")
-                        else:
-                            channel_count = int(stdout.decode().strip())
-                except (ValueError, FileNotFoundError) as e:
-                    channel_count = None
-                finally:
-                    hrir_files.append({
-                        "label": os.path.basename(filepath)[:-4],
-                        "path": filepath,
-                        "channel_count": channel_count
-                    })
-                    i += 1
+        """Lists bundled and imported HRIR files with channel count."""
+        hrir_files = await asyncio.to_thread(preset_library.list, "hrir")
+        if hrir_files:
+            analyses = await asyncio.to_thread(self._analyse_hrir_files, [f["path"] for f in hrir_files])
+            for hrir_file in hrir_files:
+                record = analyses.get(hrir_file["path"])
+                hrir_file["analysis"] = HrirAnalysisIndex.summary(record) if record else None
         if hrir_files:
-            hrir_files.sort(key=lambda x: (x["channel_count"] is not None, x["channel_count"] or 0, x["path"]),
-                            reverse=False)
+            hrir_files.sort(key=lambda x: (x.get("channel_count") is not None, x.get("channel_count") or 0,
+                                           x["label"]))
         return hrir_files
 
+    @staticmethod
+    def _analyse_hrir_files(paths: list[str]) -> dict[str, dict | None]:
+        """Analyses HRIR files through the binary index, computing only files not analysed before."""
+        analyses = {}
+        for path in paths:
+            try:
+                analyses[path] = hrir_analysis_index.get(path)
+            except (OSError, ValueError) as e:
+                decky.logger.warning("HRIR analysis failed for %s: %s", path, e)
+                analyses[path] = None
+        try:
+            hrir_analysis_index.save()
+        except OSError as e:
+            decky.logger.warning("Failed to save HRIR analysis index: %s", e)
+        return analyses
+
+    async def get_hrir_analysis(self, hrir_path: str) -> dict | None:
+        """
+        Returns the full analysis of an HRIR file: per-speaker measurements, magnitude response bands and the
+        estimated DSP cost. Returns None when the file cannot be analysed.
+        """
+        record = (await asyncio.to_thread(self._analyse_hrir_files, [hrir_path])).get(hrir_path)
+        if record is None:
+            return None
+        return {**record, "dsp_cost": HrirAnalysisIndex.dsp_cost(record),
+                "band_frequencies": HrirAnalysisIndex.band_frequencies()}
+
     async def set_hrir_file(self, selected_hrir_path: str) -> bool:
-        """Installs the specified HRIR file."""
+        """Installs the specified HRIR file, with the headphone EQ profile folded in when one is set."""
         decky.logger.info("Installing %s", selected_hrir_path)
+        settings.setSetting("installed_hrir_source", selected_hrir_path)
+        source_path = selected_hrir_path
+        eq_profile = settings.getSetting("headphone_eq_profile", "")
+        if eq_profile:
+            try:
+                eq = ParametricEq.parse(eq_profile)
+                source_path = await asyncio.to_thread(equalized_hrir_path, selected_hrir_path, eq)
+            except (RuntimeError, ValueError, OSError) as e:
+                decky.logger.error("Unable to apply headphone EQ, installing the HRIR without it: %s", e)
         try:
             os.makedirs(os.path.dirname(hrir_dest_path), exist_ok=True)
-            shutil.copy2(selected_hrir_path, hrir_dest_path)
+            shutil.copy2(source_path, hrir_dest_path)
             os.chmod(hrir_dest_path, 0o644)
-            decky.logger.info("Copied %s to %s", selected_hrir_path, hrir_dest_path)
+            decky.logger.info("Copied %s to %s", source_path, hrir_dest_path)
+            await prepare_hrir_split(hrir_dest_path)
             await service_script_exec("restart")
             return True
         except Exception as e:
             decky.logger.error("Error: Failed to copy HRIR WAV file: %s", e)
         return False
 
+    async def get_headphone_eq_profile(self) -> str:
+        """Reads the parametric headphone EQ profile folded into the installed HRIR"""
+        return settings.getSetting("headphone_eq_profile", "")
+
+    async def set_headphone_eq_profile(self, profile_text: str) -> bool:
+        """
+        Sets a parametric headphone EQ profile (AutoEQ ParametricEQ.txt format) and reinstalls the current HRIR with
+        the EQ folded into it. Passing an empty profile removes the EQ.
+        """
+        profile_text = (profile_text or "").strip()
+        if profile_text:
+            try:
+                eq = ParametricEq.parse(profile_text)
+            except ValueError as e:
+                decky.logger.error("Invalid headphone EQ profile: %s", e)
+                return False
+            decky.logger.info("Using headphone EQ with %d filters, preamp %sdB", len(eq.filters), eq.preamp_db)
+        settings.setSetting("headphone_eq_profile", profile_text)
+        hrir_path = settings.getSetting("installed_hrir_source", os.path.join(hrir_directory, default_hrir_file))
+        if not os.path.isfile(hrir_path):
+            decky.logger.error("Installed HRIR source '%s' is missing; select an HRIR to apply the EQ", hrir_path)
+            return False
+        return await self.set_hrir_file(hrir_path)
+
     async def get_sofa_file_list(self) -> list[dict[str, str | None | int]] | None:
-        """Lists available SOFA files."""
-        sofa_files: list[dict[str, str | None | int]] = []
-        try:
-            os.makedirs(sofa_directory, exist_ok=True)
-        except OSError:
-            pass
-        for filename in os.listdir(sofa_directory):
-            if filename.endswith(".sofa") and os.path.isfile(os.path.join(sofa_directory, filename)):
-                filepath = os.path.join(sofa_directory, filename)
-                file_size: int | None
-                try:
-                    file_size = os.path.getsize(filepath)
-                except OSError:
-                    file_size = None
-                sofa_files.append({
-                    "label": os.path.splitext(os.path.basename(filepath))[0],
-                    "path": filepath,
-                    "size": file_size
-                })
+        """Lists bundled and imported SOFA files."""
+        sofa_files = await asyncio.to_thread(preset_library.list, "sofa")
         if sofa_files:
             sofa_files.sort(key=lambda x: x.get("label") or "")
         return sofa_files
 
+    async def import_presets(self, source_path: str) -> dict:
+        """
+        Imports HRIR WAV and SOFA files from a directory or zip archive into the user preset library.
+        Returns {imported, duplicates, rejected}, or {error} if the source cannot be read.
+        """
+        try:
+            return await asyncio.to_thread(preset_library.import_presets, os.path.expanduser(source_path))
+        except (OSError, zipfile.BadZipFile) as e:
+            decky.logger.error("Failed to import presets from %s: %s", source_path, e)
+            return {"error": str(e)}
+
+    async def remove_imported_preset(self, preset_path: str) -> bool:
+        """Removes an imported HRIR or SOFA file from the user preset library."""
+        return await asyncio.to_thread(preset_library.remove, preset_path)
+
     async def set_sofa_file(self, selected_sofa_path: str) -> bool:
         """Installs the specified SOFA file."""
         decky.logger.info("Installing %s", selected_sofa_path)
@@ -642,19 +4421,76 @@ class Plugin:
             decky.logger.error("Error: Failed to copy SOFA file: %s", e)
         return False
 
+    async def _fallback_sink_name(self) -> str | None:
+        """Returns the name of the highest priority physical sink"""
+        fallback_sink_id = await self.get_highest_priority_sink_id()
+        if fallback_sink_id is None:
+            return None
+        sinks = await self.list_sinks() or []
+        fallback_sink = next((sink for sink in sinks if self._object_id_from_sink(sink) == fallback_sink_id), None)
+        return fallback_sink.get("name") if fallback_sink else None
+
     async def run_sound_test(self, sink: str):
         """Run a surround sound test using the sink specified"""
         sink_name = sink
         if sink == "default":
-            fallback_sink_id = await self.get_highest_priority_sink_id()
-            if fallback_sink_id is not None:
-                sinks = await self.list_sinks() or []
-                fallback_sink = next(
-                    (sink for sink in sinks if self._object_id_from_sink(sink) == fallback_sink_id),
-                    None
-                )
-                sink_name = fallback_sink.get("name")
-        await service_script_exec("speaker-test", ["--sink", sink_name])
+            sink_name = await self._fallback_sink_name() or sink
+        # Play the cached channel identification signal in one shot rather than one speaker-test run per channel
+        try:
+            signal_path = await asyncio.to_thread(channel_id_signal_path)
+        except OSError as e:
+            decky.logger.error("Unable to render channel identification signal: %s", e)
+            return await service_script_exec("speaker-test", ["--sink", sink_name]) is not None
+        return await service_script_exec("speaker-test", ["--sink", sink_name, "--file", signal_path]) is not None
+
+    async def preview_hrir(self, hrir_path: str) -> dict:
+        """
+        Plays the channel identification signal rendered offline through an HRIR on the physical sink, with the
+        headphone EQ profile applied when one is set. Renders are cached, so switching between previews is instant
+        and the running filter chain is left untouched. Returns {ok, cached} or {ok, error}.
+        """
+        eq_profile = settings.getSetting("headphone_eq_profile", "")
+
+        def render() -> tuple[str, bool]:
+            source_path = hrir_path
+            if eq_profile:
+                source_path = equalized_hrir_path(hrir_path, ParametricEq.parse(eq_profile))
+            return hrir_preview_path(source_path)
+
+        try:
+            preview_path, cached = await asyncio.to_thread(render)
+        except (RuntimeError, ValueError, OSError, struct.error) as e:
+            decky.logger.error("Unable to render HRIR preview of '%s': %s", hrir_path, e)
+            return {"ok": False, "error": str(e)}
+        sink_name = await self._fallback_sink_name()
+        decky.logger.info("Previewing '%s' on %s", hrir_path, sink_name or "the default sink")
+        if not await self._preview_player.play(preview_path, sink_name):
+            return {"ok": False, "error": "No audio player (pw-play or paplay) available"}
+        return {"ok": True, "cached": cached}
+
+    async def stop_hrir_preview(self) -> bool:
+        """Stops the HRIR preview that is playing, if any"""
+        await self._preview_player.stop()
+        return True
+
+    async def verify_channel_routing(self, hrir_path: str | None = None) -> dict:
+        """
+        Checks offline that each speaker reaches the expected ear with the expected level and delay under the
+        given HRIR (the installed HRIR by default).
+        """
+        hrir_path = hrir_path or hrir_dest_path
+        try:
+            wav = await asyncio.to_thread(read_wav, hrir_path)
+        except (OSError, ValueError, struct.error) as e:
+            decky.logger.error("Unable to read HRIR '%s': %s", hrir_path, e)
+            return {"hrir": hrir_path, "ok": False, "error": str(e), "channels": []}
+        result = verify_hrir_channel_routing(wav)
+        result["hrir"] = hrir_path
+        for channel in result["channels"]:
+            if not channel["ok"]:
+                decky.logger.warning("HRIR channel %s failed verification: %s", channel["channel"],
+                                     "; ".join(channel["issues"]))
+        return result
 
     @staticmethod
     def _sink_input_properties(sink_input: dict | None) -> dict:
@@ -687,6 +4523,7 @@ class Plugin:
             normalized["name"] = app_name
         normalized["format"] = self._parse_format_description(sink_input)
         normalized["volume"] = self._sink_input_volume_description(sink_input)
+        normalized["channel_volumes"] = self._sink_input_channel_volumes(sink_input)
         return normalized
 
     def _sink_input_binary_is_ignored(self, props: dict) -> bool:
@@ -784,6 +4621,22 @@ class Plugin:
             return target_object
         return ""
 
+    @staticmethod
+    def _sink_input_pinned_target(sink_input: dict | None) -> str:
+        """Returns the target the app pinned itself to, ignoring targets set by our own WirePlumber stream rules"""
+        if WirePlumberStreamRules.is_marked(Plugin._sink_input_properties(sink_input)):
+            return ""
+        return Plugin._sink_input_target_object(sink_input).strip()
+
+    @staticmethod
+    def _sink_input_steam_app_id(sink_input: dict | None) -> str | None:
+        props = Plugin._sink_input_properties(sink_input)
+        for key in STEAM_APP_ID_PROPERTY_KEYS:
+            value = props.get(key)
+            if value is not None and str(value).strip() not in ("", "0"):
+                return str(value).strip()
+        return None
+
     @staticmethod
     def _sink_input_volume_description(sink_input: dict | None) -> str:
         volume = sink_input.get("volume") if sink_input else None
@@ -798,6 +4651,23 @@ class Plugin:
                 entries.append(f"{channel}: {percent}")
         return ", ".join(entries)
 
+    @staticmethod
+    def _sink_input_channel_volumes(sink_input: dict | None) -> dict[str, int]:
+        """Returns the stream's volume percent per channel, in channel map order."""
+        volume = sink_input.get("volume") if sink_input else None
+        if not isinstance(volume, dict):
+            return {}
+        channel_volumes = {}
+        for channel, details in volume.items():
+            if not isinstance(details, dict):
+                continue
+            percent = str(details.get("value_percent") or "").strip().rstrip("%")
+            try:
+                channel_volumes[channel] = int(percent)
+            except ValueError:
+                continue
+        return channel_volumes
+
     def _parse_plain_sink_input_names(self, output: str) -> dict[int, str]:
         names: dict[int, str] = {}
         current_index: int | None = None
@@ -873,12 +4743,14 @@ class Plugin:
         props = sink_entry.get("properties") or {}
         return props.get("node.description") or sink_entry.get("description") or sink_entry.get("name") or "unknown sink"
 
-    async def get_highest_priority_sink_id(self) -> int | None:
+    async def get_highest_priority_sink_id(self, sinks: list | None = None) -> int | None:
         """
         Returns the object ID of the sink with the highest priority.session value.
         Ports marked as "not available" for every entry are treated as priority 0.
+        A sink listing that the caller already holds may be passed in to avoid fetching it again.
         """
-        sinks = await self.list_sinks()
+        if sinks is None:
+            sinks, _ = await self._list_sinks_and_inputs()
         if not sinks:
             decky.logger.warning("Unable to determine priority sink: no sinks reported.")
             return None
@@ -965,14 +4837,9 @@ class Plugin:
         Returns the sink name reported by `pactl get-default-sink`.
         """
         try:
-            process = await asyncio.create_subprocess_exec(
-                'pactl', 'get-default-sink',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=subprocess_exec_env()
-            )
-            stdout, stderr = await process.communicate()
-            if process.returncode != 0:
+            result = await command_executor.read('pactl', 'get-default-sink')
+            stdout, stderr = result.stdout, result.stderr
+            if result.returncode != 0:
                 decky.logger.error("pactl get-default-sink failed: %s", stderr.decode().strip())
                 return None
             output = stdout.decode().strip()
@@ -990,20 +4857,27 @@ class Plugin:
             decky.logger.error("Error retrieving default sink: %s", e)
             return None
 
+    async def _list_sinks_and_inputs(self) -> tuple[list, list]:
+        """
+        Returns the sinks and normalized sink inputs. These are projected from the PipeWire graph mirror while it
+        is live, otherwise they are fetched with pactl.
+        """
+        if self._graph.ready:
+            sink_inputs = [entry for entry in map(self._normalize_sink_input, self._graph.pactl_sink_inputs()) if entry]
+            return self._graph.pactl_sinks(), sink_inputs
+        sinks = await self.list_sinks() or []
+        sink_inputs = await self.list_sink_inputs()
+        return sinks, sink_inputs if isinstance(sink_inputs, list) else []
+
     async def list_sinks(self):
         """
         Retrieve a mapping of sink index to its name and description.
         """
         sinks = []
         try:
-            process = await asyncio.create_subprocess_exec(
-                'pactl', '-f', 'json', 'list', 'sinks',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=subprocess_exec_env()
-            )
-            stdout, stderr = await process.communicate()
-            if process.returncode != 0:
+            result = await command_executor.read('pactl', '-f', 'json', 'list', 'sinks')
+            stdout, stderr = result.stdout, result.stderr
+            if result.returncode != 0:
                 decky.logger.error(f"pactl list sinks failed: {stderr.decode()}")
                 return []
 
@@ -1026,14 +4900,9 @@ class Plugin:
         Returns a normalized list that includes parsed format details and friendly metadata.
         """
         try:
-            process = await asyncio.create_subprocess_exec(
-                'pactl', '-f', 'json', 'list', 'sink-inputs',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=subprocess_exec_env()
-            )
-            stdout, stderr = await process.communicate()
-            if process.returncode != 0:
+            result = await command_executor.read('pactl', '-f', 'json', 'list', 'sink-inputs')
+            stdout, stderr = result.stdout, result.stderr
+            if result.returncode != 0:
                 decky.logger.error("pactl list sink-inputs failed: %s", stderr.decode().strip())
                 return []
             try:
@@ -1050,14 +4919,9 @@ class Plugin:
                 # NOTE: For some reason the JSON formatted output of pactl had decode errors for some app names.
                 #   I could not figure out how to fix that, so I am going to run it twice, the second time without JSON formatting.
                 #   Not ideal, but whatever.
-                process = await asyncio.create_subprocess_exec(
-                    'pactl', 'list', 'sink-inputs',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    env=subprocess_exec_env()
-                )
-                stdout, stderr = await process.communicate()
-                if process.returncode != 0:
+                result = await command_executor.read('pactl', 'list', 'sink-inputs')
+                stdout, stderr = result.stdout, result.stderr
+                if result.returncode != 0:
                     decky.logger.error("pactl list sink-inputs (text) failed: %s", stderr.decode().strip())
                     name_map = {}
                 else:
@@ -1085,14 +4949,9 @@ class Plugin:
     async def set_default_sink(self, sink_input_index: str):
         """Moves the sink output for the given app"""
         try:
-            process = await asyncio.create_subprocess_exec(
-                "wpctl", 'set-default', str(sink_input_index),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=subprocess_exec_env()
-            )
-            stdout, stderr = await process.communicate()
-            if process.returncode != 0:
+            result = await command_executor.run("wpctl", 'set-default', str(sink_input_index))
+            stdout, stderr = result.stdout, result.stderr
+            if result.returncode != 0:
                 decky.logger.error(
                     "Failed to set default sink to %s: %s",
                     sink_input_index,
@@ -1127,14 +4986,10 @@ class Plugin:
         #  > pactl move-sink-input 1868 433
         #  > pactl move-sink-input 1868 49
         try:
-            process = await asyncio.create_subprocess_exec(
-                "pactl", 'move-sink-input', str(sink_input_index), str(target_sink_index),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=subprocess_exec_env()
+            result = await command_executor.run(
+                "pactl", 'move-sink-input', str(sink_input_index), str(target_sink_index)
             )
-            await process.communicate()
-            return process.returncode == 0
+            return result.returncode == 0
         except FileNotFoundError:
             decky.logger.warning("pactl not found.")
             return False
@@ -1144,8 +4999,9 @@ class Plugin:
 
     async def set_mixer_profile(self, mixer_profile):
         """
-        Sets per-channel volumes on the sink named "virtual-surround-sound"
-        using the provided mixer_profile dict.
+        Sets per-channel volumes of the Virtual Surround Sound filter using the provided mixer_profile dict.
+        Volumes are pushed to the gain nodes of the running filter graph, falling back to the sink volume
+        when the filter controls are not reachable.
 
         The mixer_profile is expected to be a dict like:
           {
@@ -1163,6 +5019,22 @@ class Plugin:
             }
           }
         """
+        profile_name = mixer_profile.get("name")
+        if mixer_profile.get("usePerAppProfile") and profile_name and profile_name != "default":
+            # Per-app profiles are applied to the app's own streams rather than the shared VSS sink
+            app_mixer_profiles = dict(settings.getSetting("app_mixer_profiles", {}))
+            volumes = dict(mixer_profile.get("volumes") or {})
+            if app_mixer_profiles.get(profile_name) != volumes:
+                app_mixer_profiles[profile_name] = volumes
+                settings.setSetting("app_mixer_profiles", app_mixer_profiles)
+            return await self.apply_app_mixer_profiles()
+
+        # Prefer pushing the channel gains straight to the gain nodes of the running filter graph
+        volumes = dict(mixer_profile.get("volumes") or {})
+        self._filter_channel_volumes = volumes
+        if await self._apply_filter_channel_gains(volumes):
+            return True
+
         filter_name, _ = await get_virtual_surround_sink_names()
         if not filter_name:
             decky.logger.error("Unable to resolve virtual surround filter sink name")
@@ -1188,23 +5060,12 @@ class Plugin:
             decky.logger.error("Channel Map not found for sink 'virtual-surround-sound'")
             return False
 
-        # Map full channel names to short codes used in mixer_profile.
-        # The pactl command will return the channels as "front-left" and "front-right".
-        channel_name_map = {
-            "front-left": "FL",
-            "front-right": "FR",
-            "front-center": "FC",
-            "lfe": "LFE",
-            "rear-left": "RL",
-            "rear-right": "RR",
-            "side-left": "SL",
-            "side-right": "SR"
-        }
         # Since we need to map the volume args in the correct order, we will map them based on the sink channel_map,
         # then read each channel volume provided in the mixer_profile in the correct order.
+        # The pactl command will return the channels as "front-left" and "front-right".
         volume_args = []
         for ch in channel_map:
-            short_code = channel_name_map.get(ch)
+            short_code = PACTL_CHANNEL_CODES.get(ch)
             if short_code and short_code in mixer_profile.get("volumes", {}):
                 volume_value = mixer_profile["volumes"][short_code]
                 # Build a per-channel volume argument (e.g. "100%")
@@ -1219,14 +5080,9 @@ class Plugin:
         # Execute pactl to set the per-channel volume.
         command = ["pactl", "set-sink-volume", str(sink_index)] + volume_args
         try:
-            process = await asyncio.create_subprocess_exec(
-                *command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=subprocess_exec_env()
-            )
-            stdout, stderr = await process.communicate()
-            if process.returncode != 0:
+            result = await command_executor.run(*command)
+            stdout, stderr = result.stdout, result.stderr
+            if result.returncode != 0:
                 decky.logger.error("Failed to set mixer profile: " + stderr.decode())
                 return False
             decky.logger.debug(f"Mixer profile applied on sink {sink_index} with volumes: {volume_args}")
@@ -1235,6 +5091,152 @@ class Plugin:
             decky.logger.error(f"Error setting mixer profile: {e}")
             return False
 
+    async def _apply_filter_channel_gains(self, volumes: dict[str, int]) -> bool:
+        """
+        Sets the per-channel gain controls of the filter graph from mixer profile volume percentages.
+        Returns False if the controls could not be reached so the caller can fall back to the sink volume.
+        """
+        filter_name, _ = await get_virtual_surround_sink_names()
+        if not filter_name:
+            return False
+        if self._filter_node_id is None:
+            sinks = await self.list_sinks() or []
+            filter_sink = next((sink for sink in sinks if sink.get("name") == filter_name), None)
+            self._filter_node_id = self._object_id_from_sink(filter_sink)
+            if self._filter_node_id is None:
+                return False
+        node_id = self._filter_node_id
+        # Use the same cubic curve as PulseAudio volumes so the sliders sound the same as before
+        gains = {
+            f"gain{code}:Mult": round((self._parse_int(volumes.get(code), 100) / 100) ** 3, 6)
+            for code in PACTL_CHANNEL_CODES.values()
+        }
+        if self._applied_filter_gains == (node_id, gains):
+            return True
+        if not await self._filter_controls.set_params(node_id, gains):
+            # The node may be gone after a filter restart, so look it up again on the next update
+            self._filter_node_id = None
+            self._applied_filter_gains = None
+            return False
+        self._applied_filter_gains = (node_id, gains)
+        decky.logger.debug("Filter channel gains applied on node %s: %s", node_id, gains)
+        if self._flat_volume_node_id != node_id:
+            # Gains now live in the filter graph. Make sure the sink volume is not applying them a second time.
+            await self.set_sink_volume(filter_name, ["100%"])
+            self._flat_volume_node_id = node_id
+        return True
+
+    async def set_sink_volume(self, sink, volume_args: list[str]) -> bool:
+        """Sets per-channel volumes on a sink given its index or name"""
+        try:
+            result = await command_executor.run("pactl", "set-sink-volume", str(sink), *volume_args)
+            stdout, stderr = result.stdout, result.stderr
+            if result.returncode != 0:
+                decky.logger.error("Failed to set volume of sink %s: %s", sink, stderr.decode().strip())
+                return False
+            return True
+        except FileNotFoundError:
+            decky.logger.warning("pactl not found.")
+            return False
+        except Exception as e:
+            decky.logger.error(f"Error setting sink volume: {e}")
+            return False
+
+    async def clear_app_mixer_profile(self, app_name: str):
+        """Removes the per-app mixer profile for an app and restores its streams to full volume"""
+        app_mixer_profiles = dict(settings.getSetting("app_mixer_profiles", {}))
+        if app_mixer_profiles.pop(app_name, None) is None:
+            return True
+        decky.logger.info("Removing per-app mixer profile for %s", app_name)
+        settings.setSetting("app_mixer_profiles", app_mixer_profiles)
+        sink_inputs = await self.list_sink_inputs() or []
+        reset_commands = []
+        for sink_input in sink_inputs:
+            if self._mixer_profile_for_sink_input(sink_input, {app_name: {}}) is None:
+                continue
+            channel_count = len(sink_input.get("channel_volumes") or {}) or 2
+            self._applied_stream_volumes.pop(self._parse_int(sink_input.get("index"), -1), None)
+            reset_commands.append(self.set_sink_input_volume(sink_input.get("index"), ["100%"] * channel_count))
+        results = await asyncio.gather(*reset_commands)
+        return all(results)
+
+    def _mixer_profile_for_sink_input(self, sink_input: dict, app_mixer_profiles: dict) -> dict | None:
+        """Finds the per-app mixer profile volumes that apply to a stream."""
+        props = self._sink_input_properties(sink_input)
+        candidates = [
+            self._sink_input_app_name(sink_input),
+            sink_input.get("name"),
+            props.get("application.process.binary"),
+        ]
+        lowered_profiles = {str(name).lower(): volumes for name, volumes in app_mixer_profiles.items()}
+        for candidate in candidates:
+            if isinstance(candidate, str) and candidate.strip().lower() in lowered_profiles:
+                return lowered_profiles[candidate.strip().lower()]
+        return None
+
+    async def apply_app_mixer_profiles(self, sink_inputs: list[dict] | None = None) -> bool:
+        """
+        Applies per-app mixer profiles to the matching running streams in a single concurrent batch.
+        Streams that already have the profile applied, or whose volumes already match, are skipped.
+        """
+        app_mixer_profiles = settings.getSetting("app_mixer_profiles", {})
+        if sink_inputs is None:
+            sink_inputs = await self.list_sink_inputs() or []
+        running_indices = {self._parse_int(entry.get("index"), -1) for entry in sink_inputs}
+        for stale_index in set(self._applied_stream_volumes) - running_indices:
+            del self._applied_stream_volumes[stale_index]
+        if not app_mixer_profiles:
+            return True
+
+        pending: list[tuple[int, tuple[int, ...]]] = []
+        for sink_input in sink_inputs:
+            stream_index = self._parse_int(sink_input.get("index"), -1)
+            current_volumes = sink_input.get("channel_volumes") or {}
+            if stream_index < 0 or not current_volumes:
+                continue
+            volumes = self._mixer_profile_for_sink_input(sink_input, app_mixer_profiles)
+            if volumes is None:
+                continue
+            desired = tuple(
+                self._parse_int(volumes.get(PACTL_CHANNEL_CODES.get(channel, "")), 100)
+                for channel in current_volumes
+            )
+            if self._applied_stream_volumes.get(stream_index) == desired:
+                continue
+            if tuple(current_volumes.values()) == desired:
+                self._applied_stream_volumes[stream_index] = desired
+                continue
+            pending.append((stream_index, desired))
+
+        if not pending:
+            return True
+        results = await asyncio.gather(*(
+            self.set_sink_input_volume(stream_index, [f"{value}%" for value in desired])
+            for stream_index, desired in pending
+        ))
+        for (stream_index, desired), success in zip(pending, results):
+            if success:
+                self._applied_stream_volumes[stream_index] = desired
+        decky.logger.debug("Applied per-app mixer profiles to %s stream(s)", len(pending))
+        return all(results)
+
+    async def set_sink_input_volume(self, sink_input_index, volume_args: list[str]) -> bool:
+        """Sets per-channel volumes on a single sink input"""
+        try:
+            result = await command_executor.run("pactl", "set-sink-input-volume", str(sink_input_index), *volume_args)
+            stdout, stderr = result.stdout, result.stderr
+            if result.returncode != 0:
+                decky.logger.error("Failed to set volume of sink input %s: %s", sink_input_index,
+                                   stderr.decode().strip())
+                return False
+            return True
+        except FileNotFoundError:
+            decky.logger.warning("pactl not found.")
+            return False
+        except Exception as e:
+            decky.logger.error(f"Error setting sink input volume: {e}")
+            return False
+
     async def test_stuff(self):
         # await self._main()
         # await self._uninstall()
@@ -1264,35 +5266,239 @@ class Plugin:
         await plugin.set_mixer_profile(mixer_profile)
 
 
+# Profile every callable exposed to the frontend, plus each reconcile pass, when the sampling profiler is enabled.
+# The background loops run for the plugin's lifetime and would keep the sampler busy, so they are left out.
+PROFILER_EXCLUDED_METHODS = ("background_tasks", "ui_state_tasks")
+for _name, _member in list(vars(Plugin).items()):
+    if _name in PROFILER_EXCLUDED_METHODS:
+        continue
+    if (not _name.startswith("_") or _name == "_traced_reconcile_state") and inspect.iscoroutinefunction(_member):
+        setattr(Plugin, _name, sampling_profiler.wrap(_name.lstrip("_"), _member))
+
+REPLAY_CALLABLES = ("get_app_routing_status", "get_highest_priority_sink_id", "get_default_sink_id")
+
+
+async def replay_command_trace(plugin: "Plugin", trace_path: str, time_scale: float = 0.0) -> dict:
+    """
+    Drives reconcile passes and read-only callables from a recorded command trace, without touching the local
+    audio stack. Each recorded check_state pass is replayed with the settings and graph state it saw, and its
+    decisions (state-changing commands) and timing are compared with the recording.
+    """
+    global command_executor, settings, _virtual_surround_sink_names
+    events = CommandTrace.load(trace_path)
+    executor = ReplayExecutor(events, time_scale)
+    recorded_executor, recorded_settings, recorded_sink_names = command_executor, settings, _virtual_surround_sink_names
+    replay_settings_dir = tempfile.mkdtemp(prefix="vss-replay-")
+    command_executor, _virtual_surround_sink_names = executor, None
+    settings = SettingsStore(SettingsManager(name="settings", settings_directory=replay_settings_dir))
+    settings.load_snapshot({})
+    plugin._filter_controls = ReplayControlChannel(executor)
+    plugin._device_virtualizers = DeviceVirtualizerSupervisor(plugin._filter_controls)
+    plugin._graph = PipeWireGraph()
+
+    graph_events = [event for event in events if event.get("type") == "graph"]
+    calls = [event for event in events if event.get("type") == "call" and event.get("name") == "check_state"]
+    end_ms = max((event.get("t", 0) + event.get("duration_ms", 0) for event in events[1:]), default=0.0)
+    if not calls:
+        # Traces captured from the CLI have no reconcile passes; replay one against the final state
+        calls = [{"t": end_ms, "duration_ms": 0.0, "result": None}]
+    report = {
+        "trace": trace_path,
+        "commands_recorded": sum(len(entries) for entries in executor._commands.values()),
+        "passes": [],
+        "callables": {},
+    }
+    parser = JsonStreamParser()
+    graph_cursor = 0
+
+    def advance_graph(position_ms: float):
+        nonlocal parser, graph_cursor
+        while graph_cursor < len(graph_events) and graph_events[graph_cursor]["t"] <= position_ms:
+            event = graph_events[graph_cursor]
+            graph_cursor += 1
+            if event.get("reset"):
+                plugin._graph = PipeWireGraph()
+                parser = JsonStreamParser()
+            else:
+                plugin._graph.feed(parser, event["text"])
+
+    try:
+        for number, call in enumerate(calls, start=1):
+            if "settings" in call:
+                settings.load_snapshot(call["settings"])
+            advance_graph(call["t"])
+            window_end_ms = call["t"] + call["duration_ms"]
+            executor.seek(call["t"], window_end_ms)
+            executor.decisions = []
+            start = time.monotonic()
+            try:
+                result = await plugin._reconcile_state()
+            except Exception as e:
+                decky.logger.error("Replayed reconcile pass %d failed: %s", number, e)
+                result = f"error: {e}"
+            replay_ms = (time.monotonic() - start) * 1000
+            recorded_decisions = executor.recorded_decisions(call["t"], window_end_ms, call.get("pass")) \
+                if call.get("result") is not None else None
+            report["passes"].append({
+                "pass": number,
+                "t_ms": call["t"],
+                "recorded_ms": call["duration_ms"],
+                "replayed_ms": round(replay_ms, 3),
+                "recorded_result": call.get("result"),
+                "replayed_result": result,
+                "recorded_decisions": recorded_decisions,
+                "replayed_decisions": list(executor.decisions),
+                "match": recorded_decisions is None or (
+                    recorded_decisions == executor.decisions and result == call.get("result")),
+            })
+        advance_graph(end_ms)
+        executor.seek(end_ms)
+        for name in REPLAY_CALLABLES:
+            start = time.monotonic()
+            value = await getattr(plugin, name)()
+            report["callables"][name] = {"result": value, "replayed_ms": round((time.monotonic() - start) * 1000, 3)}
+        recorded_latency: dict[str, dict] = {}
+        for entries in executor._commands.values():
+            for entry in entries:
+                stats = recorded_latency.setdefault(CommandExecutor.command_key(tuple(entry["args"])),
+                                                    {"count": 0, "total_ms": 0.0})
+                stats["count"] += 1
+                stats["total_ms"] = round(stats["total_ms"] + entry["duration_ms"], 3)
+        report["recorded_command_latency"] = dict(sorted(recorded_latency.items()))
+        report["missing_reads"] = sorted(set(executor.missing_reads))
+    finally:
+        command_executor, settings, _virtual_surround_sink_names = (recorded_executor, recorded_settings,
+                                                                    recorded_sink_names)
+        shutil.rmtree(replay_settings_dir, ignore_errors=True)
+    return report
+
+
 class CLIHelper:
-    """Convenience bridge for running async plugin methods from the curses UI."""
+    """
+    Convenience bridge for running async plugin methods from the curses UI and CLI options.
 
-    def __init__(self):
+    One event loop runs on a daemon thread for the lifetime of the helper and work is submitted to it with
+    `run_coroutine_threadsafe`, so delayed rechecks and the curses UI never contend for the loop.
+    """
+
+    def __init__(self, plugin: Plugin | None = None):
         self.loop = asyncio.new_event_loop()
+        loop_ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(loop_ready,), name="vss-cli-loop", daemon=True)
+        self._thread.start()
+        loop_ready.wait()
+        if plugin is not None:
+            # Serve sink and stream listings from the graph mirror once it has received its initial dump
+            self.loop.call_soon_threadsafe(plugin._graph.start)
+
+    def _run_loop(self, loop_ready: threading.Event):
         asyncio.set_event_loop(self.loop)
-        self._lock = threading.Lock()
+        self.loop.call_soon(loop_ready.set)
+        self.loop.run_forever()
 
-    def run(self, coro):
-        with self._lock:
-            return self.loop.run_until_complete(coro)
+    def submit(self, coro) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float | None = None):
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except (KeyboardInterrupt, concurrent.futures.TimeoutError):
+            future.cancel()
+            raise
 
     def run_delayed(self, coro_factory: Callable[[], Awaitable[object]], delay: float):
-        """Run coroutine returned by coro_factory after delay in seconds on a background thread."""
+        """Run coroutine returned by coro_factory after delay in seconds on the loop thread."""
 
-        def _worker():
-            time.sleep(delay)
+        async def _run_logged():
             try:
-                self.run(coro_factory())
+                await coro_factory()
             except Exception as exc:
                 logging.getLogger("cli-menu").error("Delayed task failed: %s", exc)
 
-        threading.Thread(target=_worker, daemon=True).start()
+        self.loop.call_soon_threadsafe(self.loop.call_later, delay, lambda: self.loop.create_task(_run_logged()))
+
+    async def _shutdown(self):
+        await settings.flush()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     def close(self):
+        self.run(self._shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
         self.loop.close()
 
+    def list_sinks(self, plugin: Plugin) -> list:
+        sinks, _ = self.run(self._list_sinks_and_inputs(plugin))
+        return sinks
+
+    def list_sink_inputs(self, plugin: Plugin) -> list:
+        _, sink_inputs = self.run(self._list_sinks_and_inputs(plugin))
+        return sink_inputs
+
+    @staticmethod
+    async def _wait_for_graph(plugin: Plugin, timeout: float = 2):
+        """Gives the graph mirror a moment to receive its initial dump before callers fall back to pactl."""
+        deadline = time.monotonic() + timeout
+        while not plugin._graph.ready and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def _list_sinks_and_inputs(self, plugin: Plugin) -> tuple[list, list]:
+        plugin._graph.start()
+        await self._wait_for_graph(plugin)
+        return await plugin._list_sinks_and_inputs()
+
+    def watch(self, plugin: Plugin, as_json: bool):
+        """Streams sink and stream changes to stdout until interrupted."""
+        try:
+            self.run(self._watch(plugin, as_json))
+        except KeyboardInterrupt:
+            pass
+
+    async def _watch(self, plugin: Plugin, as_json: bool):
+        state = VersionedState()
+        graph = plugin._graph
+        graph.start()
+        await self._wait_for_graph(plugin)
+        graph_version = graph.version
+        while True:
+            sinks, sink_inputs = await plugin._list_sinks_and_inputs()
+            virtual_sink_indices = await plugin._virtual_sink_indices(sinks)
+            delta = state.update(plugin._project_ui_state(sinks, sink_inputs, virtual_sink_indices))
+            if delta is not None:
+                self._print_watch_event(state.version, delta, as_json)
+            if graph.ready:
+                graph_version = await graph.wait_for_change(graph_version, 30)
+                # Let a burst of graph updates settle into a single event
+                await asyncio.sleep(0.05)
+                graph_version = graph.version
+            else:
+                await asyncio.sleep(1)
+
+    @staticmethod
+    def _print_watch_event(version: int, delta: dict, as_json: bool):
+        if as_json:
+            event = {"event": "state", "version": version, "time": round(time.time(), 3), "delta": delta}
+            print(json.dumps(event, separators=(",", ":")), flush=True)
+            return
+        for section, changes in delta.items():
+            if section not in VersionedState.KEYED_SECTIONS:
+                print(f"[{version}] {section}: {changes}", flush=True)
+                continue
+            for key, entry in changes.items():
+                if entry is None:
+                    print(f"[{version}] {section} removed: {key}", flush=True)
+                elif section == "apps":
+                    print(f"[{version}] app {key}: sink={entry.get('sink')} enabled={entry.get('enabled')} "
+                          f"connected={entry.get('connected')}", flush=True)
+                else:
+                    print(f"[{version}] sink {key}: {entry.get('name')} ({entry.get('description')})", flush=True)
+
     def lines_for_sinks(self, plugin: Plugin) -> list[str]:
-        sinks = self.run(plugin.list_sinks()) or []
+        sinks = self.list_sinks(plugin)
         lines: list[str] = []
         if not sinks:
             lines.append("No sinks found.")
@@ -1314,7 +5520,7 @@ class CLIHelper:
         return lines
 
     def lines_for_running_apps(self, plugin: Plugin) -> list[str]:
-        sink_inputs = self.run(plugin.list_sink_inputs()) or []
+        sink_inputs = self.list_sink_inputs(plugin)
         lines: list[str] = []
         if not sink_inputs:
             lines.append("No running apps detected.")
@@ -1351,7 +5557,7 @@ class CLIHelper:
         sink_id = self.run(plugin.get_highest_priority_sink_id())
         if sink_id is None:
             return ["Unable to determine a highest priority sink."]
-        sinks = self.run(plugin.list_sinks()) or []
+        sinks = self.list_sinks(plugin)
         entry = next((s for s in sinks if plugin._object_id_from_sink(s) == sink_id), None)
         lines = [f"Object ID: {sink_id}"]
         if entry:
@@ -1364,11 +5570,71 @@ class CLIHelper:
                 lines.append(f"priority.session: {priority}")
         return lines
 
+    def lines_for_channel_verification(self, plugin: Plugin, hrir_path: str | None) -> list[str]:
+        result = self.run(plugin.verify_channel_routing(hrir_path))
+        lines = [f"HRIR: {result.get('hrir')}"]
+        if result.get("error"):
+            lines.append(f"Unable to verify: {result['error']}")
+            return lines
+        for channel in result["channels"]:
+            status = "OK  " if channel["ok"] else "FAIL"
+            lines.append(
+                f"{status} {channel['channel']:<3} ear={channel['expected_ear']:<5} level={channel['level_db']} dB "
+                f"ILD={channel['ild_db']} dB ITD={channel['itd_ms']} ms"
+            )
+            for issue in channel["issues"]:
+                lines.append(f"    {issue}")
+        lines.append("All channels verified." if result["ok"] else "Channel verification failed.")
+        return lines
+
+    def lines_for_preset_import(self, plugin: Plugin, source_path: str) -> list[str]:
+        result = self.run(plugin.import_presets(source_path))
+        if result.get("error"):
+            return [f"Unable to import presets: {result['error']}"]
+        lines = [f"Imported {entry['kind'].upper()} preset: {entry['label']}" for entry in result["imported"]]
+        lines.extend(f"Rejected {entry['name']}: {entry['reason']}" for entry in result["rejected"])
+        lines.append(f"Imported {len(result['imported'])}, skipped {len(result['duplicates'])} duplicates, "
+                     f"rejected {len(result['rejected'])}.")
+        return lines
+
+    def lines_for_replay(self, plugin: Plugin, trace_path: str, time_scale: float) -> list[str]:
+        try:
+            report = self.run(replay_command_trace(plugin, trace_path, time_scale))
+        except (OSError, ValueError, EOFError) as e:
+            return [f"Unable to replay trace: {e}"]
+        lines = [f"Replayed {trace_path}: {len(report['passes'])} reconcile passes, "
+                 f"{report['commands_recorded']} recorded commands"]
+        for entry in report["passes"]:
+            status = "OK  " if entry["match"] else "DIFF"
+            delta = entry["replayed_ms"] - entry["recorded_ms"]
+            lines.append(f"{status} pass {entry['pass']} @ {entry['t_ms']:.0f}ms: "
+                         f"recorded {entry['recorded_ms']:.1f}ms, replayed {entry['replayed_ms']:.1f}ms "
+                         f"({delta:+.1f}ms), result {entry['replayed_result']}")
+            if entry["match"]:
+                lines.extend(f"    {decision}" for decision in entry["replayed_decisions"])
+                continue
+            if entry["recorded_result"] != entry["replayed_result"]:
+                lines.append(f"    result: recorded {entry['recorded_result']}, replayed {entry['replayed_result']}")
+            for line in difflib.unified_diff(entry["recorded_decisions"] or [], entry["replayed_decisions"],
+                                             "recorded", "replayed", lineterm="", n=0):
+                if not line.startswith(("---", "+++", "@@")):
+                    lines.append(f"    {line}")
+        for name, entry in report["callables"].items():
+            lines.append(f"{name} ({entry['replayed_ms']:.1f}ms): {json.dumps(entry['result'], sort_keys=True)}")
+        lines.append("Recorded command latency:")
+        for key, stats in report["recorded_command_latency"].items():
+            lines.append(f"    {key}: {stats['count']} calls, {stats['total_ms'] / stats['count']:.1f}ms mean")
+        for description in report["missing_reads"]:
+            lines.append(f"Not in trace: {description}")
+        lines.append("All passes match the recording." if all(entry["match"] for entry in report["passes"])
+                     else "Replay diverged from the recording.")
+        return lines
+
     def lines_for_default_sink(self, plugin: Plugin) -> list[str]:
         sink_id = self.run(plugin.get_default_sink_id())
         if sink_id is None:
             return ["Unable to determine default sink."]
-        sinks = self.run(plugin.list_sinks()) or []
+        sinks = self.list_sinks(plugin)
         entry = next((s for s in sinks if plugin._object_id_from_sink(s) == sink_id), None)
         lines = [f"Object ID: {sink_id}"]
         if entry:
@@ -1401,7 +5667,7 @@ class CLIMenu:
 
     def __init__(self, plugin: Plugin):
         self.plugin = plugin
-        self.helper = CLIHelper()
+        self.helper = CLIHelper(plugin)
         self.menu_items: list[tuple[str, Callable[[object], None]]] = [
             ("List sinks", self.list_sinks_action),
             ("List running apps (sink inputs)", self.list_sink_inputs_action),
@@ -1414,6 +5680,7 @@ class CLIMenu:
             ("List SOFA files", self.list_sofa_files_action),
             ("Set SOFA file", self.set_sofa_file_action),
             ("Run sound test", self.run_sound_test_action),
+            ("Verify HRIR channel routing", self.verify_channel_routing_action),
             ("Test random mixer profile", self.random_mixer_profile_action),
         ]
 
@@ -1686,7 +5953,11 @@ class CLIMenu:
             self._show_message(stdscr, "Sound Test", "Invalid sink selection.")
             return
         self.helper.run(self.plugin.run_sound_test(sink_name))
-        self._show_message(stdscr, "Sound Test", f"Started speaker-test on '{sink_name}'.")
+        self._show_message(stdscr, "Sound Test", f"Played channel identification test on '{sink_name}'.")
+
+    def verify_channel_routing_action(self, stdscr):
+        lines = self.helper.lines_for_channel_verification(self.plugin, None)
+        self._show_scrollable_text(stdscr, "HRIR Channel Verification", lines)
 
     def random_mixer_profile_action(self, stdscr):
         channel_codes = ["FL", "FR", "FC", "LFE", "RL", "RR", "SL", "SR"]
@@ -1734,6 +6005,17 @@ if __name__ == '__main__':
     parser.add_argument("--print-highest-priority-sink", action="store_true",
                         help="Print highest priority physical sink")
     parser.add_argument("--print-default-sink", action="store_true", help="Print current default sink")
+    parser.add_argument("--verify-channels", nargs="?", const="", metavar="HRIR_WAV",
+                        help="Check offline that each speaker reaches the expected ear under an HRIR "
+                             "(the installed HRIR by default)")
+    parser.add_argument("--import-presets", metavar="PATH",
+                        help="Import HRIR WAV and SOFA files from a directory or zip archive into the preset library")
+    parser.add_argument("--replay", metavar="TRACE",
+                        help="Replay reconcile passes and callables from a trace recorded with VSS_TRACE_RECORD")
+    parser.add_argument("--replay-speed", type=float, default=0.0, metavar="FACTOR",
+                        help="With --replay, sleep for recorded command latencies scaled by FACTOR (default 0)")
+    parser.add_argument("--watch", action="store_true", help="Stream sink and app routing changes until interrupted")
+    parser.add_argument("--json", action="store_true", help="With --watch, print each change as an NDJSON event")
     args = parser.parse_args()
 
     actions_requested = any([
@@ -1741,10 +6023,16 @@ if __name__ == '__main__':
         args.list_running_apps,
         args.print_highest_priority_sink,
         args.print_default_sink,
+        args.verify_channels is not None,
+        args.import_presets,
+        args.replay,
+        args.watch,
     ])
 
     if args.menu and actions_requested:
         parser.error("--menu cannot be combined with other options")
+    if args.json and not args.watch:
+        parser.error("--json is only supported with --watch")
 
     if args.menu or not actions_requested:
         plugin = Plugin()
@@ -1753,7 +6041,9 @@ if __name__ == '__main__':
         sys.exit(0)
 
     plugin = Plugin()
-    helper = CLIHelper()
+    helper = CLIHelper(plugin)
+    if os.environ.get("VSS_PROFILE") == "1":
+        sampling_profiler.start()
     exit_code = 0
     try:
         if args.list_sinks:
@@ -1776,6 +6066,26 @@ if __name__ == '__main__':
             helper.print_lines(lines)
             if lines[:1] == ["Unable to determine default sink."]:
                 exit_code |= 1
+        if args.verify_channels is not None:
+            lines = helper.lines_for_channel_verification(plugin, args.verify_channels or None)
+            helper.print_lines(lines)
+            if lines[-1:] != ["All channels verified."]:
+                exit_code |= 1
+        if args.import_presets:
+            lines = helper.lines_for_preset_import(plugin, args.import_presets)
+            helper.print_lines(lines)
+            if lines[:1] and lines[0].startswith("Unable to import presets"):
+                exit_code |= 1
+        if args.replay:
+            lines = helper.lines_for_replay(plugin, args.replay, max(0.0, args.replay_speed))
+            helper.print_lines(lines)
+            if lines[-1:] != ["All passes match the recording."]:
+                exit_code |= 1
+        if args.watch:
+            helper.watch(plugin, args.json)
     finally:
         helper.close()
+        sampling_profiler.stop()
+        if command_executor.trace:
+            command_executor.trace.close()
     sys.exit(exit_code)
@@ -2,6 +2,7 @@ import { ConfirmModal, DialogButton, Focusable, Navigation, Router, showModal }
 import { QRCodeSVG } from 'qrcode.react'
 import { TiInfo } from 'react-icons/ti'
 import { ScrollableWindowRelative } from './ScrollableWindow'
+import { HrirFile } from '../../interfaces'
 
 const HRIR_INFO_MODAL_CLASS = 'hrir-info-dialog-modal'
 
@@ -30,7 +31,7 @@ const openExternalLink = (url: string) => {
 }
 
 export const popupHrirInfoDialog = (onCloseCallback = () => {
-}) => {
+}, hrirFile?: HrirFile) => {
   let closePopup = () => {
   }
 
@@ -55,6 +56,8 @@ export const popupHrirInfoDialog = (onCloseCallback = () => {
     }
     const paragraphStyle = { margin: '0 0 10px', lineHeight: '1.5', fontSize: '13px' }
     const listStyle = { margin: '0 0 12px 20px', lineHeight: '1.5', fontSize: '13px' }
+    const tableCellStyle = { padding: '2px 8px', fontSize: '12px', textAlign: 'right' as const }
+    const analysis = hrirFile?.analysis
     const codeBlockStyle = {
       background: '#121722',
       borderRadius: '6px',
@@ -114,6 +117,40 @@ export const popupHrirInfoDialog = (onCloseCallback = () => {
                 marginBottom: 10,
                 paddingRight: 6
               }}>
+                {hrirFile && analysis && (
+                  <>
+                    <p style={paragraphStyle}>
+                      <strong>{hrirFile.label}</strong>: {analysis.frames} taps at {analysis.sample_rate} Hz,
+                      effective length {analysis.length_ms} ms. Estimated DSP cost
+                      is {analysis.dsp_cost.estimated_mflops} MFLOPS across {analysis.dsp_cost.convolvers} convolvers
+                      ({analysis.dsp_cost.partitions} partitions each).
+                    </p>
+                    <table style={{ borderCollapse: 'collapse', marginBottom: '12px' }}>
+                      <thead>
+                        <tr>
+                          <th style={{ ...tableCellStyle, textAlign: 'left' }}>Speaker</th>
+                          <th style={tableCellStyle}>Onset (ms)</th>
+                          <th style={tableCellStyle}>Length (ms)</th>
+                          <th style={tableCellStyle}>ITD (ms)</th>
+                          <th style={tableCellStyle}>ILD (dB)</th>
+                          <th style={tableCellStyle}>Level (dB)</th>
+                        </tr>
+                      </thead>
+                      <tbody>
+                        {Object.entries(analysis.speakers).map(([speaker, values]) => (
+                          <tr key={speaker}>
+                            <td style={{ ...tableCellStyle, textAlign: 'left' }}>{speaker}</td>
+                            <td style={tableCellStyle}>{values.onset_ms.toFixed(2)}</td>
+                            <td style={tableCellStyle}>{values.length_ms.toFixed(1)}</td>
+                            <td style={tableCellStyle}>{values.itd_ms.toFixed(3)}</td>
+                            <td style={tableCellStyle}>{values.ild_db.toFixed(1)}</td>
+                            <td style={tableCellStyle}>{values.level_db.toFixed(1)}</td>
+                          </tr>
+                        ))}
+                      </tbody>
+                    </table>
+                  </>
+                )}
                 <p style={paragraphStyle}>
                   Each HRIR (Head-Related Impulse Response) WAV file contains a set of very short impulse responses, tiny
                   recordings of how brief sounds reach your left and right ears when they come from different directions.
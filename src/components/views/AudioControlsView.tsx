@@ -7,17 +7,17 @@ import {
 } from '@decky/ui'
 import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react'
 import {
+  AppRoutingState,
   MixerProfile,
   PluginConfig,
   PluginPage,
   RunningApp,
-  Sink,
-  SinkInput,
-  SinkInputConsolidated,
-  SinkInputFormat,
+  UiState,
+  UiStateDelta,
+  UiStateUpdate,
 } from '../../interfaces'
 import { MdOutlineWarningAmber, MdSettings } from 'react-icons/md'
-import { call } from '@decky/api'
+import { addEventListener, call, removeEventListener } from '@decky/api'
 import {
   defaultMixerProfile,
   getCurrentMixerProfile,
@@ -33,6 +33,37 @@ interface AudioControlsViewProps {
   onChangePage: (page: PluginPage) => void
 }
 
+const emptyUiState: UiState = {
+  apps: {},
+  sinks: {},
+  surround_sink_default: false,
+  enabled_apps: [],
+}
+
+// Merge a delta from the backend into the current UI state. Entries set to null have been removed.
+const applyUiStateDelta = (base: UiState, delta: UiStateDelta): UiState => {
+  const mergeSection = <T, >(section: Record<string, T>, changes?: Record<string, T | null>) => {
+    if (!changes) {
+      return section
+    }
+    const merged = { ...section }
+    Object.entries(changes).forEach(([key, value]) => {
+      if (value === null) {
+        delete merged[key]
+      } else {
+        merged[key] = value
+      }
+    })
+    return merged
+  }
+  return {
+    apps: mergeSection(base.apps, delta.apps),
+    sinks: mergeSection(base.sinks, delta.sinks),
+    surround_sink_default: delta.surround_sink_default ?? base.surround_sink_default,
+    enabled_apps: delta.enabled_apps ?? base.enabled_apps,
+  }
+}
+
 const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) => {
   const [currentConfig, setCurrentConfig] = useState<PluginConfig | null>(null)
   const [runningApp, setRunningApp] = useState<RunningApp | null>(null)
@@ -42,117 +73,32 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
   const [mixerVolumes, setMixerVolumes] = useState<{ [code: string]: number }>(
     defaultMixerProfile.volumes,
   )
-  const [sinkInputList, setSinkInputList] = useState<SinkInputConsolidated[]>([])
-  const [sinkLookup, setSinkLookup] = useState<Record<number, Sink>>({})
-  const [surroundSinkDefault, setSurroundSinkDefault] = useState<boolean>(false)
+  const [uiState, setUiState] = useState<UiState>(emptyUiState)
+  const uiStateRef = useRef<{ version: number; state: UiState }>({ version: 0, state: emptyUiState })
   const [isApplicationListLoading, setIsApplicationListLoading] = useState<boolean>(true)
   const [hasLoadedApplicationList, setHasLoadedApplicationList] = useState<boolean>(false)
+  const sinkInputList = useMemo(
+    () => Object.values(uiState.apps).sort((a, b) => a.index - b.index),
+    [uiState.apps],
+  )
+  const surroundSinkDefault = uiState.surround_sink_default
+
+  const commitUiState = (version: number, state: UiState) => {
+    uiStateRef.current = { version, state }
+    setUiState(state)
+  }
+
+  // Fetch every change since the last version seen. The backend sends the full state if that version has expired.
   const updateApplicationList = async () => {
-    setIsApplicationListLoading(true)
-    // First get the current running app
+    // Track the current running app for per-app profiles
     const currentRunningApp = Router.MainRunningApp
-    if (currentRunningApp) {
-      setRunningApp({
-        display_name: currentRunningApp.display_name,
-      })
-    } else {
-      setRunningApp(null)
-    }
-    // Second try to list all current sink inputs from backend
+    setRunningApp(currentRunningApp ? { display_name: currentRunningApp.display_name } : null)
     try {
-      const sinkInputs = await call<[], SinkInput[]>('list_sink_inputs')
-      const sinks = await call<[], Sink[]>('list_sinks')
-      const surroundSinkDefaultFlag = await call<[], boolean>('get_surround_sink_default')
-
-      const sinkInfoMap: Record<number, Sink> = {}
-      if (Array.isArray(sinks)) {
-        sinks.forEach((sinkEntry) => {
-          if (typeof sinkEntry.index !== 'number') {
-            return
-          }
-          sinkInfoMap[sinkEntry.index] = sinkEntry
-        })
+      const update = await call<[number], UiStateUpdate>('get_state_delta', uiStateRef.current.version)
+      if (update && update.version !== uiStateRef.current.version) {
+        const base = update.full ? emptyUiState : uiStateRef.current.state
+        commitUiState(update.version, applyUiStateDelta(base, update.delta))
       }
-      setSinkLookup(sinkInfoMap)
-      setSurroundSinkDefault(!!surroundSinkDefaultFlag)
-
-      if (!sinkInputs) {
-        setSinkInputList([])
-        return
-      }
-
-      const enabledApps = await call<[], string[]>('get_enabled_apps_list') ?? []
-
-      // Consolidate sink inputs by app name.
-      const appMap = new Map<string, SinkInputConsolidated>()
-      sinkInputs.forEach((input) => {
-        if (typeof input.index !== 'number') {
-          return
-        }
-        const appName = input.name?.trim()
-        if (!appName) {
-          return
-        }
-        const enabled = enabledApps.includes(appName)
-        const targetObject = input.target_object ?? ''
-        const volumeSummary = input.volume ?? ''
-        const formatInfo: SinkInputFormat = input.format ?? {
-          format: 'Unknown',
-          sample_format: '',
-          rate: '',
-          channels: '',
-          channel_map: [],
-        }
-        const sinkIndex = typeof input.sink === 'number' ? input.sink : undefined
-        if (appMap.has(appName)) {
-          const existingApp = appMap.get(appName)!
-          const hasFormat = existingApp.formats.some(f =>
-            f.format === formatInfo.format &&
-            f.sample_format === formatInfo.sample_format &&
-            f.rate === formatInfo.rate &&
-            f.channels === formatInfo.channels &&
-            (f.channel_map || []).join(',') === (formatInfo.channel_map || []).join(','),
-          )
-          if (!hasFormat) {
-            existingApp.formats.push(formatInfo)
-          }
-          existingApp.index = Math.min(existingApp.index, input.index)
-          existingApp.volume = volumeSummary || existingApp.volume
-          existingApp.target_object = targetObject || existingApp.target_object
-          existingApp.enabled = enabled
-          if (typeof sinkIndex === 'number') {
-            existingApp.sink = sinkIndex
-          }
-        } else {
-          // First occurrence of this app, create a new consolidated entry
-          appMap.set(appName, {
-            name: appName,
-            index: input.index,
-            formats: [formatInfo],
-            volume: volumeSummary,
-            target_object: targetObject,
-            enabled,
-            sink: sinkIndex,
-            connectedToVirtualSurroundSink: false,
-          })
-        }
-      })
-      const consolidatedApps = Array.from(appMap.values())
-      if (consolidatedApps.length > 0) {
-        const connectionStatuses = await Promise.all(consolidatedApps.map(async (entry) => {
-          try {
-            const result = await call<[string], boolean>('is_app_connected_to_virtual_surround_sink', entry.name)
-            return !!result
-          } catch (error) {
-            console.error(`[decky-virtual-surround-sound:AudioControlsView] Error checking virtual sink for ${entry.name}:`, error)
-            return false
-          }
-        }))
-        consolidatedApps.forEach((entry, index) => {
-          entry.connectedToVirtualSurroundSink = connectionStatuses[index]
-        })
-      }
-      setSinkInputList(consolidatedApps)
     } catch (error) {
       console.error('[decky-virtual-surround-sound:AudioControlsView] Error fetching app details:', error)
     } finally {
@@ -161,6 +107,19 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
     }
   }
 
+  // Apply pushed deltas directly when they follow on from the current version, otherwise catch up.
+  const handleUiStateEvent = (update: UiStateUpdate) => {
+    const currentVersion = uiStateRef.current.version
+    if (update.version <= currentVersion) {
+      return
+    }
+    if (update.version === currentVersion + 1) {
+      commitUiState(update.version, applyUiStateDelta(uiStateRef.current.state, update.delta))
+      return
+    }
+    updateApplicationList()
+  }
+
   // Update mixer profile from backend and update state accordingly.
   const updateMixerProfile = async () => {
     const mixerProfile = await getCurrentMixerProfile()
@@ -189,6 +148,10 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
           },
         },
       })
+      if (!enabled) {
+        // Restore the app's streams to the shared mixer profile
+        await call<[string], boolean>('clear_app_mixer_profile', runningApp.display_name)
+      }
     } else {
       // Always set to false if no app is running
       setUsePerAppProfiles(false)
@@ -202,6 +165,7 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
       const updatedVolumes = { ...mixerVolumes, [channel]: value }
       const mixerProfile: MixerProfile = {
         name: profile,
+        usePerAppProfile: profile !== 'default' && usePerAppProfiles,
         volumes: updatedVolumes,
       }
       // Save plugin config
@@ -215,7 +179,7 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
       await setMixerProfileInBackend(mixerProfile)
       //await call<[MixerProfile], boolean>('set_mixer_profile', mixerProfile);
     },
-    [mixerVolumes, currentConfig, profile],
+    [mixerVolumes, currentConfig, profile, usePerAppProfiles],
   )
   const channelDebounceRef = useRef(
     new Map<string, { timer: ReturnType<typeof setTimeout>; value: number }>(),
@@ -243,18 +207,18 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
     const timer = setTimeout(() => {
       updateChannelVolume(channel, value)
       channelDebounceRef.current.delete(channel)
-    }, 250)
+    }, 50)
 
     // Store (or update) the pending timer and value for this channel.
     channelDebounceRef.current.set(channel, { timer, value })
   }
 
   const getSinkLabelForIndex = useCallback(
-    (sinkIndex?: number): string => {
+    (sinkIndex?: number | null): string => {
       if (sinkIndex === undefined || sinkIndex === null) {
         return 'the system default output'
       }
-      const sinkInfo = sinkLookup[sinkIndex]
+      const sinkInfo = uiState.sinks[String(sinkIndex)]
       if (sinkInfo) {
         const description = sinkInfo.description?.trim()
         if (description) {
@@ -267,10 +231,10 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
       }
       return `Sink #${sinkIndex}`
     },
-    [sinkLookup],
+    [uiState.sinks],
   )
 
-  const handleAppSelect = async (app: SinkInputConsolidated, enabled: boolean) => {
+  const handleAppSelect = async (app: AppRoutingState, enabled: boolean) => {
     console.log(`[decky-virtual-surround-sound:AudioControlsView] Setting app to state ${enabled} [Title:${app.name}]`)
     if (!currentConfig?.notesAcknowledgedV2) {
       console.log(`[decky-virtual-surround-sound:AudioControlsView] Divert to first display warnings dialog.`)
@@ -297,12 +261,11 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
     setCurrentConfig(getPluginConfig())
     updateApplicationList()
     updateMixerProfile()
-    // Add loop to update options
-    const interval = setInterval(() => {
-      updateApplicationList()
-      //updateMixerProfile(); // Not sure if this needs to be updated. Probably only needs to be run once on load.
-    }, 5000)
-    return () => clearInterval(interval)
+    // The backend pushes state deltas as apps and sinks change
+    const listener = addEventListener<[UiStateUpdate]>('vss_state_delta', handleUiStateEvent)
+    return () => {
+      removeEventListener('vss_state_delta', listener)
+    }
   }, [])
 
   return (
@@ -366,7 +329,7 @@ const AudioControlsView: React.FC<AudioControlsViewProps> = ({ onChangePage }) =
           {sinkInputList.map((app) => {
             const targetObjectValue = (app.target_object ?? '').trim()
             const sinkIndex = app.sink
-            const isConnectedToVirtualSink = !!app.connectedToVirtualSurroundSink
+            const isConnectedToVirtualSink = app.connected
             const isDefaultVirtualRoute = surroundSinkDefault && isConnectedToVirtualSink && !targetObjectValue
             const sinkLabel = getSinkLabelForIndex(sinkIndex)
             const sinkSuffix = isDefaultVirtualRoute ? ' (default output)' : ''
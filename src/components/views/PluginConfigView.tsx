@@ -9,7 +9,7 @@ import {
 import { useState, useEffect, CSSProperties } from 'react'
 import { MdArrowBack, MdSurroundSound } from 'react-icons/md'
 import { SiDiscord, SiGithub, SiKofi, SiPatreon } from 'react-icons/si'
-import { HrirFile, PluginConfig } from '../../interfaces'
+import { HrirFile, HrirPreviewResult, PluginConfig } from '../../interfaces'
 import { getPluginConfig, setPluginConfig } from '../../constants'
 import { call } from '@decky/api'
 import { PanelSocialButton } from '../elements/SocialButton'
@@ -47,6 +47,9 @@ const PluginConfigView: React.FC<PluginConfigViewProps> = ({ onGoBack }) => {
   const [currentConfig, setCurrentConfig] = useState(() => getPluginConfig())
   const [hrirFileList, setHrirFileList] = useState<HrirFile[]>([])
   const [surroundSinkDefaultConfig, setSurroundSinkDefaultConfig] = useState<boolean>(false)
+  const [previewHrirName, setPreviewHrirName] = useState<string | null>(null)
+  const [previewError, setPreviewError] = useState<string | null>(null)
+  const selectedHrirFile = hrirFileList.find((file) => file.label === currentConfig.hrirName)
 
   const readBackendConfig = async () => {
     const surroundSinkDefault = await call<[], boolean[]>('get_surround_sink_default')
@@ -94,6 +97,21 @@ const PluginConfigView: React.FC<PluginConfigViewProps> = ({ onGoBack }) => {
     }
   }
 
+  const handleHrirPreview = async (hrirName: string) => {
+    const previewHrir = hrirFileList.find((file) => file.label === hrirName)
+    if (!previewHrir) {
+      return
+    }
+    setPreviewHrirName(hrirName)
+    const result = await call<[hrirPath: string], HrirPreviewResult>('preview_hrir', previewHrir.path)
+    setPreviewError(result?.ok ? null : (result?.error || 'Unable to play preview'))
+  }
+
+  const stopHrirPreview = async () => {
+    await call<[], boolean>('stop_hrir_preview')
+    setPreviewHrirName(null)
+  }
+
   const handleEnableSurroundDefaultSink = async (enabled: boolean) => {
     console.log(`[decky-virtual-surround-sound:PluginConfigView] Configure Virtual Surround Sink as default: ${enabled}`)
     if (!currentConfig?.notesAcknowledgedV2) {
@@ -199,6 +217,12 @@ const PluginConfigView: React.FC<PluginConfigViewProps> = ({ onGoBack }) => {
                     onChange={(option) => handleHrirSelection(option.data)}
                     strDefaultLabel="Select HRIR Profile"
                   />
+                  {selectedHrirFile?.analysis && (
+                    <div style={helperTextStyle}>
+                      {selectedHrirFile.analysis.length_ms} ms effective length,
+                      ~{selectedHrirFile.analysis.dsp_cost.estimated_mflops} MFLOPS estimated DSP cost
+                    </div>
+                  )}
                   <div style={helperTextStyle}>
                     Choose from the list of Head-Related Impulse Response (HRIR) .wav files, which captures how
                     sound is modified by the shape of a human head and ears. These HRIRs are applied to your audio
@@ -209,13 +233,40 @@ const PluginConfigView: React.FC<PluginConfigViewProps> = ({ onGoBack }) => {
                   </div>
                   <DialogButton
                     style={actionButtonStyle}
-                    onClick={() => popupHrirInfoDialog()}
+                    onClick={() => popupHrirInfoDialog(undefined, selectedHrirFile)}
                   >
                     <TiInfo size="1em" /> More HRIR Info
                   </DialogButton>
                 </div>
               </PanelSectionRow>
 
+              <PanelSectionRow>
+                <div style={fieldBlockStyle}>
+                  <div style={fieldHeadingStyle}>Preview a profile without applying it</div>
+                  <Dropdown
+                    rgOptions={hrirFileList.map((hrirFile) => ({
+                      label: hrirFile.label,
+                      data: hrirFile.label,
+                    }))}
+                    selectedOption={previewHrirName}
+                    onChange={(option) => handleHrirPreview(option.data)}
+                    strDefaultLabel="Select HRIR to preview"
+                  />
+                  {previewError && <div style={helperTextStyle}>{previewError}</div>}
+                  <div style={helperTextStyle}>
+                    Plays the surround test sequence rendered through the chosen HRIR on your headphones. Previews
+                    are cached, so you can switch between profiles instantly to compare them.
+                  </div>
+                  <DialogButton
+                    style={actionButtonStyle}
+                    disabled={!previewHrirName}
+                    onClick={stopHrirPreview}
+                  >
+                    Stop Preview
+                  </DialogButton>
+                </div>
+              </PanelSectionRow>
+
               <PanelSectionRow>
                 <div style={{
                   margin: '20px 5px 0',
@@ -40,10 +40,41 @@ export interface RunningApp {
 
 export type PluginPage = 'audio_controls' | 'plugin_config';
 
+export interface HrirSpeakerAnalysis {
+  onset_ms: number;
+  length_ms: number;
+  itd_ms: number;
+  ild_db: number;
+  level_db: number;
+}
+
+export interface HrirDspCost {
+  taps: number;
+  convolvers: number;
+  partitions: number;
+  estimated_mflops: number;
+}
+
+export interface HrirAnalysisSummary {
+  sample_rate: number;
+  frames: number;
+  length_ms: number;
+  dsp_cost: HrirDspCost;
+  speakers: Record<string, HrirSpeakerAnalysis>;
+}
+
 export interface HrirFile {
   label: string;
   path: string;
   channel_count?: string;
+  source?: 'bundled' | 'library';
+  analysis?: HrirAnalysisSummary | null;
+}
+
+export interface HrirPreviewResult {
+  ok: boolean;
+  cached?: boolean;
+  error?: string;
 }
 
 export interface SinkInputFormat {
@@ -81,3 +112,39 @@ export interface Sink {
   description?: string;
   properties?: Record<string, string>;
 }
+
+export interface AppRoutingState {
+  name: string;
+  index: number;
+  formats: SinkInputFormat[];
+  target_object: string;
+  sink: number | null;
+  enabled: boolean;
+  connected: boolean;
+}
+
+export interface SinkSummary {
+  name: string;
+  description: string;
+}
+
+export interface UiState {
+  apps: Record<string, AppRoutingState>;
+  sinks: Record<string, SinkSummary>;
+  surround_sink_default: boolean;
+  enabled_apps: string[];
+}
+
+// Changed sections of the UI state. Removed apps or sinks are reported as null.
+export interface UiStateDelta {
+  apps?: Record<string, AppRoutingState | null>;
+  sinks?: Record<string, SinkSummary | null>;
+  surround_sink_default?: boolean;
+  enabled_apps?: string[];
+}
+
+export interface UiStateUpdate {
+  version: number;
+  full?: boolean;
+  delta: UiStateDelta;
+}